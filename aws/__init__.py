@@ -1,3 +1,5 @@
-from .dynamo import Dynamo
+from .dynamo import Dynamo, close_clients, register_backend, get_backend
+from .backend import StorageBackend
+from .memory import MemoryBackend
 
-__all__ = ['Dynamo']
\ No newline at end of file
+__all__ = ['Dynamo', 'close_clients', 'register_backend', 'get_backend', 'StorageBackend', 'MemoryBackend']
\ No newline at end of file
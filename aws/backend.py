@@ -0,0 +1,40 @@
+from abc import ABC, abstractmethod
+
+
+class StorageBackend(ABC):
+    """
+    The client operations Dynamo uses, with the same arguments and responses as the boto3 DynamoDB client, which is the
+    default backend. Every operation is a blocking call run on the Dynamo executor. Another backend is plugged in for
+    an endpoint with register_backend, or for the built in in-memory one by using a memory:// endpoint.
+    """
+
+    @abstractmethod
+    def get_item(self, TableName, Key, **kwargs):
+        ...
+
+    @abstractmethod
+    def put_item(self, TableName, Item, **kwargs):
+        ...
+
+    @abstractmethod
+    def delete_item(self, TableName, Key, **kwargs):
+        ...
+
+    @abstractmethod
+    def update_item(self, TableName, Key, UpdateExpression, **kwargs):
+        ...
+
+    @abstractmethod
+    def batch_get_item(self, RequestItems, **kwargs):
+        ...
+
+    @abstractmethod
+    def batch_write_item(self, RequestItems, **kwargs):
+        ...
+
+    @abstractmethod
+    def scan(self, TableName, **kwargs):
+        ...
+
+    def close(self):
+        pass
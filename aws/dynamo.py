@@ -1,25 +1,150 @@
+import asyncio
 import boto3
 import logging
+import random
+import threading
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import perf_counter
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
+from aws.memory import MemoryBackend
+from errors import IODBError
+from metrics import metrics
+
+# Upper bound on concurrent DynamoDB calls, the executor and the connection pool are sized together so a call never
+# waits on a connection while holding a worker thread.
+MAX_WORKERS = 10
+
+# DynamoDB limits for a single BatchGetItem and BatchWriteItem request.
+BATCH_GET_SIZE = 100
+BATCH_WRITE_SIZE = 25
+# Unprocessed keys are retried with jittered exponential backoff starting at BATCH_BACKOFF seconds.
+BATCH_RETRIES = 5
+BATCH_BACKOFF = 0.05
+
+_clients = {}
+_clients_lock = threading.Lock()
+_executor = None
+# endpoint: StorageBackend used instead of a boto3 client
+_backends = {}
+
+
+def register_backend(endpoint, backend):
+    """Serve every table configured with this endpoint from the given StorageBackend, None removes it again."""
+    with _clients_lock:
+        if backend is None:
+            _backends.pop(endpoint, None)
+        else:
+            _backends[endpoint] = backend
+
+
+def get_backend(endpoint):
+    """Returns the backend registered for an endpoint, memory:// endpoints get an in-memory one on first use."""
+    backend = _backends.get(endpoint)
+    if backend is None and isinstance(endpoint, str) and endpoint.startswith('memory://'):
+        with _clients_lock:
+            backend = _backends.get(endpoint)
+            if backend is None:
+                backend = _backends[endpoint] = MemoryBackend.from_endpoint(endpoint)
+                logging.info(f"Created in-memory DynamoDB backend for {endpoint}")
+    return backend
+
+
+def get_client(endpoint, region, access, secret):
+    """Returns the long-lived client for an endpoint/region/credential set, creating it on first use."""
+    backend = get_backend(endpoint)
+    if backend is not None:
+        return backend
+    key = (endpoint, region, access, secret)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                # boto3 clients are thread safe once built, but building them from the shared default session is not.
+                session = boto3.session.Session()
+                client = session.client('dynamodb', endpoint_url=endpoint, region_name=region,
+                                        aws_access_key_id=access, aws_secret_access_key=secret,
+                                        config=Config(max_pool_connections=MAX_WORKERS))
+                _clients[key] = client
+                logging.info(f"Created DynamoDB client for region {region}")
+    return client
+
+
+def get_executor():
+    """Returns the bounded executor all blocking DynamoDB calls are run on."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='dynamo')
+    return _executor
+
+
+def close_clients():
+    """Closes every pooled client, registered backend and the executor, used when the bot is shutting down."""
+    global _executor
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        for backend in _backends.values():
+            backend.close()
+        _backends.clear()
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
 
 
 class Dynamo:
     def __init__(self, table, endpoint, region, access, secret):
         self.table_name = table
-        self.client = boto3.client('dynamodb', endpoint_url=endpoint,
-                                   region_name=region, aws_access_key_id=access, aws_secret_access_key=secret)
+        self.client = get_client(endpoint, region, access, secret)
+
+    async def _run(self, operation, expected=(), **kwargs):
+        """
+        Runs a blocking client operation on the executor so the event loop is never held up by network I/O. Client
+        errors with a code in expected are an answer the caller handles, such as a failed condition, and aren't
+        counted as errors in the timings.
+        """
+        loop = asyncio.get_running_loop()
+        name = f"dynamo.{self.table_name}.{operation}"
+        # Timed from the event loop, so time spent waiting for a free worker thread counts too
+        start = perf_counter()
+        try:
+            response = await loop.run_in_executor(get_executor(), partial(getattr(self.client, operation), **kwargs))
+        except ClientError as e:
+            metrics.observe(name, perf_counter() - start, error=e.response['Error']['Code'] not in expected)
+            raise
+        except BaseException:
+            metrics.observe(name, perf_counter() - start, error=True)
+            raise
+        metrics.observe(name, perf_counter() - start)
+        return response
+
+    async def _call(self, operation, expected=(), **kwargs):
+        """Runs a single table operation against this table."""
+        return await self._run(operation, expected=expected, TableName=self.table_name, **kwargs)
+
+    async def _run_batch(self, operation, request, unprocessed_key):
+        """Sends one batch request, resending whatever DynamoDB reports as unprocessed until it is all done."""
+        responses = []
+        attempt = 0
+        while request:
+            response = await self._run(operation, RequestItems=request)
+            responses.append(response)
+            request = response.get(unprocessed_key)
+            if request:
+                attempt += 1
+                if attempt > BATCH_RETRIES:
+                    raise IODBError(f"Unable to complete {operation} on {self.table_name}, items left unprocessed")
+                await asyncio.sleep(random.uniform(0, BATCH_BACKOFF * 2 ** attempt))
+        return responses
 
-    def get(self, query):
-        """Fetch an item based on the defined query."""
+    async def get(self, query, **kwargs):
+        """Fetch an item based on the defined query, extra GetItem options such as a projection are passed along."""
         try:
-            response = self.client.get_item(TableName=self.table_name, Key=query)
+            response = await self._call('get_item', Key=query, **kwargs)
             return response
         except ClientError as e:
             logging.error(f"Dynamo Get Item Error Table: %s, error: %s: %s",
@@ -29,10 +154,10 @@ class Dynamo:
             )
             raise e
 
-    def put(self, data):
+    async def put(self, data):
         """Put new entry into the database using the defined data parameter."""
         try:
-            self.client.put_item(TableName=self.table_name, Item=data)
+            await self._call('put_item', Item=data)
         except ClientError as e:
             logging.error(f"Dynamo Put Item Error Table: %s, error: %s: %s",
                 self.table_name,
@@ -41,10 +166,10 @@ class Dynamo:
             )
             raise e
 
-    def delete(self, query):
+    async def delete(self, query):
         """Delete an item from a table in the Database"""
         try:
-            self.client.delete_item(TableName=self.table_name, Key=query)
+            await self._call('delete_item', Key=query)
         except ClientError as e:
             logging.error(f"Dynamo Delete Item Error Table: %s, error: %s: %s",
                 self.table_name,
@@ -53,46 +178,204 @@ class Dynamo:
             )
             raise e
 
-    def update(self, query, data):
+    async def update(self, query, data):
         """Update an item found from the passed in query and data to update."""
         try:
-            update = "set "
-            update_vals = {}
-            for key, value in data:
-                update += f":{key} =:{key}, "
-                update_vals[f"{key}"] = value
-            expression = update[:-2] # NOTE: Need to remove trailing space and comma included in for-loop
-            response = self.client.update_item(
-                TableName=self.table_name,
+            # Attribute names go through placeholders so reserved words such as 'data' can be updated.
+            expression = "SET " + ", ".join(f"#{key} = :{key}" for key in data)
+            response = await self._call(
+                'update_item',
                 Key=query,
                 UpdateExpression=expression,
-                ExpressionAttributeValues=update_vals,
+                ExpressionAttributeNames={f"#{key}": key for key in data},
+                ExpressionAttributeValues={f":{key}": value for key, value in data.items()},
                 ReturnValues="UPDATED_NEW"
             )
         except ClientError as e:
             logging.error(f"Dynamo Update Item Error Table: %s, error: %s: %s",
-                self.table.name,
+                self.table_name,
                 e.response["Error"]["Code"],
                 e.response["Error"]["Message"]
             )
         else:
             return response["Attributes"]
 
-    def scan_get_all(self):
+    async def increment(self, query, counters, values=None, path=None, initial=None):
+        """
+        Atomically add to numeric attributes and set the values passed in with one UpdateItem, no read needed. With path
+        the attributes live inside that map attribute, and if the item or map doesn't exist yet the initial item is
+        put instead. A negative amount can't take its attribute below zero, the update then fails with
+        ConditionalCheckFailedException, as it does for an item that doesn't exist without an initial one. Returns the
+        attributes of the item after the update.
+        """
+        names = {}
+        expression_values = {}
+        prefix = ""
+        if path is not None:
+            names['#path'] = path
+            prefix = "#path."
+        adds = []
+        conditions = []
+        for i, (key, amount) in enumerate(counters.items()):
+            names[f"#c{i}"] = key
+            expression_values[f":c{i}"] = {'N': str(amount)}
+            adds.append(f"{prefix}#c{i} :c{i}")
+            if amount < 0:
+                expression_values[f":f{i}"] = {'N': str(-amount)}
+                conditions.append(f"{prefix}#c{i} >= :f{i}")
+        sets = []
+        for i, (key, value) in enumerate((values or {}).items()):
+            names[f"#v{i}"] = key
+            expression_values[f":v{i}"] = value
+            sets.append(f"{prefix}#v{i} = :v{i}")
+        expression = "ADD " + ", ".join(adds)
+        if len(sets) > 0:
+            expression += " SET " + ", ".join(sets)
+
+        options = {}
+        # A failed condition means the record isn't there yet or someone else just made it, both handled below, or
+        # that a counter would go below zero
+        conditional = ()
+        if path is not None and initial is not None:
+            conditions.insert(0, "attribute_exists(#path)")
+        if len(conditions) > 0:
+            options['ConditionExpression'] = " AND ".join(conditions)
+            conditional = ('ConditionalCheckFailedException',)
+        try:
+            while True:
+                try:
+                    response = await self._call('update_item', expected=conditional, Key=query,
+                                                UpdateExpression=expression,
+                                                ExpressionAttributeNames=names,
+                                                ExpressionAttributeValues=expression_values,
+                                                ReturnValues="ALL_NEW", **options)
+                    return response['Attributes']
+                except ClientError as e:
+                    if path is None or initial is None or \
+                            e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise e
+                try:
+                    # First increment for this item, create it whole unless someone else just did.
+                    await self._call('put_item', expected=conditional, Item=initial,
+                                     ConditionExpression="attribute_not_exists(#path)",
+                                     ExpressionAttributeNames={'#path': path})
+                    return initial
+                except ClientError as e:
+                    if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise e
+        except ClientError as e:
+            if e.response['Error']['Code'] in conditional:
+                raise e
+            logging.error(f"Dynamo Increment Error Table: %s, error: %s: %s",
+                self.table_name,
+                e.response["Error"]["Code"],
+                e.response["Error"]["Message"]
+            )
+            raise e
+
+    async def batch_get(self, queries):
+        """Fetch many items by key at once, split into concurrent BatchGetItem requests."""
+        try:
+            chunks = [queries[i:i + BATCH_GET_SIZE] for i in range(0, len(queries), BATCH_GET_SIZE)]
+            results = await asyncio.gather(*(self._run_batch('batch_get_item', {self.table_name: {'Keys': chunk}},
+                                                             'UnprocessedKeys') for chunk in chunks))
+            items = []
+            for responses in results:
+                for response in responses:
+                    items.extend(response['Responses'].get(self.table_name, []))
+            return items
+        except ClientError as e:
+            logging.error(f"Dynamo Batch Get Error Table: %s, error: %s: %s",
+                self.table_name,
+                e.response["Error"]["Code"],
+                e.response["Error"]["Message"]
+            )
+            raise e
+
+    async def batch_write(self, items=(), deletes=()):
+        """Put and delete many items at once, split into concurrent BatchWriteItem requests."""
+        try:
+            requests = [{'PutRequest': {'Item': item}} for item in items]
+            requests.extend({'DeleteRequest': {'Key': query}} for query in deletes)
+            chunks = [requests[i:i + BATCH_WRITE_SIZE] for i in range(0, len(requests), BATCH_WRITE_SIZE)]
+            await asyncio.gather(*(self._run_batch('batch_write_item', {self.table_name: chunk}, 'UnprocessedItems')
+                                   for chunk in chunks))
+        except ClientError as e:
+            logging.error(f"Dynamo Batch Write Error Table: %s, error: %s: %s",
+                self.table_name,
+                e.response["Error"]["Code"],
+                e.response["Error"]["Message"]
+            )
+            raise e
+
+    async def scan(self, **kwargs):
+        """Runs a single Scan request and returns the raw response."""
+        try:
+            return await self._call('scan', **kwargs)
+        except ClientError as e:
+            logging.error(f"Dynamo Scan Error Table: %s, error: %s: %s",
+                self.table_name,
+                e.response["Error"]["Code"],
+                e.response["Error"]["Message"]
+            )
+            raise e
+
+    async def scan_pages(self, segments=1, projection=None, **kwargs):
+        """
+        Async generator yielding the items of each Scan page as it arrives, following LastEvaluatedKey. With segments
+        above 1 the table is read as a parallel scan with one worker per segment and pages come out in the order they
+        finish. Workers wait while the consumer is behind, so only about one page per segment is held in memory.
+        Projection takes a list of attribute names to return, other Scan options are passed along.
+        """
+        if projection is not None:
+            kwargs['ProjectionExpression'] = ", ".join(f"#p{i}" for i in range(len(projection)))
+            kwargs.setdefault('ExpressionAttributeNames', {}).update(
+                {f"#p{i}": name for i, name in enumerate(projection)})
+
+        queue = asyncio.Queue(maxsize=segments)
+        finished = object()
+
+        async def worker(segment):
+            options = dict(kwargs)
+            if segments > 1:
+                options.update(Segment=segment, TotalSegments=segments)
+            try:
+                while True:
+                    response = await self.scan(**options)
+                    await queue.put(response['Items'])
+                    if 'LastEvaluatedKey' not in response:
+                        break
+                    options['ExclusiveStartKey'] = response['LastEvaluatedKey']
+                await queue.put(finished)
+            except Exception as e:
+                await queue.put(e)
+
+        workers = [asyncio.create_task(worker(i)) for i in range(segments)]
+        try:
+            remaining = segments
+            while remaining > 0:
+                page = await queue.get()
+                if page is finished:
+                    remaining -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield page
+        finally:
+            # Also reached when the consumer stops early, don't leave workers scanning in the background
+            for task in workers:
+                task.cancel()
+
+    async def scan_get_all(self, segments=1):
         """Gets all items in a DynamoDB Table in a Batch"""
         try:
-            response = self.client.scan(TableName=self.table_name)
-            items = response['Items']
-            while 'LastEvaluatedKey' in response:
-                response = client.scan(
-                    TableName=self.table_name,
-                    ExclusiveStartKey=response['LastEvaluatedKey']
-                )
-                items.extend(response['Items'])
+            items = []
+            async for page in self.scan_pages(segments=segments):
+                items.extend(page)
             return items
         except ClientError as e:
             logging.error(f"Dynamo Scan Get All Items Error Table: %s, error: %s: %s",
-                self.table.name,
+                self.table_name,
                 e.response["Error"]["Code"],
                 e.response["Error"]["Message"]
             )
@@ -0,0 +1,324 @@
+import copy
+import random
+import re
+import threading
+import time
+import zlib
+from decimal import Decimal
+from urllib.parse import urlparse, parse_qs
+
+from botocore.exceptions import ClientError
+
+from aws.backend import StorageBackend
+
+# Partition key names used by the bot's tables, a table takes whichever one its first item or key uses
+key_names = ('channelID', 'userID', 'key')
+# boto3 retries throttled calls itself, for DynamoDB up to 10 times with exponential backoff from 25ms
+client_retries = 10
+client_backoff = 0.025
+clause_pattern = re.compile(r"\b(SET|ADD|REMOVE|DELETE)\b")
+condition_pattern = re.compile(r"^\s*(attribute_exists|attribute_not_exists)\(\s*([^)\s]+)\s*\)\s*$")
+comparison_pattern = re.compile(r"^\s*([^\s<>=]+)\s*>=\s*(:\w+)\s*$")
+
+
+def client_error(code, message, operation):
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+
+class MemoryBackend(StorageBackend):
+    """
+    DynamoDB kept in memory for load tests and local runs, speaking the same wire format as the real client for the
+    operations Dynamo uses. Each call can be slowed by a fixed latency plus random jitter and throttled at a given rate:
+    single item calls are retried the way the boto3 client retries them and raise
+    ProvisionedThroughputExceededException once the retries run out, batch calls hand throttled items back as
+    unprocessed, the same as DynamoDB. Throttling is drawn from a seeded random generator so runs are repeatable.
+
+    Only the expressions Dynamo builds are understood: SET and ADD updates on top level or one level nested attributes,
+    attribute_exists/attribute_not_exists and numeric >= conditions joined with AND, and top level projections. Anything else raises a
+    ValidationException instead of being silently ignored.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, throttle_rate=0.0, page_size=100, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.page_size = page_size
+        self.random = random.Random(seed)
+        # table name: {key value: item}, and table name: key attribute name
+        self.tables = {}
+        self.schemas = {}
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.throttled = 0
+
+    @staticmethod
+    def from_endpoint(endpoint):
+        """Builds a backend from an endpoint such as memory://load?latency=0.02&jitter=0.01&throttle=0.05&seed=1"""
+        options = {k: v[-1] for k, v in parse_qs(urlparse(endpoint).query).items()}
+        return MemoryBackend(latency=float(options.get('latency', 0)), jitter=float(options.get('jitter', 0)),
+                             throttle_rate=float(options.get('throttle', 0)),
+                             page_size=int(options.get('page_size', 100)),
+                             seed=int(options['seed']) if 'seed' in options else None)
+
+    def create_table(self, table, key):
+        """Declare a table's key attribute up front instead of taking it from the first item."""
+        with self.lock:
+            self.tables.setdefault(table, {})
+            self.schemas[table] = key
+
+    # Simulation
+
+    def _begin(self, operation):
+        with self.lock:
+            self.calls[operation] = self.calls.get(operation, 0) + 1
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter > 0 else 0)
+        if delay > 0:
+            # Sleeps the executor thread like a network call would
+            time.sleep(delay)
+
+    def _throttle(self):
+        with self.lock:
+            throttled = self.throttle_rate > 0 and self.random.random() < self.throttle_rate
+            if throttled:
+                self.throttled += 1
+        return throttled
+
+    def _check_throttle(self, operation):
+        for attempt in range(client_retries):
+            if not self._throttle():
+                return
+            time.sleep(self.random.uniform(0, client_backoff * 2 ** attempt))
+        if self._throttle():
+            raise client_error('ProvisionedThroughputExceededException',
+                               'The level of configured provisioned throughput for the table was exceeded.', operation)
+
+    # Keys
+
+    def _key(self, table, key, operation):
+        """The stored key value for a Key, checking it names the table's key attribute and nothing else"""
+        schema = self.schemas.get(table)
+        if schema is None:
+            name = next((i for i in key if i in key_names), None)
+            if name is None or len(key) != 1:
+                raise client_error('ValidationException', 'The provided key element does not match the schema',
+                                   operation)
+            self.schemas[table] = schema = name
+            self.tables.setdefault(table, {})
+        if len(key) != 1 or schema not in key:
+            raise client_error('ValidationException', 'The provided key element does not match the schema', operation)
+        (wire_type, value), = key[schema].items()
+        return wire_type, value
+
+    def _item_key(self, table, item, operation):
+        schema = self.schemas.get(table)
+        if schema is None:
+            schema = next((i for i in key_names if i in item), None)
+            if schema is None:
+                raise client_error('ValidationException', 'One of the required keys was not given a value',
+                                   operation)
+        if schema not in item:
+            raise client_error('ValidationException', 'One of the required keys was not given a value', operation)
+        return self._key(table, {schema: item[schema]}, operation)
+
+    # Expressions
+
+    @staticmethod
+    def _path(path, names, operation):
+        parts = []
+        for part in path.strip().split('.'):
+            if part.startswith('#'):
+                if part not in names:
+                    raise client_error('ValidationException', f"Undefined attribute name {part}", operation)
+                part = names[part]
+            parts.append(part)
+        if len(parts) > 2:
+            raise client_error('ValidationException', f"Unsupported document path {path}", operation)
+        return parts
+
+    @staticmethod
+    def _get_path(item, parts):
+        if item is None or parts[0] not in item:
+            return None
+        value = item[parts[0]]
+        if len(parts) == 2:
+            return value.get('M', {}).get(parts[1]) if isinstance(value, dict) else None
+        return value
+
+    @staticmethod
+    def _set_path(item, parts, value, operation):
+        if len(parts) == 1:
+            item[parts[0]] = value
+            return
+        parent = item.get(parts[0])
+        if parent is None or 'M' not in parent:
+            raise client_error('ValidationException',
+                               'The document path provided in the update expression is invalid for update', operation)
+        parent['M'][parts[1]] = value
+
+    def _condition(self, item, kwargs, operation):
+        expression = kwargs.get('ConditionExpression')
+        if expression is None:
+            return
+        names = kwargs.get('ExpressionAttributeNames', {})
+        for term in re.split(r"\s+AND\s+", expression):
+            match = condition_pattern.match(term)
+            if match is not None:
+                exists = self._get_path(item, self._path(match.group(2), names, operation)) is not None
+                passed = exists == (match.group(1) == 'attribute_exists')
+            else:
+                match = comparison_pattern.match(term)
+                if match is None:
+                    raise client_error('ValidationException', f"Unsupported condition {expression}", operation)
+                value = self._get_path(item, self._path(match.group(1), names, operation))
+                limit = kwargs.get('ExpressionAttributeValues', {}).get(match.group(2))
+                if limit is None or 'N' not in limit:
+                    raise client_error('ValidationException', f"Unsupported condition {expression}", operation)
+                passed = value is not None and 'N' in value and Decimal(value['N']) >= Decimal(limit['N'])
+            if not passed:
+                raise client_error('ConditionalCheckFailedException', 'The conditional request failed', operation)
+
+    def _project(self, item, kwargs, operation):
+        expression = kwargs.get('ProjectionExpression')
+        if expression is None:
+            return copy.deepcopy(item)
+        names = kwargs.get('ExpressionAttributeNames', {})
+        projected = {}
+        for path in expression.split(','):
+            parts = self._path(path, names, operation)
+            if len(parts) != 1:
+                raise client_error('ValidationException', f"Unsupported projection {path}", operation)
+            if parts[0] in item:
+                projected[parts[0]] = copy.deepcopy(item[parts[0]])
+        return projected
+
+    # Operations
+
+    def get_item(self, TableName, Key, **kwargs):
+        self._begin('get_item')
+        self._check_throttle('GetItem')
+        with self.lock:
+            item = self.tables.get(TableName, {}).get(self._key(TableName, Key, 'GetItem'))
+            if item is None:
+                return {}
+            return {'Item': self._project(item, kwargs, 'GetItem')}
+
+    def put_item(self, TableName, Item, **kwargs):
+        self._begin('put_item')
+        self._check_throttle('PutItem')
+        with self.lock:
+            key = self._item_key(TableName, Item, 'PutItem')
+            table = self.tables.setdefault(TableName, {})
+            self._condition(table.get(key), kwargs, 'PutItem')
+            table[key] = copy.deepcopy(Item)
+        return {}
+
+    def delete_item(self, TableName, Key, **kwargs):
+        self._begin('delete_item')
+        self._check_throttle('DeleteItem')
+        with self.lock:
+            key = self._key(TableName, Key, 'DeleteItem')
+            table = self.tables.setdefault(TableName, {})
+            self._condition(table.get(key), kwargs, 'DeleteItem')
+            table.pop(key, None)
+        return {}
+
+    def update_item(self, TableName, Key, UpdateExpression, **kwargs):
+        self._begin('update_item')
+        self._check_throttle('UpdateItem')
+        names = kwargs.get('ExpressionAttributeNames', {})
+        values = kwargs.get('ExpressionAttributeValues', {})
+        with self.lock:
+            key = self._key(TableName, Key, 'UpdateItem')
+            table = self.tables.setdefault(TableName, {})
+            current = table.get(key)
+            self._condition(current, kwargs, 'UpdateItem')
+            # Worked on a copy so a failed update leaves the stored item untouched
+            item = copy.deepcopy(current) if current is not None else copy.deepcopy(Key)
+            updated = set()
+
+            sections = clause_pattern.split(UpdateExpression)
+            for action, body in zip(sections[1::2], sections[2::2]):
+                for clause in (i for i in body.split(',') if i.strip()):
+                    if action == 'SET':
+                        path, _, value = clause.partition('=')
+                        value = values.get(value.strip())
+                    elif action == 'ADD':
+                        path, value = clause.strip().rsplit(' ', 1)
+                        value = values.get(value.strip())
+                    else:
+                        raise client_error('ValidationException', f"Unsupported update action {action}",
+                                           'UpdateItem')
+                    if value is None:
+                        raise client_error('ValidationException', f"Undefined value in {clause.strip()}",
+                                           'UpdateItem')
+                    parts = self._path(path, names, 'UpdateItem')
+                    if action == 'ADD':
+                        existing = self._get_path(item, parts)
+                        if existing is not None:
+                            value = {'N': str(Decimal(existing['N']) + Decimal(value['N']))}
+                    self._set_path(item, parts, copy.deepcopy(value), 'UpdateItem')
+                    updated.add(parts[0])
+            table[key] = item
+
+            response = {}
+            return_values = kwargs.get('ReturnValues', 'NONE')
+            if return_values == 'ALL_NEW':
+                response['Attributes'] = copy.deepcopy(item)
+            elif return_values == 'UPDATED_NEW':
+                # Whole top level attributes, DynamoDB narrows nested updates further
+                response['Attributes'] = {i: copy.deepcopy(item[i]) for i in updated}
+            return response
+
+    def batch_get_item(self, RequestItems, **kwargs):
+        self._begin('batch_get_item')
+        responses = {}
+        unprocessed = {}
+        for table, request in RequestItems.items():
+            for query in request['Keys']:
+                if self._throttle():
+                    unprocessed.setdefault(table, {'Keys': []})['Keys'].append(query)
+                    continue
+                with self.lock:
+                    item = self.tables.get(table, {}).get(self._key(table, query, 'BatchGetItem'))
+                    if item is not None:
+                        responses.setdefault(table, []).append(self._project(item, request, 'BatchGetItem'))
+        return {'Responses': responses, 'UnprocessedKeys': unprocessed}
+
+    def batch_write_item(self, RequestItems, **kwargs):
+        self._begin('batch_write_item')
+        unprocessed = {}
+        for table, requests in RequestItems.items():
+            for request in requests:
+                if self._throttle():
+                    unprocessed.setdefault(table, []).append(request)
+                    continue
+                with self.lock:
+                    stored = self.tables.setdefault(table, {})
+                    if 'PutRequest' in request:
+                        item = request['PutRequest']['Item']
+                        stored[self._item_key(table, item, 'BatchWriteItem')] = copy.deepcopy(item)
+                    else:
+                        stored.pop(self._key(table, request['DeleteRequest']['Key'], 'BatchWriteItem'), None)
+        return {'UnprocessedItems': unprocessed}
+
+    def scan(self, TableName, **kwargs):
+        self._begin('scan')
+        self._check_throttle('Scan')
+        limit = min(kwargs.get('Limit', self.page_size), self.page_size)
+        with self.lock:
+            schema = self.schemas.get(TableName)
+            keys = list(self.tables.get(TableName, {}))
+            if 'TotalSegments' in kwargs:
+                # Items are spread over the segments by key the way DynamoDB spreads them by partition
+                keys = [i for i in keys
+                        if zlib.crc32(str(i).encode()) % kwargs['TotalSegments'] == kwargs['Segment']]
+            start = 0
+            if 'ExclusiveStartKey' in kwargs:
+                last = self._key(TableName, kwargs['ExclusiveStartKey'], 'Scan')
+                start = keys.index(last) + 1 if last in keys else len(keys)
+            page = keys[start:start + limit]
+            items = [self._project(self.tables[TableName][i], kwargs, 'Scan') for i in page]
+            response = {'Items': items, 'Count': len(items), 'ScannedCount': len(items)}
+            if start + limit < len(keys):
+                response['LastEvaluatedKey'] = {schema: {page[-1][0]: page[-1][1]}}
+            return response
@@ -0,0 +1,49 @@
+"""
+Micro-benchmark of the roster codec against boto3's generic serializers.
+
+Run from the repository root with: python -m benchmarks.codec_benchmark
+"""
+import timeit
+
+from models import Roster
+from services import Codec
+from services.librarian import serialize, deserialize
+
+sizes = [10, 25, 50, 100, 200]
+repeats = 5
+
+
+def make_roster(members):
+    """A roster with members spread over every role and backup list, roughly like a busy signup."""
+    roster = Roster("vAS", "<t:1700000000:f>", "Leader", {}, {}, {}, {}, {}, {}, members, members, members, 0, "None")
+    roles = ['dps', 'healer', 'tank']
+    for i in range(members):
+        roster.add_member(user_id=str(100000000000000000 + i), role=roles[i % 3], which='su', msg="Sets")
+    return roster
+
+
+def best(statement, number):
+    """Best per-call time in microseconds."""
+    return min(timeit.repeat(statement, number=number, repeat=repeats)) / number * 1000000
+
+
+def main():
+    print(f"{'members':>8} {'boto3 enc':>10} {'codec enc':>10} {'boto3 dec':>10} {'codec dec':>10} {'speedup':>8}")
+    for size in sizes:
+        data = make_roster(size).get_roster_data()
+        wire = serialize(data)
+        assert Codec.encode_roster(data) == wire
+        assert Codec.decode_roster(wire) == deserialize(wire)
+
+        number = max(10, 20000 // size)
+        generic_encode = best(lambda: serialize(data), number)
+        codec_encode = best(lambda: Codec.encode_roster(data), number)
+        generic_decode = best(lambda: deserialize(wire), number)
+        codec_decode = best(lambda: Codec.decode_roster(wire), number)
+        speedup = (generic_encode + generic_decode) / (codec_encode + codec_decode)
+        print(f"{size:>8} {generic_encode:>8.1f}us {codec_encode:>8.1f}us {generic_decode:>8.1f}us "
+              f"{codec_decode:>8.1f}us {speedup:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
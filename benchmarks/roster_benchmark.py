@@ -0,0 +1,172 @@
+"""
+Benchmarks of the roster hot paths on synthetic guilds: signups, filling spots, channel names, status embeds, the
+roster codec and working across thousands of rosters. Reports time and peak allocation per call.
+
+Run from the repository root with: python -m benchmarks.roster_benchmark
+benchmarks/baseline.json holds reference numbers from one full run, to see roughly where each path stands. They were
+taken on one machine and aren't a pass/fail gate, timings on another machine or under other load won't match them.
+To compare a branch against main, save a baseline on main and compare against it on the branch, on the same machine:
+    python -m benchmarks.roster_benchmark --save benchmarks/results/main.json
+    python -m benchmarks.roster_benchmark --compare benchmarks/results/main.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+
+from benchmarks.stubs import make_guild, make_roster, make_rosters, make_bot, base_id
+from services import Codec, EmbedFactory, RosterExtended, RosterCache, Snapshot
+from services.catalog import read_languages
+
+sizes = [12, 24, 100, 500]
+roster_counts = [1000, 5000]
+repeats = 11
+# Slower than the baseline by more than this fraction, on top of how much either run varied, counts as a regression
+threshold = 0.25
+
+
+def measure(make_input, run, number):
+    """
+    Median per-call time in microseconds over the repeats, the spread of the middle half of the repeats as a fraction
+    of the median and the peak memory allocated by one call in KiB. Inputs are built before timing so operations that
+    change what they are given start fresh every call.
+    """
+    times = []
+    for _ in range(repeats):
+        inputs = [make_input() for _ in range(number)]
+        iterator = iter(inputs)
+        times.append(timeit.timeit(lambda: run(next(iterator)), number=number))
+    value = make_input()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    run(value)
+    peak = tracemalloc.get_traced_memory()[1] - start
+    tracemalloc.stop()
+    times.sort()
+    median = times[len(times) // 2]
+    noise = (times[len(times) * 3 // 4] - times[len(times) // 4]) / median
+    return median / number * 1000000, noise, peak / 1024
+
+
+def benchmarks():
+    """Yields (name, make_input, run, number) for every benchmark"""
+    status_language = read_languages("languages")['english']['ui']['Status']
+    bot = make_bot(None)
+    guild = make_guild(max(sizes))
+
+    for size in sizes:
+        number = max(5, 5000 // size)
+
+        def add_all(roster, size=size):
+            for i in range(size):
+                roster.add_member(user_id=str(base_id + i), role=('dps', 'healer', 'tank')[i % 3], which='su',
+                                  msg="Sets")
+        yield f"add_member/{size}", lambda size=size: make_roster(0, limit=size // 4), add_all, number
+
+        def backed_up(size=size):
+            # Everyone starts in backup, then the limits open up and fill_spots promotes them
+            roster = make_roster(size, limit=0)
+            roster.dps_limit = roster.healer_limit = roster.tank_limit = size // 3
+            return roster
+        yield f"fill_spots/{size}", backed_up, lambda roster: roster.fill_spots(0), number
+
+        roster = make_roster(size)
+        yield (f"create_status/{size}", lambda roster=roster: roster,
+               lambda roster: EmbedFactory.create_status(roster, status_language, bot, "<@&1>", guild), number)
+
+        data = roster.get_roster_data()
+        wire = Codec.encode_roster(data)
+        yield f"codec_encode/{size}", lambda data=data: data, Codec.encode_roster, number * 4
+        yield f"codec_decode/{size}", lambda wire=wire: wire, Codec.decode_roster, number * 4
+
+    dates = [f"<t:{1700000000 + i * 86399}:f>" for i in range(50)] + ["ASAP"]
+    yield ("generate_channel_name", lambda: dates,
+           lambda dates: [RosterExtended.generate_channel_name(date, "vKynesAegisHM", "US/Central") for date in dates],
+           20)
+
+    for count in roster_counts:
+        rosters = make_rosters(count, 24, count * 4)
+        roster_map = {str(channel_id): f"{roster.trial}-{channel_id}" for channel_id, roster in rosters.items()}
+
+        def cache(rosters=rosters):
+            built = RosterCache(None)
+            built.rosters = dict(rosters)
+            return built
+        yield f"rebuild_index/{count}", cache, lambda built: built.rebuild_index(), 3
+
+        indexed = cache()
+        indexed.rebuild_index()
+        yield (f"get_user_rosters/{count}", lambda: indexed,
+               lambda built: [built.get_user_rosters(base_id + i) for i in range(100)], 50)
+
+        yield (f"snapshot_encode/{count}", lambda rosters=rosters: rosters,
+               lambda rosters, roster_map=roster_map: Snapshot.encode(rosters, roster_map, ['Prog']), 3)
+        encoded = Snapshot.encode(rosters, roster_map, ['Prog'])
+        yield f"snapshot_decode/{count}", lambda encoded=encoded: encoded, Snapshot.decode, 3
+
+
+def run_all(selected):
+    results = {}
+    print(f"{'benchmark':<26} {'us/call':>12} {'calls/s':>12} {'peak KiB':>10}")
+    for name, make_input, run, number in benchmarks():
+        if selected and not any(name.startswith(i) for i in selected):
+            continue
+        per_call, noise, peak = measure(make_input, run, number)
+        results[name] = {'us_per_call': round(per_call, 3), 'calls_per_sec': round(1000000 / per_call, 1),
+                         'noise': round(noise, 3), 'peak_kib': round(peak, 2)}
+        print(f"{name:<26} {per_call:>12.2f} {1000000 / per_call:>12.1f} {peak:>10.2f}")
+    return results
+
+
+def compare(results, baseline):
+    """
+    Prints the change against a baseline, returns the benchmarks that got slower by more than the threshold plus the
+    noise measured in either run, so a path that varies a lot between repeats needs a bigger change to be flagged
+    """
+    regressions = []
+    print(f"\n{'benchmark':<26} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        change = result['us_per_call'] / before['us_per_call'] - 1
+        flag = ""
+        if change > threshold + max(result['noise'], before.get('noise', 0)):
+            regressions.append(name)
+            flag = " slower"
+        print(f"{name:<26} {before['us_per_call']:>10.2f}us {result['us_per_call']:>10.2f}us {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Roster hot path benchmarks")
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="compare against results saved with --save")
+    parser.add_argument('only', nargs='*', help="only run benchmarks starting with these names")
+    args = parser.parse_args()
+    # fill_spots logs every call
+    logging.disable(logging.INFO)
+
+    results = run_all(args.only)
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({'python': sys.version.split()[0], 'machine': platform.machine(), 'results': results}, f,
+                      indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) more than {threshold:.0%} plus noise slower: "
+                  f"{', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,549 @@
+"""
+Signup storm: the real Trials cog, its selector and modals, driven end to end against a stub guild and an in-memory
+DynamoDB the way a guild hits a roster the moment it is announced. A raid lead opens the roster with /trial, every
+member then sends !su and !bu in a burst that tails off, some twice, some changing role, while the lead edits the
+roster with /modify in the middle of it. Optionally the roster is closed with /close afterwards.
+
+Reports throughput, command latency, event loop lag and the DynamoDB timings, then checks the rosters against what the
+bot told everyone: anyone told they were added but missing, on it without being told, on it twice, or saved to the
+database differently than memory is a failure and the exit code is 1.
+
+Run from the repository root with: python -m benchmarks.signup_storm
+A slower and less reliable database, several rosters at once and closing them afterwards:
+    python -m benchmarks.signup_storm --members 200 --rosters 3 --latency 0.02 --jitter 0.03 --throttle 0.05 --close
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+from time import perf_counter
+from types import SimpleNamespace
+
+from discord import Intents, InteractionResponded
+from discord.ext import commands
+from discord.ext.commands.view import StringView
+
+from aws import MemoryBackend, register_backend, close_clients
+from benchmarks.stubs import StubCategory, StubChannel, make_guild, base_id
+from cogs.trials import Trials
+from metrics import metrics
+from services import Catalog, RoleIndex, Librarian
+from services.catalog import read_languages
+
+tables = {'RosterDB': 'channelID', 'MapDB': 'key', 'ProgDB': 'key', 'DefaultDB': 'userID', 'CountDB': 'key'}
+rank_roles = {'first': 'Initiate', 'second': 'Veteran', 'third': 'Champion'}
+roster_roles = ('dps', 'healer', 'tank')
+slot_names = {'dps': ('dps', 'backup_dps'), 'healer': ('healers', 'backup_healers'),
+              'tank': ('tanks', 'backup_tanks')}
+
+
+class StormBot(commands.Bot):
+    """A bot that never connects, the guild it serves is the stub one"""
+
+    def __init__(self, guild, config):
+        super().__init__(command_prefix='!', case_insensitive=True, intents=Intents.none(), help_command=None)
+        self.guild = guild
+        self.config = config
+        self.language = read_languages('languages')
+        self.catalog = Catalog.compile(self.language)
+        self.role_index = RoleIndex()
+        self.command_errors = []
+
+    def get_guild(self, guild_id):
+        return self.guild if guild_id == self.guild.id else None
+
+    async def on_command_error(self, ctx, error):
+        self.command_errors.append((ctx.author.id, ctx.message.content, error))
+
+
+class StormContext(commands.Context):
+    """Keeps the replies instead of sending them"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.replies = []
+
+    async def send(self, content=None, **kwargs):
+        self.replies.append(content)
+
+
+class StormResponse:
+    """InteractionResponse that records what was sent, answering twice raises like Discord does"""
+
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+        self.messages = []
+        self.modal = None
+        self.view = None
+
+    def is_done(self):
+        return self._done
+
+    def _respond(self):
+        if self._done:
+            raise InteractionResponded(self._interaction)
+        self._done = True
+
+    async def send_message(self, content=None, *, view=None, **kwargs):
+        self._respond()
+        self.messages.append(content)
+        self.view = view
+
+    async def send_modal(self, modal):
+        self._respond()
+        self.modal = modal
+
+
+class StormInteraction:
+    def __init__(self, interaction_id, user, channel):
+        self.id = interaction_id
+        self.user = user
+        self.guild = channel.guild
+        self.channel = channel
+        self.channel_id = channel.id
+        self.command = None
+        self.extras = {}
+        self.response = StormResponse(self)
+
+
+class Storm:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.next_id = base_id + 700000
+        # (user id, channel id, command, replies, seconds) in the order commands finished
+        self.results = []
+        # (action, seconds, responses) for the lead's app commands
+        self.interactions = []
+        self.lag = []
+        self.backend = MemoryBackend(page_size=100, seed=args.seed)
+        self.endpoint = f"memory://signup-storm-{args.seed}"
+
+        self.guild = make_guild(args.members, role_names=('Raid Lead', 'Raid Leads', *rank_roles.values()),
+                                seed=args.seed)
+        self.category = StubCategory(base_id + 800000, self.guild)
+        self.admin_channel = StubChannel(base_id + 800001, 'raid-leads', self.guild)
+        for channel in (self.category, self.admin_channel):
+            self.guild.channels[channel.id] = channel
+        self.lead = self.guild.get_member(base_id)
+        if self.lead.get_role(self.guild.id + 1) is None:
+            self.lead.roles.append(self.guild.get_role(self.guild.id + 1))
+        self.members = [i for i in self.guild.members.values() if i is not self.lead]
+
+        self.bot = StormBot(self.guild, self.config())
+        self.cog = None
+        self.replies = {}
+
+    def config(self):
+        table = {'Endpoint': self.endpoint, 'Region': 'us-east-1'}
+        return {
+            'guild': self.guild.id,
+            'private': self.admin_channel.id,
+            'administration': {'private': self.admin_channel.id},
+            'ranks_channel': '<#1>',
+            'AWS': {'Access': 'none', 'Secret': 'none'},
+            'Dynamo': {name: dict(table, TableName=name) for name in tables},
+            'raids': {
+                'category': self.category.id,
+                'lead': 'Raid Lead',
+                'timezone': 'US/Central',
+                'ranks': {'base': '@everyone', **{tier: {'dps': name, 'tank': name, 'healer': name}
+                                                  for tier, name in rank_roles.items()}},
+                'roster_defaults': {'dps': 8, 'healers': 2, 'tanks': 2},
+                'dps_emoji': '<:DPS:1>', 'healer_emoji': '<:Healer:2>', 'tank_emoji': '<:Tank:3>',
+                'write_interval': self.args.write_interval,
+                'sort_delay': 0.5,
+                'live_status': False,
+            },
+        }
+
+    def new_id(self):
+        self.next_id += 1
+        return self.next_id
+
+    async def setup(self):
+        """Stores defaults for most members, then loads the cog and runs its startup the way on_ready does."""
+        for name, key in tables.items():
+            self.backend.create_table(name, key)
+        for member in self.members:
+            if self.rng.random() < self.args.defaults:
+                self.backend.put_item(TableName='DefaultDB', Item={
+                    'userID': {'S': str(member.id)}, 'default': {'S': self.rng.choice(roster_roles)}})
+        # Database speed only applies to the bot
+        self.backend.latency = self.args.latency
+        self.backend.jitter = self.args.jitter
+        self.backend.throttle_rate = self.args.throttle
+        register_backend(self.endpoint, self.backend)
+        # What login does before connecting, events can't be dispatched without it
+        await self.bot._async_setup_hook()
+
+        async def bulk_channel_update(guild_id, data, reason=None):
+            pass
+        self.bot.http.bulk_channel_update = bulk_channel_update
+
+        self.cog = Trials(self.bot)
+        await self.bot.add_cog(self.cog)
+        await self.cog.on_load_on_ready(self.bot)
+        for role in roster_roles:
+            self.replies[self.bot.catalog.get('english', 'replies.Roster.Added', role)] = role
+            self.replies[self.bot.catalog.get('english', 'replies.Roster.Full', role)] = role
+        self.replies[self.bot.catalog.get('english', 'replies.Roster.Removed')] = None
+
+    async def teardown(self):
+        await self.bot.remove_cog('Trials')
+        register_backend(self.endpoint, None)
+        close_clients()
+
+    # Members
+
+    async def command(self, member, channel, content):
+        """Invokes a prefix command like bot.process_commands does for a message, returns the replies."""
+        message = SimpleNamespace(id=self.new_id(), content=content, author=member, channel=channel,
+                                  guild=channel.guild, attachments=[], _state=self.bot._connection)
+        view = StringView(content)
+        view.skip_string(self.bot.command_prefix)
+        invoked_with = view.get_word()
+        ctx = StormContext(message=message, bot=self.bot, view=view, prefix=self.bot.command_prefix,
+                           invoked_with=invoked_with, command=self.bot.all_commands.get(invoked_with))
+        await self.bot.invoke(ctx)
+        return ctx.replies
+
+    def plan(self, member, withdraw):
+        """
+        [(seconds after the announcement, command)] for one member. Most arrive in the burst right after the
+        announcement and the rest trickle in over the window, some double send, some change their mind.
+        """
+        rng = self.rng
+        if rng.random() < 0.85:
+            arrival = min(rng.expovariate(1 / self.args.burst), self.args.window)
+        else:
+            arrival = rng.uniform(0, self.args.window)
+        role = rng.choices(roster_roles, weights=(70, 15, 15))[0]
+        word = rng.choice(('healer', 'heals', 'heal')) if role == 'healer' else role
+        which = rng.choices(('su', 'signup', 'bu', 'backup'), weights=(70, 10, 15, 5))[0]
+        note = rng.choice(('', ' Sets', ' can leave early', ' prog please'))
+        if rng.random() < 0.25:
+            # Relies on the stored default, or gets told to set one
+            content = f"!{which}{note}"
+        else:
+            content = f"!{which} {word}{note}"
+        steps = [(arrival, content)]
+        if rng.random() < 0.1:
+            steps.append((arrival + rng.uniform(0.05, 0.5), content))
+        if rng.random() < 0.1:
+            other = rng.choice([i for i in roster_roles if i != role])
+            steps.append((arrival + rng.uniform(1, 5), f"!su {other}"))
+        if withdraw and rng.random() < 0.08:
+            steps.append((arrival + rng.uniform(2, 8), "!wd"))
+        return sorted(steps)
+
+    async def member(self, member, channel, steps, started):
+        ready = started
+        for at, content in steps:
+            due = started + at
+            delay = due - perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Time from when the command was sent, or from when this member's previous one was answered
+            sent = max(due, ready)
+            replies = await self.command(member, channel, content)
+            ready = perf_counter()
+            self.results.append((member.id, channel.id, content, replies, ready - sent))
+
+    # Raid lead
+
+    async def submit(self, modal, user, channel, **values):
+        """Fills the named text inputs and submits the modal as Discord would, returns the submit interaction."""
+        for name, value in values.items():
+            getattr(modal, name)._value = value
+        interaction = StormInteraction(self.new_id(), user, channel)
+        try:
+            await modal.on_submit(interaction)
+        except Exception as e:
+            await modal.on_error(interaction, e)
+        return interaction
+
+    async def select(self, command, channel, **kwargs):
+        """Runs a roster selector command and picks the channel's roster, returns the modal it opens."""
+        interaction = StormInteraction(self.new_id(), self.lead, self.admin_channel)
+        await command.callback(self.cog, interaction, **kwargs)
+        view = interaction.response.view
+        select = view.new_roster_select
+        select._values = [next(label for label, key in select.channel_mapper.items() if int(key) == channel.id)]
+        chosen = StormInteraction(self.new_id(), self.lead, self.admin_channel)
+        if await view.interaction_check(chosen):
+            await select.callback(chosen)
+        return chosen.response.modal
+
+    async def answered(self, interaction, timeout=30):
+        """Waits for the listeners a modal dispatched to answer its interaction."""
+        started = perf_counter()
+        while not interaction.response.is_done():
+            if perf_counter() - started > timeout:
+                return False
+            await asyncio.sleep(0.005)
+        return True
+
+    async def create(self, index):
+        started = perf_counter()
+        interaction = StormInteraction(self.new_id(), self.lead, self.admin_channel)
+        await self.cog.create_roster.callback(self.cog, interaction)
+        date = 1767225600 + index * 86400 + self.rng.randint(0, 20) * 3600
+        submitted = await self.submit(interaction.response.modal, self.lead, self.admin_channel,
+                                      leader_trial=f"Lead{index},{self.rng.choice(('vAS', 'vSS', 'vKA', 'vLC'))}",
+                                      date=f"<t:{date}:f>", limit="0", role_nums="8,2,2", memo="None")
+        await self.answered(submitted)
+        self.interactions.append(('trial', perf_counter() - started, submitted.response.messages))
+        channel_id = interaction.response.modal.channel_id
+        return self.guild.get_channel(channel_id) if channel_id is not None else None
+
+    async def modify(self, channel, at, started):
+        """Partway through the storm the lead changes the memo and the role limits of the roster."""
+        await asyncio.sleep(max(0.0, started + at - perf_counter()))
+        begun = perf_counter()
+        modal = await self.select(self.cog.modify_roster, channel)
+        dps, healers, tanks = self.rng.randint(6, 10), self.rng.randint(1, 3), self.rng.randint(1, 3)
+        submitted = await self.submit(modal, self.lead, channel, role_nums=f"{dps},{healers},{tanks}",
+                                      memo=f"Bring food, updated at {at:.1f}s")
+        await self.answered(submitted)
+        self.interactions.append(('modify', perf_counter() - begun, submitted.response.messages))
+
+    async def close(self, channel):
+        """Closes the roster counting a run for everyone in main, returns who that was."""
+        roster = self.cog.cache.get(channel.id)
+        main = [*roster.dps, *roster.healers, *roster.tanks]
+        begun = perf_counter()
+        modal = await self.select(self.cog.close_roster, channel, leader=self.lead)
+        submitted = await self.submit(modal, self.lead, channel, confirm="y", runs="y", runscount="1")
+        await self.settle()
+        self.interactions.append(('close', perf_counter() - begun, submitted.response.messages))
+        return main
+
+    # Running
+
+    @staticmethod
+    async def settle():
+        """Waits for every event the bot dispatched to finish."""
+        while True:
+            pending = [i for i in asyncio.all_tasks() if i.get_name().startswith('discord.py:') and not i.done()]
+            if not pending:
+                return
+            await asyncio.wait(pending)
+
+    async def monitor(self, interval=0.01):
+        """Event loop lag, how late a short sleep wakes up."""
+        while True:
+            started = perf_counter()
+            await asyncio.sleep(interval)
+            self.lag.append(perf_counter() - started - interval)
+
+    async def run(self):
+        await self.setup()
+        withdraw = 'wd' in self.bot.all_commands
+        channels = [await self.create(i) for i in range(self.args.rosters)]
+        if any(channel is None for channel in channels):
+            raise RuntimeError(f"Roster creation failed: {self.interactions}")
+
+        monitor = asyncio.create_task(self.monitor())
+        started = perf_counter()
+        tasks = []
+        for channel in channels:
+            for member in self.members:
+                tasks.append(self.member(member, channel, self.plan(member, withdraw), started))
+            for _ in range(self.args.modifies):
+                tasks.append(self.modify(channel, self.rng.uniform(self.args.burst, self.args.window), started))
+        await asyncio.gather(*tasks)
+        await self.settle()
+        elapsed = perf_counter() - started
+        monitor.cancel()
+
+        await self.cog.writer.flush()
+        checks = {channel.id: await self.verify(channel) for channel in channels}
+        if self.args.close:
+            # user id: closed rosters they were a main on so far, each counted one run
+            closed = {}
+            for channel in channels:
+                main = await self.close(channel)
+                for user_id in main:
+                    closed[user_id] = closed.get(user_id, 0) + 1
+                checks[channel.id].update(await self.verify_close(channel, main, closed))
+        report = self.report(elapsed, checks, withdraw)
+        await self.teardown()
+        return report
+
+    # Checking
+
+    def expected(self, channel_id):
+        """{user id: role} from the bot's own replies, the last one each member got wins."""
+        expected = {}
+        # refused is the start of each reply that didn't put someone on the roster, with how often it was sent
+        anomalies = {'no_reply': 0, 'many_replies': 0, 'refused': {}}
+        for user_id, result_channel, content, replies, _ in self.results:
+            if result_channel != channel_id:
+                continue
+            if len(replies) == 0:
+                anomalies['no_reply'] += 1
+                continue
+            if len(replies) > 1:
+                anomalies['many_replies'] += 1
+            if replies[-1] not in self.replies:
+                reply = str(replies[-1])[:40]
+                anomalies['refused'][reply] = anomalies['refused'].get(reply, 0) + 1
+                continue
+            role = self.replies[replies[-1]]
+            if role is None:
+                expected.pop(str(user_id), None)
+            else:
+                expected[str(user_id)] = role
+        return expected, anomalies
+
+    async def verify(self, channel):
+        config = self.bot.config
+        roster = self.cog.cache.get(channel.id)
+        expected, anomalies = self.expected(channel.id)
+        actual = {}
+        duplicated = set()
+        over_limit = []
+        for role in roster_roles:
+            main_name, backup_name = slot_names[role]
+            main, backup = getattr(roster, main_name), getattr(roster, backup_name)
+            limit = {'dps': roster.dps_limit, 'healer': roster.healer_limit, 'tank': roster.tank_limit}[role]
+            if len(main) > limit:
+                over_limit.append(role)
+            for slots, is_main in ((main, True), (backup, False)):
+                for user_id in slots:
+                    if user_id in actual or roster.find_member(user_id) != (role, is_main):
+                        duplicated.add(user_id)
+                    actual[user_id] = role
+        if len(roster.member_ids()) != len(actual):
+            duplicated.update(set(roster.member_ids()) ^ set(actual))
+
+        stored = await Librarian.get_roster(channel.id, table_config=config['Dynamo']['RosterDB'],
+                                            credentials=config['AWS'])
+        placed = {user_id: roster.find_member(user_id) for user_id in roster.member_ids()}
+        saved = {} if stored is None else {user_id: stored.find_member(user_id) for user_id in stored.member_ids()}
+        return {
+            'signups': len(actual),
+            'main': sum(len(getattr(roster, slot_names[i][0])) for i in roster_roles),
+            'lost': sorted(set(expected) - set(actual)),
+            'phantom': sorted(set(actual) - set(expected)),
+            'wrong_role': sorted(i for i in set(expected) & set(actual) if expected[i] != actual[i]),
+            'duplicated': sorted(duplicated),
+            'over_limit': over_limit,
+            'db_mismatch': sorted(i for i in set(placed) | set(saved) if placed.get(i) != saved.get(i)) +
+                           ([] if stored is not None and stored.memo == roster.memo and
+                            stored.dps_limit == roster.dps_limit else ['details']),
+            **anomalies,
+        }
+
+    async def verify_close(self, channel, main, closed):
+        config = self.bot.config
+        roster = await Librarian.get_roster(channel.id, table_config=config['Dynamo']['RosterDB'],
+                                            credentials=config['AWS'])
+        roster_map = await Librarian.get_roster_map(table_config=config['Dynamo']['MapDB'],
+                                                    credentials=config['AWS']) or {}
+        counts = await asyncio.gather(*(Librarian.get_count(user_id, table_config=config['Dynamo']['CountDB'],
+                                                            credentials=config['AWS']) for user_id in main))
+        counts = dict(zip(main, counts))
+        return {
+            'close_left_roster': [i for i, left in (('cache', channel.id in self.cog.cache.rosters),
+                                                    ('db', roster is not None),
+                                                    ('map', str(channel.id) in roster_map),
+                                                    ('channel', self.guild.get_channel(channel.id) is not None))
+                                  if left],
+            'uncounted': [user_id for user_id, count in counts.items() if count.count != closed[user_id]],
+        }
+
+    def report(self, elapsed, checks, withdraw):
+        latencies = sorted(i[4] for i in self.results)
+        lag = sorted(self.lag)
+        failures = {name: sum(len(check.get(name, [])) for check in checks.values())
+                    for name in ('lost', 'phantom', 'wrong_role', 'duplicated', 'over_limit', 'db_mismatch',
+                                 'close_left_roster', 'uncounted')}
+        return {
+            'members': len(self.members),
+            'rosters': len(checks),
+            'commands': len(self.results),
+            'seconds': round(elapsed, 3),
+            'commands_per_sec': round(len(self.results) / elapsed, 1),
+            'latency_ms': summarize(latencies),
+            'loop_lag_ms': summarize(lag),
+            'interactions': [{'action': action, 'ms': round(seconds * 1000, 2), 'responses': responses}
+                             for action, seconds, responses in self.interactions],
+            'command_errors': len(self.bot.command_errors),
+            'withdraw': withdraw,
+            'dynamo_calls': dict(self.backend.calls),
+            'throttled': self.backend.throttled,
+            'writer': self.cog.writer.get_metrics(),
+            'rosters_checked': checks,
+            'failures': failures,
+        }
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(values):
+    """p50, p95, p99 and max in milliseconds of sorted values in seconds"""
+    return {name: round(percentile(values, fraction) * 1000, 2)
+            for name, fraction in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))}
+
+
+def show(report):
+    latency, lag = report['latency_ms'], report['loop_lag_ms']
+    print(f"{report['members']} members, {report['rosters']} roster(s), {report['commands']} commands in "
+          f"{report['seconds']}s, {report['commands_per_sec']} commands/s")
+    print(f"{'':<14} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'maxms':>8}")
+    for name, values in (('command', latency), ('loop lag', lag)):
+        print(f"{name:<14} {values['p50']:>8} {values['p95']:>8} {values['p99']:>8} {values['max']:>8}")
+    for interaction in report['interactions']:
+        print(f"/{interaction['action']:<13} {interaction['ms']:>8}ms {interaction['responses']}")
+    if not report['withdraw']:
+        print("!wd is not a Trials command, no withdrawals were sent")
+    print(f"command errors {report['command_errors']}, throttled {report['throttled']}, writer {report['writer']}")
+    for channel_id, check in report['rosters_checked'].items():
+        summary = {name: len(value) if isinstance(value, list) else value for name, value in check.items()}
+        print(f"roster {channel_id}: {summary}")
+    print()
+    print(metrics.report(prefix='dynamo', limit=10))
+    failed = {name: count for name, count in report['failures'].items() if count}
+    print(f"\n{'FAILED ' + str(failed) if failed else 'No lost, phantom or duplicated signups'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Signup storm against the Trials cog")
+    parser.add_argument('--members', type=int, default=200, help="guild members signing up")
+    parser.add_argument('--rosters', type=int, default=1, help="rosters announced at once, everyone signs up to each")
+    parser.add_argument('--burst', type=float, default=2.0, help="mean seconds after the announcement people arrive")
+    parser.add_argument('--window', type=float, default=10.0, help="seconds stragglers keep arriving for")
+    parser.add_argument('--modifies', type=int, default=2, help="/modify runs per roster during the storm")
+    parser.add_argument('--defaults', type=float, default=0.7, help="fraction of members with a default role")
+    parser.add_argument('--latency', type=float, default=0.01, help="seconds per database call")
+    parser.add_argument('--jitter', type=float, default=0.02, help="random extra seconds per database call")
+    parser.add_argument('--throttle', type=float, default=0.0, help="fraction of database calls throttled")
+    parser.add_argument('--write-interval', type=float, default=1.0, help="seconds between roster writer flushes")
+    parser.add_argument('--close', action='store_true', help="close the rosters with /close afterwards")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="also write the report to this JSON file")
+    args = parser.parse_args()
+    # Signups and retries log every call
+    logging.disable(logging.WARNING)
+    metrics.reset()
+
+    report = asyncio.run(Storm(args).run())
+    show(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+    if any(report['failures'].values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Stand-ins for the few parts of discord.Guild, Member and Role the roster code touches, so the benchmarks run without a
+connection to Discord. Everything is generated from a seed, runs are repeatable.
+"""
+import random
+from types import SimpleNamespace
+
+from models import Roster
+
+base_id = 100000000000000000
+roles = ('dps', 'healer', 'tank')
+trials = ('vAS', 'vCR', 'vSS', 'vKA', 'vRG', 'vDSR', 'vSE', 'vLC')
+
+
+class StubRole:
+    __slots__ = ('id', 'name', 'mention')
+
+    def __init__(self, role_id, name):
+        self.id = role_id
+        self.name = name
+        self.mention = f"<@&{role_id}>"
+
+
+class StubMember:
+    __slots__ = ('id', 'display_name', 'guild', 'roles', 'bot', 'mention')
+
+    def __init__(self, member_id, display_name, guild, member_roles):
+        self.id = member_id
+        self.display_name = display_name
+        self.guild = guild
+        self.roles = member_roles
+        self.bot = False
+        self.mention = f"<@{member_id}>"
+
+    def get_role(self, role_id):
+        for role in self.roles:
+            if role.id == role_id:
+                return role
+        return None
+
+
+class StubChannel:
+    """A text channel that keeps what was sent to it instead of sending it"""
+
+    def __init__(self, channel_id, name, guild, category=None, position=0):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        self.category = category
+        self.position = position
+        self.sent = []
+        self.mention = f"<#{channel_id}>"
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content if content is not None else kwargs)
+
+    async def edit(self, name=None, **kwargs):
+        if name is not None:
+            self.name = name
+
+    async def delete(self):
+        self.guild.channels.pop(self.id, None)
+        if self.category is not None:
+            self.category.text_channels.remove(self)
+
+
+class StubCategory:
+    def __init__(self, category_id, guild):
+        self.id = category_id
+        self.guild = guild
+        self.text_channels = []
+
+    async def create_text_channel(self, name):
+        self.guild.last_channel_id += 1
+        channel_id = self.guild.last_channel_id
+        channel = StubChannel(channel_id, name, self.guild, self, position=len(self.text_channels))
+        self.text_channels.append(channel)
+        self.guild.channels[channel_id] = channel
+        return channel
+
+
+class StubGuild:
+    def __init__(self, guild_id, role_names):
+        self.id = guild_id
+        self.roles = [StubRole(guild_id, '@everyone')] + [StubRole(guild_id + i + 1, name)
+                                                          for i, name in enumerate(role_names)]
+        self.members = {}
+        self.channels = {}
+        self.last_channel_id = base_id + 900000
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_role(self, role_id):
+        for role in self.roles:
+            if role.id == role_id:
+                return role
+        return None
+
+
+def make_guild(members, role_names=('Raider', 'Veteran', 'Raid Lead'), seed=0):
+    """A guild with the given number of members, each with a random display name and some of the roles"""
+    rng = random.Random(seed)
+    guild = StubGuild(base_id - 1, role_names)
+    for i in range(members):
+        member_roles = [guild.roles[0]] + rng.sample(guild.roles[1:], rng.randint(0, len(role_names)))
+        name = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 16)))
+        guild.members[base_id + i] = StubMember(base_id + i, name.capitalize(), guild, member_roles)
+    return guild
+
+
+def make_roster(signups, limit=None, seed=0, offset=0):
+    """
+    A roster with the given number of signups spread over the roles. Each role has room for a quarter of the signups
+    unless a limit is given, so the rest land in backup as they would on a busy roster.
+    """
+    rng = random.Random(seed)
+    limit = signups // 4 if limit is None else limit
+    roster = Roster(rng.choice(trials), f"<t:{1700000000 + rng.randint(0, 2000000)}:f>", "Leader", dps_limit=limit,
+                    healer_limit=limit, tank_limit=limit, role_limit=rng.randint(0, 3), memo="None")
+    for i in range(signups):
+        roster.add_member(user_id=str(base_id + offset + i), role=roles[i % 3], which='su', msg="Sets")
+    return roster
+
+
+def make_rosters(count, signups, members, seed=0):
+    """{channel id: Roster} for count rosters, signups drawn from a pool of members so people are on several rosters"""
+    rng = random.Random(seed)
+    rosters = {}
+    for i in range(count):
+        rosters[base_id + 500000 + i] = make_roster(signups, seed=seed + i, offset=rng.randint(0, max(0, members - signups)))
+    return rosters
+
+
+def make_bot(language):
+    """Just enough of a bot for EmbedFactory: the raids config emoji and the loaded languages"""
+    config = {'raids': {'dps_emoji': '<:DPS:1>', 'healer_emoji': '<:Healer:2>', 'tank_emoji': '<:Tank:3>'}}
+    return SimpleNamespace(config=config, language=language)
@@ -1,117 +1,158 @@
 #!/usr/bin/python3
 import asyncio
+import functools
+import json
+import sys
+from time import perf_counter
 from discord.ext import commands
 from discord import app_commands, Intents, Interaction, Game
+from discord.utils import MISSING
 from datetime import datetime
 import logging
-import shutil
-import yaml
 import os
-import re
 
 # Bot-Specific Imports
+from aws import close_clients
 from errors import *
-from services import Utilities
+from services import Utilities, RoleIndex, Catalog, ConfigManager
+from services.catalog import read_languages
+from services.log_pipeline import setup_logging, stop_logging, correlation_id, log_name
+from metrics import metrics, start_server
+
+
+class TracedTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        # Runs in the task that handles the app command, so everything it logs carries the interaction ID
+        correlation_id.set(f"{interaction.command.qualified_name if interaction.command else 'interaction'}:"
+                           f"{interaction.id}")
+        interaction.extras['started'] = perf_counter()
+        return True
+
+
+class InstrumentedBot(commands.Bot):
+    """
+    Every listener, including the custom events sent with bot.dispatch, is timed on its own. They're wrapped as they
+    are registered with @bot.event, add_listener or a cog's listeners, all public discord.py API.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # (listener, event): its timed wrapper, so remove_listener finds what add_listener registered
+        self.timed_listeners = {}
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def timed(coro, event_name):
+        @functools.wraps(coro)
+        async def timed_listener(*args, **kwargs):
+            with metrics.timer(f"event.{event_name}.{coro.__qualname__}"):
+                return await coro(*args, **kwargs)
+
+        return timed_listener
+
+    def event(self, coro):
+        if asyncio.iscoroutinefunction(coro):
+            coro = self.timed(coro, coro.__name__)
+        return super().event(coro)
+
+    def add_listener(self, func, name=MISSING):
+        name = func.__name__ if name is MISSING else name
+        if asyncio.iscoroutinefunction(func):
+            func = self.timed_listeners.setdefault((func, name), self.timed(func, name))
+        super().add_listener(func, name)
+
+    def remove_listener(self, func, name=MISSING):
+        name = func.__name__ if name is MISSING else name
+        super().remove_listener(self.timed_listeners.pop((func, name), func), name)
+
 
 intents = Intents.all()
 intents.members = True
-bot = commands.Bot(command_prefix='!', case_insensitive=True, intents=intents)
+bot = InstrumentedBot(command_prefix='!', case_insensitive=True, intents=intents, tree_cls=TracedTree)
 bot.remove_command('help')  # the help.py cog will replace the default command
-log_name = 'log.log'
+bot.role_index = RoleIndex()
+bot.config_manager = ConfigManager(bot)
+# Prints the startup timing report as JSON and shuts down once the bot is ready
+profile_startup = '--profile-startup' in sys.argv
+# phase: seconds, plus per cog and per load_on_ready listener seconds, filled in as the bot starts
+startup_times = {'phases': {}, 'cogs': {}, 'load_on_ready': {}}
+startup_reported = False
+login_started = None
 
 
 # Value Loaders
-def load_configurations():
-    full_config = {}
-    directory = os.path.join(os.getcwd(), 'config')
-    if not os.path.exists(directory):
-        logging.error(f"The directory {directory} does not exist.")
-        return
-    for filename in os.listdir(directory):  # Go through all the config files but ignore templates
-        if filename.endswith('.yaml') or filename.endswith('.yml'):
-            if not filename.lower().startswith('template'):
-                file_path = os.path.join(directory, filename)
+def load_languages():
+    """Function to load all the Language options for BOKBot"""
+    return read_languages("languages")
 
-                # Open and read the YAML file
-                with open(file_path, 'r') as file:
-                    file_content = yaml.safe_load(file)
 
-                    # Ensure the file content is a dictionary
-                    if isinstance(file_content, dict):
-                        full_config.update(file_content)
-                    else:
-                        logging.warning(f"Load Configuration Warning: {filename} is improperly formatted "
-                                        f"and doesn't make a dictionary")
-    return full_config
+async def load_cog(filename):
+    start = perf_counter()
+    try:
+        await bot.load_extension(f"cogs.{filename[:-3]}")
+        logging.info(f"Successfully loaded {filename}")
 
+    except Exception as e:
+        logging.info(f"Failed to load {filename}")
+        logging.error(f"cog load error: {str(e)}")
+    startup_times['cogs'][filename[:-3]] = round(perf_counter() - start, 4)
 
-def load_languages():
-    """Function to load all the Language options for BOKBot"""
-    languages = {}
-    for root, _, files in os.walk("languages"):
-        for file in files:
-            if file.endswith(".yaml"):
-                filepath = os.path.join(root, file)
-                language = os.path.basename(root)
-                section = os.path.splitext(file)[0]
 
-                if language not in languages:
-                    languages[language] = {}
+async def load_cogs():
+    """Load cogs from the cogs folder, the cogs don't depend on each other so their setup runs concurrently"""
+    await asyncio.gather(*(load_cog(filename) for filename in sorted(os.listdir('cogs'))
+                           if filename.endswith('.py') and not filename.startswith('_')))
 
-                with open(filepath, "r", encoding="utf-8") as f:
-                    data = yaml.safe_load(f)
-                    languages[language][section] = data
-    return languages
 
+async def hydrate():
+    """Runs every load_on_ready listener together and waits for them, timing each one"""
+    async def run(listener):
+        start = perf_counter()
+        try:
+            await listener(bot)
+        except Exception as e:
+            logging.error(f"load_on_ready error in {listener.__qualname__}: {str(e)}")
+        startup_times['load_on_ready'][listener.__qualname__] = round(perf_counter() - start, 4)
 
-async def load_cogs():
-    """Load cogs from the cogs folder"""
-    for filename in os.listdir('cogs'):
-        if filename.endswith('.py') and not filename.startswith('_'):
-            try:
-                await bot.load_extension(f"cogs.{filename[:-3]}")
-                logging.info(f"Successfully loaded {filename}")
+    await asyncio.gather(*(run(listener) for listener in bot.extra_events.get('on_load_on_ready', [])))
 
-            except Exception as e:
-                logging.info(f"Failed to load {filename}")
-                logging.error(f"cog load error: {str(e)}")
 
+def report_startup():
+    """Logs where startup time went, slowest first, and prints it as JSON when profiling"""
+    for section, times in startup_times.items():
+        ordered = sorted(times.items(), key=lambda i: i[1], reverse=True)
+        logging.info(f"Startup {section}: " + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in ordered))
+    if profile_startup:
+        print(json.dumps(startup_times, indent=2))
 
-async def startup_logging():
-    """Checks if there are logs from a bad shutdown"""
-    try:
-        date = datetime.now().strftime('%m-%d-%Y')
-        if os.path.exists(log_name):
-            file_name = f"log-{date}-crash.log"
-            os.makedirs("logs", exist_ok=True)
-            version = 1
-            while os.path.exists(os.path.join('logs', file_name)):
-                base_name, extension = os.path.splitext(file_name)
-                base_name = re.sub(r'\(\d{1,2}\)', '', base_name)
-                file_name = f"{base_name}({version}){extension}"
-                version += 1
-            path = os.path.join('logs', file_name)
-            # Quick fix for the handlers causing issues with moving the logs, so close them quickly before starting again.
-            for handler in logging.root.handlers[:]:
-                logging.root.removeHandler(handler)
-                handler.close()
-            shutil.move(log_name, path)
-        time = datetime.now().strftime('%I:%M:%S %p')
-        with open(log_name, 'w') as file:
-            file.write(f"Bot started at: {time} on {date}\n\n")
-
-        logging.basicConfig(
-            level=logging.INFO, format='%(asctime)s: %(message)s',
-            handlers=[
-                logging.FileHandler('log.log', mode='a'),
-                logging.StreamHandler()
-            ])  # , datefmt="%Y-%m-%d %H:%M:%S")
 
-    except Exception as e:
-        logging.error(f"I was unable to set up the new logging information: {str(e)}")
+def startup_logging():
+    """Starts the logging pipeline, the log from the last run is rolled over to log.log.1 rather than moved by hand"""
+    setup_logging(log_name)
+    date = datetime.now().strftime('%m-%d-%Y')
+    time = datetime.now().strftime('%I:%M:%S %p')
+    logging.info(f"Bot started at: {time} on {date}")
 
 
 # Events and Errors
+@bot.before_invoke
+async def trace_command(ctx):
+    # Prefix commands run in the task handling their message, everything they log carries the message ID
+    correlation_id.set(f"{ctx.command.qualified_name}:{ctx.message.id}")
+    ctx.started = perf_counter()
+
+
+@bot.after_invoke
+async def time_command(ctx):
+    # Called whether or not the command raised
+    metrics.observe(f"command.{ctx.command.qualified_name}", perf_counter() - ctx.started, error=ctx.command_failed)
+
+
+@bot.event
+async def on_app_command_completion(interaction: Interaction, command):
+    if 'started' in interaction.extras:
+        metrics.observe(f"app_command.{command.qualified_name}", perf_counter() - interaction.extras['started'])
+
+
 @bot.event
 async def on_command_error(ctx, error):
     if isinstance(error, commands.CommandNotFound):
@@ -135,7 +176,34 @@ async def on_command_error(ctx, error):
         logging.error(f"Generic Error: {str(error)}")
 
 
+@bot.event
+async def on_guild_role_create(role):
+    bot.role_index.refresh(role.guild)
+
+
+@bot.event
+async def on_guild_role_update(before, after):
+    if before.name != after.name:
+        bot.role_index.refresh(after.guild)
+        Utilities.forget_languages()
+
+
+@bot.event
+async def on_guild_role_delete(role):
+    bot.role_index.refresh(role.guild)
+    Utilities.forget_languages()
+
+
+@bot.event
+async def on_config_changed(changes):
+    if changes.touches('presence_message'):
+        await set_playing()
+
+
 async def on_tree_error(interaction: Interaction, error: app_commands.AppCommandError):
+    if 'started' in interaction.extras and interaction.command is not None:
+        metrics.observe(f"app_command.{interaction.command.qualified_name}",
+                        perf_counter() - interaction.extras['started'], error=True)
     if isinstance(error, app_commands.MissingPermissions):
         return await interaction.response.send_message(f"You're missing permissions to use that")
     elif isinstance(error, app_commands.MissingRole):
@@ -155,20 +223,60 @@ async def set_playing():
 
 @bot.event
 async def on_ready():
+    global startup_reported
     logging.info(f"Logged in as: {bot.user.name}")
+    if not startup_reported:
+        startup_times['phases']['login'] = round(perf_counter() - login_started, 4)
     await set_playing()
     logging.info('Bot is ready for use')
     logging.info('Sending out load_on_ready Event')
-    bot.dispatch('load_on_ready', bot)
+    start = perf_counter()
+    await hydrate()
+    if startup_reported:
+        return
+    startup_times['phases']['load_on_ready'] = round(perf_counter() - start, 4)
+    if bot.config.get('sync_on_startup', False):
+        start = perf_counter()
+        synced = await bot.tree.sync()
+        logging.info(f"Synced {len(synced)} command(s)")
+        startup_times['phases']['sync'] = round(perf_counter() - start, 4)
+    startup_reported = True
+    report_startup()
+    if profile_startup:
+        await bot.close()
 
 
 async def main():
+    global login_started
     async with bot:
-        await startup_logging()
-        bot.config = load_configurations()
+        startup_logging()
+        start = perf_counter()
+        bot.config_manager.load()
+        startup_times['phases']['config'] = round(perf_counter() - start, 4)
+        start = perf_counter()
         bot.language = load_languages()
+        # Checked once here so missing or mismatched translations show up at startup instead of as KeyErrors
+        bot.catalog = Catalog.compile(bot.language)
+        bot.catalog.report()
+        startup_times['phases']['languages'] = round(perf_counter() - start, 4)
+        start = perf_counter()
         await load_cogs()
-        await bot.start(bot.config['bot']['token'])
+        startup_times['phases']['cogs'] = round(perf_counter() - start, 4)
+        metrics_server = None
+        if bot.config.get('metrics_port'):
+            metrics_server = await start_server(bot.config['metrics_port'], bot.config.get('metrics_host', '127.0.0.1'))
+        login_started = perf_counter()
+        try:
+            await bot.start(bot.config['bot']['token'])
+        finally:
+            if metrics_server is not None:
+                await metrics_server.cleanup()
+    # Cogs have been unloaded by now so nothing else will reach for the pooled DynamoDB clients
+    close_clients()
+    logging.info(f"Bot stopped")
 
 
-asyncio.run(main())
+try:
+    asyncio.run(main())
+finally:
+    stop_logging()
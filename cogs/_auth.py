@@ -6,13 +6,6 @@ import time
 import secrets
 from pymongo import MongoClient
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
 auth = None
 length = 20
 
@@ -1,5 +1,4 @@
 import datetime
-import time
 import random
 import re
 import discord
@@ -14,13 +13,6 @@ from errors.boterrors import *
 import aio_pika
 import asyncio
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
 # Global variables for the MongoDB channels, set by set_channels function
 raids = None
 count = None
@@ -814,7 +806,7 @@ class TrialModal(discord.ui.Modal):
         for i in category.text_channels:
             if i.position >= 100: # Fix the rate_limit so only adjust channels we want to adjust
                 await i.edit(position=i.position)
-                time.sleep(1)
+                await asyncio.sleep(1)
     async def on_error(self, interaction: discord.Interaction, error: Exception) -> None:
         await interaction.response.send_message(f'I was unable to complete the command. Logs have more detail.')
         logging.error(f"Trial Creation/Modify Error: {str(error)}")
@@ -1235,7 +1227,7 @@ class Raids(commands.Cog, name="Raids"):
             await private_channel.send(f"New Roster Created from Website: {channel.mention}")
 
             try:
-                time.sleep(2)
+                await asyncio.sleep(2)
                 # Refresh category
                 category = guild.get_channel(self.bot.config["raids"]["category"])
 
@@ -1246,7 +1238,7 @@ class Raids(commands.Cog, name="Raids"):
                 for i in category.text_channels:
                     if i.position >= 100:
                         await i.edit(position=i.position)
-                        time.sleep(1)
+                        await asyncio.sleep(1)
             except Exception as e:
                 logging.error(f"New Roster Channel Sort Error: { str(e)}")
                 await private_channel.send(f"Unable to sort rosters, encountered an error.")
@@ -1279,7 +1271,7 @@ class Raids(commands.Cog, name="Raids"):
             for i in category.text_channels:
                 if i.position >= 100:
                     await i.edit(position=i.position)
-                    time.sleep(1)
+                    await asyncio.sleep(1)
 
             await private_channel.send(f"Roster {new_name} and Channel updated.")
         except Exception as e:
@@ -3,22 +3,13 @@ from discord.ext import commands, tasks
 import logging
 import asyncio
 import decor.perms as permissions
+from metrics import metrics
 import os
 import datetime
-import shutil
-import re
-import yaml
-from pymongo import MongoClient
+from services import LazyCollection
 import os
 import time
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
 scheduled_time = datetime.time(13, 0, 0, 0)
 
 
@@ -39,15 +30,13 @@ def gather_roles(guild, config):
     other = discord.utils.get(guild.roles, name=config["roles"]["other"])
     logging.info(f"Global Roles Set")
 
-def save_members_list(config, member_dict):
-    client = MongoClient(config['mongo'])
-    database = client['bot']
-    misc = database.misc
+async def save_members_list(config, member_dict):
+    misc = LazyCollection(config['mongo'], 'bot', 'misc')
     rec = {
         'members': 'list',
         'data': member_dict
     }
-    misc.update_one({'members': 'list'},  {'$set': rec})
+    await misc.call('update_one', {'members': 'list'},  {'$set': rec})
 
 class Admin(commands.Cog, name="Admin"):
     """Receives Administration commands"""
@@ -76,23 +65,11 @@ class Admin(commands.Cog, name="Admin"):
     async def shutdown(self, ctx: commands.Context):
         """Shut down the bot, Owner only"""
         try:
-            log_name = "log.log"
             date = datetime.datetime.now().strftime("%m-%d-%Y")
             time = datetime.datetime.now().strftime("%I:%M:%S %p")
             logging.info(f"Shutdown command received - {time} on {date}")
-            logging.shutdown()
             self.scheduled_good_morning.stop()
-            if os.path.exists(log_name):
-                file_name = f"log-{date}.log"
-                os.makedirs("logs", exist_ok=True)
-                version = 1
-                while os.path.exists(os.path.join("logs", file_name)):
-                    base_name, extension = os.path.splitext(file_name)
-                    base_name = re.sub(r'\(\d{1,2}\)', '', base_name)
-                    file_name = f"{base_name}({version}){extension}"
-                    version += 1
-                path = os.path.join("logs", file_name)
-                shutil.move(log_name, path)
+            # The log is flushed when bot.py stops the logging pipeline and rolled over on the next start
             await self.bot.close()
         except Exception as e:
             logging.error(f"Shutdown Error: {str(e)}")
@@ -172,15 +149,38 @@ class Admin(commands.Cog, name="Admin"):
         """Owner Only: Reloads the config following an update"""
         try:
             logging.info(f"Loading new config")
-            with open("config.yaml", 'r') as stream:
-                data_loaded = yaml.safe_load(stream)
-            self.bot.config = data_loaded
+            changes = self.bot.config_manager.reload()
             logging.info(f"New config loaded")
-            await ctx.send(f"Config loaded")
+            if changes:
+                await ctx.send(f"Config loaded, changed: {', '.join(sorted(changes.sections))}")
+            else:
+                await ctx.send(f"Config loaded, nothing changed")
         except Exception as e:
             logging.error(f"Config Reload Error: {str(e)}")
             await ctx.send(f"There was an issue reloading the config, check the logs for more info.")
 
+    @commands.command(name="perf", hidden=True)
+    @permissions.creator_only()
+    async def performance_report(self, ctx: commands.Context, prefix=None):
+        """Owner Only: Timings of commands, interactions, listeners and DB calls | `!perf [optional: prefix or reset]`"""
+        try:
+            if prefix == "reset":
+                metrics.reset()
+                await ctx.send("Timings reset")
+                return
+            report = metrics.report(prefix=prefix, limit=40)
+            # Sent in code blocks under the message length limit, split on whole lines
+            chunk = ""
+            for line in report.split("\n"):
+                if len(chunk) + len(line) > 1900:
+                    await ctx.send(f"```\n{chunk}```")
+                    chunk = ""
+                chunk += f"{line}\n"
+            await ctx.send(f"```\n{chunk}```")
+        except Exception as e:
+            logging.error(f"Perf Report Error: {str(e)}")
+            await ctx.send(f"There was an issue building the report, check the logs for more info.")
+
     @commands.command(name="sync", aliases=["resync", "synchronize", "rescynchronize"])
     @permissions.creator_only()
     async def sync_application_commands(self, ctx: commands.Context):
@@ -216,21 +216,20 @@ class Admin(commands.Cog, name="Admin"):
                                   f"saved information that is permanent, so any rosters you are on right now "
                                   f"will not be included in the data sent to you.")
 
-            client = MongoClient(self.bot.config['mongo'])
-            database = client['bot']
-            ranks = database.ranks
-            defaults = database.defaults
-            counts = database.count
+            # Read off the event loop, the client is shared with the other MongoDB cogs
+            ranks = LazyCollection(self.bot.config['mongo'], 'bot', 'ranks')
+            defaults = LazyCollection(self.bot.config['mongo'], 'bot', 'defaults')
+            counts = LazyCollection(self.bot.config['mongo'], 'bot', 'count')
 
             user_id = ctx.message.author.id
 
-            rec = defaults.find_one({'userID': user_id})
+            rec = await defaults.call('find_one', {'userID': user_id})
             if rec is None:
                 default = "No Default Set"
             else:
                 default = f"Default is set to: {rec['default']}"
 
-            rec = ranks.find_one({'userID': user_id})
+            rec = await ranks.call('find_one', {'userID': user_id})
             if rec is None:
                 rank = "No Rankings Done"
             else:
@@ -245,7 +244,7 @@ class Admin(commands.Cog, name="Admin"):
                        f"420 Count: {rec['four_twenty']}\n" \
                        f"Boob Count: {rec['boob']}"
 
-            rec = counts.find_one({'userID': user_id})
+            rec = await counts.call('find_one', {'userID': user_id})
             if rec is None:
                 count = "No Raid Counts Recorded"
             else:
@@ -299,6 +298,11 @@ class Admin(commands.Cog, name="Admin"):
     async def on_ready(self):
         gather_roles(self.bot.get_guild(self.bot.config["guild"]), self.bot.config)
 
+    @commands.Cog.listener()
+    async def on_config_changed(self, changes):
+        if changes.touches('roles', 'guild'):
+            gather_roles(self.bot.get_guild(self.bot.config["guild"]), self.bot.config)
+
     @commands.Cog.listener()
     async def on_member_join(self, member):
         try:
@@ -353,7 +357,7 @@ class Admin(commands.Cog, name="Admin"):
             members_dict = {}
             for member in guild.members:
                 members_dict[str(member.id)] = member.display_name
-            save_members_list(self.bot.config, members_dict)
+            await save_members_list(self.bot.config, members_dict)
 
         except Exception as e:
             logging.error(f"Members Dict Update Task Error: {str(e)}")
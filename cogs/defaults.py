@@ -1,15 +1,8 @@
 import discord
 from discord.ext import commands
 import logging
-from pymongo import MongoClient
 import decor.perms as permissions
-
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
+from services import LazyCollection
 
 # Connect and get values from MongoDB
 
@@ -17,11 +10,9 @@ global defaults
 
 
 def set_channels(config):
-    """Function to set the MongoDB information on cog load"""
+    """Function to set the MongoDB information on cog load, the connection is made on first use"""
     global defaults
-    client = MongoClient(config['mongo'])
-    database = client['bot']  # Or do it with client.PyTest, accessing collections works the same way.
-    defaults = database.defaults
+    defaults = LazyCollection(config['mongo'], 'bot', 'defaults')
 
 
 class Defaults(commands.Cog, name="Defaults"):
@@ -31,6 +22,11 @@ class Defaults(commands.Cog, name="Defaults"):
         self.bot = bot
         set_channels(self.bot.config)
 
+    @commands.Cog.listener()
+    async def on_config_changed(self, changes):
+        if changes.touches('mongo'):
+            set_channels(self.bot.config)
+
     @commands.command(name="setdef")
     @permissions.has_raid_lead()
     async def admin_set_default_role(self, ctx: commands.Context, m: discord.Member, role="check"):
@@ -4,13 +4,6 @@ import logging
 
 from services import Utilities
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
 
 last4z = []
 last4t = []
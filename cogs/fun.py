@@ -6,27 +6,17 @@ import datetime
 import time
 import calendar
 import random
-from pymongo import MongoClient
 
-from services import Utilities, Librarian
-
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
+from services import Utilities, Librarian, LazyCollection
 
 global ranks
 
 
 
 def set_channels(config):
-    """Function to set the MongoDB information on cog load"""
+    """Function to set the MongoDB information on cog load, the connection is made on first use"""
     global ranks
-    client = MongoClient(config['mongo'])
-    database = client['bot']
-    ranks = database.ranks
+    ranks = LazyCollection(config['mongo'], 'bot', 'ranks')
 
 
 def update_db(user_id, info):
@@ -89,6 +79,11 @@ class Fun(commands.Cog, name="Fun"):
         self.bot = bot
         set_channels(self.bot.config)
 
+    @commands.Cog.listener()
+    async def on_config_changed(self, changes):
+        if changes.touches('mongo'):
+            set_channels(self.bot.config)
+
     @commands.command(name="8ball")
     async def magic_eight_ball(self, ctx: commands.context):
         """Answers a question like a magic 8-ball"""
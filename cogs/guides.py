@@ -2,13 +2,6 @@ import discord
 from discord.ext import commands
 import logging
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
 
 class Guides(commands.Cog, name="Guides"):
     """Receives trial guide commands"""
@@ -5,13 +5,6 @@ from discord.ext import commands
 from services import Utilities
 from difflib import ndiff
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
 mapping = None
 
 async def send_embed(ctx, embed):
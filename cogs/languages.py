@@ -0,0 +1,83 @@
+from discord.ext import commands
+from discord import Member
+import logging
+
+from services import Utilities, Librarian
+from services.utilities import languages
+
+
+class Languages(commands.Cog, name="Languages"):
+    """Commands related to the language the bot replies to you in"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    def table_config(self):
+        """The LanguageDB table is optional, without it languages only come from roles."""
+        return self.bot.config['Dynamo'].get('LanguageDB')
+
+    @commands.Cog.listener()
+    async def on_load_on_ready(self, bot):
+        await self.load_overrides()
+
+    @commands.Cog.listener()
+    async def on_config_changed(self, changes):
+        if changes.touches('Dynamo.LanguageDB', 'AWS'):
+            await self.load_overrides()
+
+    async def load_overrides(self):
+        if self.table_config() is None:
+            # The table may have been taken out of the config
+            Utilities.load_language_overrides({})
+            return
+        try:
+            overrides = await Librarian.get_languages(table_config=self.table_config(),
+                                                      credentials=self.bot.config['AWS'])
+            Utilities.load_language_overrides(overrides)
+            logging.info(f"Found and Loaded {len(overrides)} Language Preferences")
+        except Exception as e:
+            logging.error(f"Language Preference Load Error: {str(e)}")
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: Member, after: Member):
+        if before.roles != after.roles:
+            Utilities.forget_language(after.id)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: Member):
+        Utilities.forget_language(member.id)
+
+    @commands.command(name="language", aliases=["lang"])
+    async def set_language(self, ctx: commands.Context, choice="check"):
+        """Set, check or reset the language I reply to you in | `!language [optional: language or reset]`"""
+        language = Utilities.get_language(ctx.author)
+        replies = self.bot.language[language]['replies']
+        choice = choice.lower()
+        try:
+            if choice == "check":
+                await ctx.reply(f"{replies['Language']['Answer'] % language}")
+                return
+            if self.table_config() is None:
+                await ctx.reply(f"{Utilities.format_error(language, replies['Language']['NotEnabled'])}")
+                return
+            if choice == "reset":
+                await Librarian.delete_language(ctx.author.id, table_config=self.table_config(),
+                                                credentials=self.bot.config['AWS'])
+                Utilities.set_language_override(ctx.author.id, None)
+                language = Utilities.get_language(ctx.author)
+                await ctx.reply(f"{self.bot.language[language]['replies']['Language']['Reset'] % language}")
+            elif choice.capitalize() in languages and choice in self.bot.language:
+                await Librarian.put_language(ctx.author.id, choice, table_config=self.table_config(),
+                                             credentials=self.bot.config['AWS'])
+                Utilities.set_language_override(ctx.author.id, choice)
+                await ctx.reply(f"{self.bot.language[choice]['replies']['Language']['Set'] % choice}")
+            else:
+                available = ", ".join(i for i in self.bot.language)
+                await ctx.reply(f"{Utilities.format_error(language, replies['Language']['BadLanguageError'] % available)}")
+        except Exception as e:
+            await ctx.reply(f"{Utilities.format_error(language, replies['DBConError'])}")
+            logging.error(f"Language Set Error: {str(e)}")
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Languages(bot))
@@ -2,54 +2,44 @@ import discord
 from discord.ext import commands
 import logging
 import decor.perms as permissions
-from pymongo import MongoClient
-
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
+from services import LazyCollection
 
 roles_info = None
 agree_role = None
 recruits_role = None
+misc = None
 
 
-def set_roles_info(bot):
-    """Function to set the role information on cog load"""
+async def set_roles_info(bot):
+    """Function to set the role information on cog load, MongoDB is read off the event loop"""
     global roles_info
     global agree_role
     global recruits_role
+    global misc
     guild = bot.get_guild(bot.config['guild'])
     recruits_role = discord.utils.get(guild.roles, name=bot.config["roles"]["default"])
     agree_role = discord.utils.get(guild.roles, name=bot.config["roles"]["unlock"])
-    client = MongoClient(bot.config['mongo'])
-    database = client.bot
-    misc = database.misc
-    roles_info = misc.find_one({'roles': "ids"})
+    misc = LazyCollection(bot.config['mongo'], 'bot', 'misc')
+    roles_info = await misc.call('find_one', {'roles': "ids"})
     if roles_info is None:
         roles_info = {}
         return
     roles_info = roles_info["data"]
 
 
-def save_roles_info(config):
+async def save_roles_info():
     """Function to save new channels information"""
     global roles_info
-    client = MongoClient(config['mongo'])
-    database = client.bot
-    misc = database.misc
-    old_rec = misc.find_one({'roles': "ids"})
+    old_rec = await misc.call('find_one', {'roles': "ids"})
     if old_rec is not None:
         new_rec = {'$set': {'data': roles_info}}
-        misc.update_one({'roles': "ids"}, new_rec)
+        await misc.call('update_one', {'roles': "ids"}, new_rec)
     else:
         rec = {
             'roles': "ids",
             'data': roles_info
         }
-        misc.insert_one(rec)
+        await misc.call('insert_one', rec)
 
 class Roles(commands.Cog, name="Roles"):
     """Commands related to Discord roles"""
@@ -59,9 +49,15 @@ class Roles(commands.Cog, name="Roles"):
 
     @commands.Cog.listener()
     async def on_load_on_ready(self, bot):
-        set_roles_info(bot)
+        await set_roles_info(bot)
         logging.info(f"Roles Cog Roles Set")
 
+    @commands.Cog.listener()
+    async def on_config_changed(self, changes):
+        if changes.touches('roles', 'guild', 'mongo'):
+            await set_roles_info(self.bot)
+            logging.info(f"Roles Cog Roles Set")
+
 
     @commands.command(name="agree")
     async def agree(self, ctx: commands.Context):
@@ -258,7 +254,7 @@ class Roles(commands.Cog, name="Roles"):
             global roles_info
             roles_info = new_roles_info
 
-            save_roles_info(self.bot.config)
+            await save_roles_info()
 
         except Exception as e:
             await ctx.send("Unable to setup messages and roles.")
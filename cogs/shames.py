@@ -4,13 +4,6 @@ import logging
 import asyncio
 import random
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
 
 class Shames(commands.Cog, name="Shames"):
     """See peoples shames"""
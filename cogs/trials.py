@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 import random
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands, Interaction, utils, TextStyle, Embed, Color, Member, Role, User
 import logging
 import asyncio
@@ -10,60 +10,176 @@ import decor as permissions
 from errors import *
 from modals import *
 from models import Roster, Count
-from services import Utilities, RosterExtended, Librarian, EmbedFactory
+from services import Utilities, RosterExtended, Librarian, EmbedFactory, RosterWriter, RosterCache, \
+    ChannelSorter, StatusCache, StatusBoard, LimitsRegistry, Snapshot
 from ui import RosterSelector
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
-roster_map = {}
-rosters = {}
-limits = []
-
 
 class Trials(commands.Cog, name="Trials"):
     """Commands related to Trials And Rosters"""
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-
+        self.cache = RosterCache(bot)
+        self.bot.roster_cache = self.cache
+        # Roster limits and their roles, loaded once and reloaded when the prog roles change.
+        self.limits = LimitsRegistry(bot)
+        self.bot.limits = self.limits
+        # Signups only change memory, the writer saves the latest state of each changed roster on an interval.
+        self.writer = RosterWriter(bot, self.cache.get)
+        self.bot.roster_writer = self.writer
+        # New and changed rosters ask for a sort, bursts of them are reordered together.
+        self.sorter = ChannelSorter(bot, self.cache.get)
+        self.bot.channel_sorter = self.sorter
+        # Status embeds are only rebuilt after something shown in them changes.
+        self.status_cache = StatusCache()
+        self.bot.status_cache = self.status_cache
+        # Opt-in, roster channels keep a pinned status message that is edited after changes.
+        self.live_status = self.bot.config['raids'].get('live_status', False)
+        self.status_board = StatusBoard(bot, self.render_board_status,
+                                        self.bot.catalog.get('english', 'ui.Status.Footer'))
+        self.bot.status_board = self.status_board
+        # Opt-in, a local snapshot of the rosters lets restarts and reloads serve signups before the database is read.
+        path = self.bot.config['raids'].get('snapshot')
+        self.snapshot = Snapshot(path) if path else None
+        self.snapshot_contents = None
+        self.reconcile_task = None
+        # Seconds before retrying a failed reconcile, doubling up to the maximum
+        self.reconcile_retry = (1, 60)
+
+    async def cog_load(self):
+        self.flush_rosters.change_interval(seconds=self.bot.config['raids'].get('write_interval', 5))
+        self.flush_rosters.start()
+        if self.live_status:
+            self.refresh_status.change_interval(seconds=self.bot.config['raids'].get('status_interval', 5))
+            self.refresh_status.start()
+        if self.snapshot is not None:
+            self.save_snapshot.change_interval(seconds=self.bot.config['raids'].get('snapshot_interval', 60))
+            self.save_snapshot.start()
+
+    async def cog_unload(self):
+        # Runs on reload and shutdown, nothing marked dirty can be left behind.
+        self.flush_rosters.stop()
+        self.refresh_status.cancel()
+        self.sorter.stop()
+        await self.writer.flush()
+        logging.info(f"Roster Writer Stopped: {self.writer.get_metrics()}")
+        if self.snapshot is not None:
+            self.save_snapshot.cancel()
+            if self.reconcile_task is not None and not self.reconcile_task.done():
+                # Memory hasn't been checked against the database yet, so changes to restored rosters are still held.
+                # They go in the snapshot with what each roster was restored as and are checked on the next start.
+                self.reconcile_task.cancel()
+            await self.write_snapshot()
+
+    @tasks.loop(seconds=5)
+    async def flush_rosters(self):
+        await self.writer.flush()
+
+    @tasks.loop(seconds=5)
+    async def refresh_status(self):
+        await self.status_board.refresh()
+
+    @tasks.loop(seconds=60)
+    async def save_snapshot(self):
+        await self.write_snapshot()
+
+    async def write_snapshot(self):
+        """Write the snapshot if anything in it changed since the last one, the file is written off the event loop."""
+        if len(self.cache.rosters) == 0 and self.limits.progs is None:
+            # Nothing was loaded, don't replace a good snapshot with an empty one
+            return
+        try:
+            contents = Snapshot.encode(self.cache.rosters, self.cache.roster_map, self.limits.progs,
+                                       self.cache.restored)
+            if contents.partition("\n")[2] == self.snapshot_contents:
+                return
+            await asyncio.to_thread(self.snapshot.write, contents)
+            self.snapshot_contents = contents.partition("\n")[2]
+        except Exception as e:
+            logging.error(f"Snapshot Write Error: {str(e)}")
+
+    async def reconcile(self):
+        """
+        Checks the restored rosters and prog roles against the database after serving from the snapshot. Retried with
+        backoff until it succeeds, restored rosters aren't written until then as the database may hold newer copies.
+        """
+        delay, max_delay = self.reconcile_retry
+        while True:
+            try:
+                changed = await self.cache.reconcile(self.writer.is_dirty, self.writer.mark_dirty)
+                break
+            except Exception as e:
+                logging.error(f"Snapshot Reconcile Error: {str(e)}, retrying in {delay}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_delay)
+        self.writer.release()
+        try:
+            await self.limits.load()
+            self.status_cache.clear()
+            if self.live_status:
+                for channel_id in changed:
+                    if channel_id in self.cache.rosters:
+                        self.status_board.mark(channel_id)
+            await self.write_snapshot()
+        except Exception as e:
+            logging.error(f"Snapshot Reconcile Error: {str(e)}")
+
+    def roster_changed(self, channel_id):
+        """Call after any change to a cached roster so the version moves on and the change gets saved."""
+        self.cache.touch(channel_id)
+        self.writer.mark_dirty(channel_id)
+        if self.live_status:
+            self.status_board.mark(channel_id)
+
+    def render_status(self, channel_id, roster: Roster, guild, user_language):
+        """Returns the status embed for a roster, from the status cache unless the roster changed since it was built."""
+        embed = self.status_cache.get(channel_id, user_language, roster.version)
+        if embed is not None:
+            return embed
+
+        ui_lang = self.bot.language[user_language]["ui"]
+        roles_req = self.limits.mention(roster.role_limit)
+
+        embed = EmbedFactory.create_status(roster=roster, bot=self.bot, language=ui_lang['Status'],
+                                           roles_req=roles_req, guild=guild)
+        self.status_cache.put(channel_id, user_language, roster.version, embed)
+        return embed
+
+    def render_board_status(self, channel):
+        """The pinned status message is shared by everyone in the channel, so like new roster posts it is in english."""
+        roster = self.cache.get(channel.id)
+        if roster is None:
+            return None
+        return self.render_status(channel.id, roster, channel.guild, "english")
 
     @commands.Cog.listener()
     async def on_load_on_ready(self, bot):
-        global roster_map
-        global rosters
-        global limits
-        fetched = Librarian.get_roster_map(table_config=bot.config['Dynamo']["MapDB"], credentials=bot.config["AWS"])
-        if fetched is not None:
-            roster_map = fetched
-            logging.info(f"Found and Loaded Roster Map")
-        else:
-            logging.info(f"No Roster Map Found")
-        fetched = Librarian.get_all_rosters(table_config=bot.config['Dynamo']["RosterDB"],
-                                            credentials=bot.config["AWS"])
-        if fetched is not None:
-            rosters = fetched
-            logging.info(f"Found and Loaded Rosters")
-        else:
-            logging.info(f"No Rosters Found")
-        fetched = RosterExtended.get_limits(table_config=self.bot.config['Dynamo']['ProgDB'],
-                                            roles_config=self.bot.config['raids']['ranks'],
-                                            creds_config=self.bot.config['AWS'])
-        if fetched is not None:
-            limits = fetched
-            logging.info(f"Found and Loaded Limits")
-        else:
-            logging.info(f"No Limits Found")
+        if self.reconcile_task is not None and not self.reconcile_task.done():
+            # Reconnected while the snapshot is still being checked, reconcile brings memory up to date
+            return
+        if self.snapshot is not None and len(self.cache.rosters) == 0:
+            restored = await asyncio.to_thread(self.snapshot.read)
+            if restored is not None:
+                rosters, roster_map, progs, bases = restored
+                self.cache.restore(rosters, roster_map, bases)
+                self.writer.hold(rosters)
+                # No prog roles still leaves the ranks to check signups against until reconcile loads them
+                self.limits.restore(progs)
+                self.reconcile_task = asyncio.create_task(self.reconcile())
+                return
+        # Runs again after every reconnect, signups acknowledged but not saved yet must survive the reload
+        await self.writer.flush()
+        await self.cache.load(self.writer.is_dirty)
+        await self.limits.load()
+        if self.snapshot is not None:
+            await self.write_snapshot()
 
     @commands.Cog.listener()
     async def on_update_rosters_data(self, channel_id, channel_name, update_roster: Roster, method,
                                      interaction: Interaction, user_language):
-        global rosters
-        global roster_map
+        rosters = self.cache.rosters
+        roster_map = self.cache.roster_map
 
         update_roster_db = False
         update_roster_map_db = False
@@ -74,9 +190,8 @@ class Trials(commands.Cog, name="Trials"):
         if method == "create_update":
 
             if channel_id not in rosters.keys():
-                rosters[channel_id] = update_roster
+                self.cache.add(channel_id, update_roster, channel_name)
                 logging.info(f"Loaded New Roster Into Memory")
-                roster_map[str(channel_id)] = channel_name
                 logging.info(f"Loaded New Roster Map")
                 update_roster_db = True
                 update_roster_map_db = True
@@ -88,49 +203,13 @@ class Trials(commands.Cog, name="Trials"):
                 if update_roster.did_values_change(rosters[channel_id]):
                     update_roster_db = True
 
-                # Account for role changes where there is overflow
-                if rosters[channel_id].dps_limit > update_roster.dps_limit:
-                    to_remove = rosters[channel_id].dps_limit - update_roster.dps_limit
-                    # Get the last n items from the main roster
-                    reversed_roster = list(rosters[channel_id].dps.items())[-to_remove:]
-                    # Remove these items from the main roster
-                    for user_id, _ in reversed_roster:
-                        del rosters[channel_id].dps[user_id]
-                    # Insert these items at the beginning of the backup roster
-                    for user_id, msg in reversed(reversed_roster):
-                        rosters[channel_id].backup_dps.update({user_id: msg})
-                    logging.info(f"Moved overflow DPS to backup")
-
-                if rosters[channel_id].healer_limit > update_roster.healer_limit:
-                    to_remove = rosters[channel_id].healer_limit - update_roster.healer_limit
-                    # Get the last n items from the main roster
-                    reversed_roster = list(rosters[channel_id].healers.items())[-to_remove:]
-                    # Remove these items from the main roster
-                    for user_id, _ in reversed_roster:
-                        del rosters[channel_id].healers[user_id]
-                    # Insert these items at the beginning of the backup roster
-                    for user_id, msg in reversed(reversed_roster):
-                        rosters[channel_id].backup_healers.update({user_id: msg})
-                    logging.info(f"Moved overflow Healers to backup")
-
-                if rosters[channel_id].tank_limit > update_roster.tank_limit:
-                    to_remove = rosters[channel_id].tank_limit - update_roster.tank_limit
-                    # Get the last n items from the main roster
-                    reversed_roster = list(rosters[channel_id].tanks.items())[-to_remove:]
-                    # Remove these items from the main roster
-                    for user_id, _ in reversed_roster:
-                        del rosters[channel_id].tanks[user_id]
-                    # Insert these items at the beginning of the backup roster
-                    for user_id, msg in reversed(reversed_roster):
-                        rosters[channel_id].backup_tanks.update({user_id: msg})
-                    logging.info(f"Moved overflow Tanks to backup")
+                # Account for role changes where there is overflow, extra main signups are moved to backup
+                rosters[channel_id].set_limits(update_roster.dps_limit, update_roster.healer_limit,
+                                               update_roster.tank_limit)
 
                 rosters[channel_id].trial = update_roster.trial
                 rosters[channel_id].date = update_roster.date
                 rosters[channel_id].leader = update_roster.leader
-                rosters[channel_id].dps_limit = update_roster.dps_limit
-                rosters[channel_id].tank_limit = update_roster.tank_limit
-                rosters[channel_id].healer_limit = update_roster.healer_limit
                 rosters[channel_id].role_limit = update_roster.role_limit
                 rosters[channel_id].memo = update_roster.memo
                 logging.info(f"Memory Roster Values Updated")
@@ -140,8 +219,10 @@ class Trials(commands.Cog, name="Trials"):
                 update_roster_map_db = True
 
         elif method == "close":
-            del roster_map[str(channel_id)]
-            del rosters[str(channel_id)]
+            self.cache.remove(channel_id)
+            self.writer.discard(channel_id)
+            self.status_cache.invalidate(channel_id)
+            self.status_board.discard(channel_id)
             update_roster_map_db = True
             logging.info(f"Roster removed from Map and Roster List.")
 
@@ -149,26 +230,25 @@ class Trials(commands.Cog, name="Trials"):
             if update_roster_db:
                 try:
                     logging.info(f"Saving Roster to DB")
-                    Librarian.put_roster(channel_id, rosters[channel_id].get_roster_data(),
-                                         table_config=self.bot.config['Dynamo']["RosterDB"],
-                                         credentials=self.bot.config["AWS"])
+                    self.roster_changed(channel_id)
+                    await self.writer.flush(channel_id)
                     logging.info(f"Saved Roster to DB")
 
                 except Exception as e:
                     await interaction.response.send_message(
-                        f"{Utilities.format_error(user_language, self.bot.language[user_language]['replies']['TrialModify']['DBSaveError'])}")
+                        f"{self.bot.catalog.error(user_language, 'replies.TrialModify.DBSaveError')}")
                     logging.error(f"Roster Save DynamoDB Error: {str(e)}")
 
             if update_roster_map_db:
                 try:
                     logging.info(f"Saving DB Roster Map")
-                    Librarian.put_roster_map(data=roster_map,
-                                             table_config=self.bot.config['Dynamo']["MapDB"],
-                                             credentials=self.bot.config["AWS"])
+                    await Librarian.put_roster_map(data=roster_map,
+                                                   table_config=self.bot.config['Dynamo']["MapDB"],
+                                                   credentials=self.bot.config["AWS"])
                     logging.info(f"Updated DB Roster Map")
                 except Exception as e:
                     await interaction.response.send_message(
-                        f"{Utilities.format_error(user_language, self.bot.language[user_language]['replies']['TrialModify']['DBSaveError'])}")
+                        f"{self.bot.catalog.error(user_language, 'replies.TrialModify.DBSaveError')}")
                     logging.error(f"Roster Map Save DynamoDB Error: {str(e)}")
         except Exception as e:
             logging.info(f"Error on Saving Roster to DB: {str(e)}")
@@ -177,35 +257,125 @@ class Trials(commands.Cog, name="Trials"):
 
         if is_new_roster:
             await interaction.response.send_message(
-                f"{self.bot.language[user_language]['replies']['TrialModify']['NewRosterCreated'] % channel_name}")
+                f"{self.bot.catalog.get(user_language, 'replies.TrialModify.NewRosterCreated', channel_name)}")
             return
 
         elif method == "create_update" and not is_new_roster:
             await interaction.response.send_message(
-                f"{self.bot.language[user_language]['replies']['TrialModify']['ExistingUpdated'] % channel_name}")
+                f"{self.bot.catalog.get(user_language, 'replies.TrialModify.ExistingUpdated', channel_name)}")
             return
 
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: Member):
+        """Removes someone who left the server from every roster they are on."""
+        try:
+            channels = self.cache.get_user_rosters(member.id)
+            if len(channels) == 0:
+                return
+            alert_channel = member.guild.get_channel(self.bot.config['administration']['private'])
+            removed = []
+            for channel_id in channels:
+                found = self.cache.get(channel_id).remove_member(member.id)
+                if found is None:
+                    continue
+                role, main = found
+                self.roster_changed(channel_id)
+                channel = member.guild.get_channel(channel_id)
+                name = channel.name if channel is not None else self.cache.roster_map.get(str(channel_id), channel_id)
+                removed.append(f"{role}{'' if main else ' (backup)'} on {name}")
+            # Saved with the next flush, so a prune of many members goes out as batched writes
+            logging.info(f"Removed departed user {member.id} from {len(removed)} roster(s)")
+            if alert_channel is not None and len(removed) > 0:
+                await alert_channel.send(f"{member.name} - {member.display_name} left the server and was removed "
+                                         f"from: {', '.join(removed)}")
+        except Exception as e:
+            logging.error(f"User Roster Exit Removal Error: {str(e)}")
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: Member, after: Member):
+        """Status embeds show display names, drop the ones for rosters someone is on when theirs changes."""
+        if before.display_name != after.display_name:
+            for channel_id in self.cache.get_user_rosters(after.id):
+                self.status_cache.invalidate(channel_id)
+                if self.live_status:
+                    self.status_board.mark(channel_id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: Role, after: Role):
+        if before.name != after.name:
+            self.limits.resolve()
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: Role):
+        self.limits.resolve()
+
+    @staticmethod
+    def restart_loop(loop):
+        if loop.is_running():
+            loop.restart()
+        else:
+            loop.start()
+
+    @commands.Cog.listener()
+    async def on_config_changed(self, changes):
+        """Applies changes to the raids config without a cog reload, only what depends on the changed values"""
+        raids = self.bot.config['raids']
+        if changes.touches('raids.write_interval'):
+            self.flush_rosters.change_interval(seconds=raids.get('write_interval', 5))
+        if changes.touches('raids.live_status', 'raids.status_interval'):
+            self.live_status = raids.get('live_status', False)
+            if self.live_status:
+                self.refresh_status.change_interval(seconds=raids.get('status_interval', 5))
+                self.restart_loop(self.refresh_status)
+            else:
+                self.refresh_status.cancel()
+                for channel_id in self.cache.rosters:
+                    self.status_board.mark(channel_id)
+        if changes.touches('raids.snapshot', 'raids.snapshot_interval'):
+            path = raids.get('snapshot')
+            self.snapshot = Snapshot(path) if path else None
+            self.snapshot_contents = None
+            if self.snapshot is not None:
+                self.save_snapshot.change_interval(seconds=raids.get('snapshot_interval', 60))
+                self.restart_loop(self.save_snapshot)
+            else:
+                self.save_snapshot.cancel()
+        if changes.touches('raids.ranks', 'Dynamo.ProgDB', 'AWS'):
+            self.bot.dispatch('update_limits_data')
+        elif changes.touches('guild'):
+            self.limits.resolve()
+        if changes.touches('raids.dps_emoji', 'raids.healer_emoji', 'raids.tank_emoji'):
+            self.status_cache.clear()
+            if self.live_status:
+                for channel_id in self.cache.rosters:
+                    self.status_board.mark(channel_id)
+        if changes.touches('raids.category', 'raids.timezone'):
+            self.sorter.schedule()
+
     @commands.Cog.listener()
     async def on_update_limits_data(self):
-        global limits
-        limits = RosterExtended.get_limits(table_config=self.bot.config['Dynamo']['ProgDB'],
-                                           roles_config=self.bot.config['raids']['ranks'],
-                                           creds_config=self.bot.config['AWS'])
+        await self.limits.load()
+        # The required roles shown on every status embed may have changed
+        self.status_cache.clear()
+        if self.live_status:
+            for channel_id in self.cache.rosters:
+                self.status_board.mark(channel_id)
 
     @app_commands.command(name='trial', description='For Raid Leads: Opens Trial Creation Modal')
     @permissions.application_has_raid_lead()
     async def create_roster(self, interaction: Interaction) -> None:
         user_language = Utilities.get_language(interaction.user)
-        await interaction.response.send_modal(TrialModal(None, interaction, self.bot, user_language, roster_map))
+        await interaction.response.send_modal(TrialModal(None, interaction, self.bot, user_language,
+                                                         self.cache.roster_map))
 
     @app_commands.command(name="modify", description="For Raid Leads: Modify your Trial Roster Details")
     @permissions.application_has_raid_lead()
     async def modify_roster(self, interaction: Interaction) -> None:
         user_language = Utilities.get_language(interaction.user)
         await interaction.response.send_message(
-            f"{self.bot.language[user_language]['replies']['SelectRoster']['Select']}",
+            f"{self.bot.catalog.get(user_language, 'replies.SelectRoster.Select')}",
             view=RosterSelector(interaction, self.bot, interaction.user, "modify",
-                                user_language, roster_map, leader=None))
+                                user_language, self.cache.roster_map, leader=None))
 
     @app_commands.command(name="close", description="For Raid Leads: Close out a Roster")
     @app_commands.describe(leader="Raid Leader of the Roster being closed")
@@ -217,16 +387,16 @@ class Trials(commands.Cog, name="Trials"):
             leader = None
 
         await interaction.response.send_message(
-            f"{self.bot.language[user_language]['replies']['SelectRoster']['Select']}",
+            f"{self.bot.catalog.get(user_language, 'replies.SelectRoster.Select')}",
             view=RosterSelector(interaction, self.bot, interaction.user, "close",
-                                user_language, roster_map, leader))
+                                user_language, self.cache.roster_map, leader))
 
     @app_commands.command(name='prog', description='For Raid Leads: Sets Prog role information')
     @permissions.application_has_raid_lead()
     async def set_prog_roles(self, interaction: Interaction) -> None:
         user_language = Utilities.get_language(interaction.user)
         await interaction.response.send_modal(
-            ProgModal(self.bot, interaction, user_language))
+            ProgModal(self.bot, interaction, user_language, self.limits.progs))
 
     @commands.command(name='limits')
     @permissions.has_raid_lead()
@@ -234,18 +404,48 @@ class Trials(commands.Cog, name="Trials"):
         """For Raid Leads: Lists Values of Limits for Rosters"""
         user_language = Utilities.get_language(ctx.author)
         try:
-            all_limits = f"{self.bot.language[user_language]['replies']['Limits']}\n"
+            all_limits = f"{self.bot.catalog.get(user_language, 'replies.Limits')}\n"
 
-            for i in range(len(limits)):
-                if len(limits[i]) == 3:
-                    all_limits += f"{i}: {limits[i][0]} | {limits[i][1]} | {limits[i][2]}\n"
+            for i in range(len(self.limits)):
+                if isinstance(self.limits[i], list):
+                    all_limits += f"{i}: {self.limits[i][0]} | {self.limits[i][1]} | {self.limits[i][2]}\n"
                 else:
-                    all_limits += f"{i}: {limits[i]}\n"
+                    all_limits += f"{i}: {self.limits[i]}\n"
             await ctx.send(all_limits)
         except Exception as e:
-            await ctx.send(f"{Utilities.format_error(user_language, self.bot.language[user_language]['Incomplete'])}")
+            await ctx.send(f"{self.bot.catalog.error(user_language, 'replies.Incomplete')}")
             logging.error(f"Print Limits Error: {str(e)}")
 
+    @commands.command(name="increase", aliases=["decrease"])
+    @permissions.has_raid_lead()
+    async def change_run_count(self, ctx: commands.Context, member: Member, role=None):
+        """For Raid Leads: Adds or takes away a run | `!increase @member [optional role]`, `!decrease @member [role]`"""
+        user_language = Utilities.get_language(ctx.author)
+        if role is not None:
+            role = role.lower()
+            if role in ["heal", "heals"]:
+                role = "healer"
+            if role not in ["dps", "tank", "healer"]:
+                await ctx.reply(f"{self.bot.catalog.error(user_language, 'replies.Default.BadRoleError')}")
+                return
+        runs = -1 if ctx.invoked_with.lower() == "decrease" else 1
+        # In a roster channel the run is for that roster, anywhere else only the numbers change
+        roster = self.cache.get(ctx.channel.id)
+        try:
+            count = await RosterExtended.increase_individual_count(
+                user_id=member.id, trial=roster.trial if roster is not None else None, role=role,
+                date=roster.date if roster is not None else None, runs=runs,
+                table_config=self.bot.config['Dynamo']['CountDB'], creds_config=self.bot.config['AWS'])
+        except Exception as e:
+            await ctx.reply(f"{self.bot.catalog.error(user_language, 'replies.DBConError')}")
+            logging.error(f"Change Run Count Error: {str(e)}")
+            return
+        if count is None:
+            await ctx.reply(f"{self.bot.catalog.error(user_language, 'replies.Count.NotEnoughError', member.display_name)}")
+            return
+        # The update hands back the new values, no read needed to answer
+        await ctx.reply(f"{self.bot.catalog.get(user_language, 'replies.Count.Changed', member.display_name, count.count, count.dpsRuns, count.tankRuns, count.healerRuns)}")
+
     @commands.command(name='su', aliases=['signup', 'bu', 'backup'])
     async def add_user_to_roster(self, ctx: commands.Context):
         """Signs you up to a roster | `!su [optional role] [optional message]`"""
@@ -253,21 +453,16 @@ class Trials(commands.Cog, name="Trials"):
         try:
             channel_id = ctx.message.channel.id
             try:
-                roster = rosters[channel_id]
+                roster = self.cache.get(channel_id)
                 if roster is None:
                     await ctx.send(
-                        f"{Utilities.format_error(user_language, self.bot.language[user_language]['Roster']['WrongChannel'])}")
+                        f"{self.bot.catalog.error(user_language, 'replies.Roster.WrongChannel')}")
                     return
             except Exception as e:
                 await ctx.send("Unable to load raid.")
                 logging.error(f"SU Load Raid Error: {str(e)}")
                 return
 
-            index = int(roster.role_limit)
-            prog_role = False
-            if index >= 4:
-                prog_role = True
-
             # Check for an override otherwise fetch default.
 
             acceptable_roles = ["dps", "tank", "healer", "heals", "heal"]  # TODO: Update this with multi-lingual later.
@@ -277,7 +472,7 @@ class Trials(commands.Cog, name="Trials"):
             role = None
             user_id = ctx.author.id
 
-            cmd_vals = og_cmd.split(" ", 2)
+            cmd_vals = ctx.message.content.split(" ", 2)
             if len(cmd_vals) > 1 and cmd_vals[1].lower() in acceptable_roles:
                 role = cmd_vals[1].lower()
                 if len(cmd_vals) > 2:
@@ -290,25 +485,37 @@ class Trials(commands.Cog, name="Trials"):
 
             if role is None:
                 # Check for a default! If there is no default and no role specified then tell the person.
-                role = Librarian.get_default(user_id, table_config=self.bot.config['Dynamo']['DefaultDB'],
-                                             credentials=self.bot.config['AWS'])
+                role = await Librarian.get_default(user_id, table_config=self.bot.config['Dynamo']['DefaultDB'],
+                                                   credentials=self.bot.config['AWS'])
                 if role is None:
                     # Role is still none, tell the user there is a problem.
                     await ctx.reply(
-                        f"{Utilities.format_error(user_language, self.bot.language[user_language]['Roster']['NoDefault'] % ctx.invoked_with)}")
+                        f"{self.bot.catalog.error(user_language, 'replies.Roster.NoDefault', ctx.invoked_with)}")
                     return
 
             if role in healer_roles:
                 role = 'healer'
 
-            allowed = RosterExtended.validate_join_roster(roster_req=index, limits=limits, user=ctx.author,
+            # The cache can swap in another copy of the roster or drop it while the default is fetched, changes to the
+            # copy fetched before then would never be saved
+            roster = self.cache.get(channel_id)
+            if roster is None:
+                await ctx.send(f"{self.bot.catalog.error(user_language, 'replies.Roster.WrongChannel')}")
+                return
+
+            index = int(roster.role_limit)
+            prog_role = False
+            if index >= 4:
+                prog_role = True
+
+            allowed = RosterExtended.validate_join_roster(roster_req=index, limits=self.limits, user=ctx.author,
                                                           roster_role=role)
 
             if allowed is False and prog_role is False:
-                await ctx.reply(f"{Utilities.format_error(user_language, self.bot.language[user_language]['Roster']['NoRankError'] % (role, self.bot.config['ranks_channel'], index))}")
+                await ctx.reply(f"{self.bot.catalog.error(user_language, 'replies.Roster.NoRankError', role, self.bot.config['ranks_channel'], index)}")
                 return
             elif allowed is False and prog_role is True:
-                await ctx.reply(f"{Utilities.format_error(user_language, self.bot.language[user_language]['Roster']['ProgRoster'])}")
+                await ctx.reply(f"{self.bot.catalog.error(user_language, 'replies.Roster.ProgRoster')}")
                 return
 
             primary = ['su', 'signup']
@@ -323,33 +530,35 @@ class Trials(commands.Cog, name="Trials"):
             else:
                 raise UnknownError(f"Unreachable segment not sure how I got here.")
 
-            validation = rosters[channel_id].add_member(user_id=user_id, role=role, msg=msg, which=which)
+            validation = roster.add_member(user_id=user_id, role=role, msg=msg, which=which)
             if validation == 0:
-                await ctx.reply(f"{self.bot.language[user_language]['Roster']['Added'] % role}")  # Added into roster
+                await ctx.reply(f"{self.bot.catalog.get(user_language, 'replies.Roster.Added', role)}")  # Added into roster
             elif validation == 1:
-                await ctx.reply(f"{self.bot.language[user_language]['Roster']['Full'] % role}")  # Slots full, added as backup
+                await ctx.reply(f"{self.bot.catalog.get(user_language, 'replies.Roster.Full', role)}")  # Slots full, added as backup
             elif validation == 2:   # Unable to find role
-                await ctx.reply(f"{Utilities.format_error(user_language, self.bot.language[user_language]['Roster']['NoDefault'] % ctx.invoked_with)}")
+                await ctx.reply(f"{self.bot.catalog.error(user_language, 'replies.Roster.NoDefault', ctx.invoked_with)}")
                 return
             else:  # Unreachable
-                await ctx.reply(f"{Utilities.format_error(user_language, self.bot.language[user_language]['Unknown'])}")
+                await ctx.reply(f"{self.bot.catalog.error(user_language, 'replies.Unknown')}")
                 return
 
-            try:
-                Librarian.put_roster(channel_id=channel_id, data=rosters[channel_id].get_roster_data(),
-                                     table_config=self.bot.config['Dynamo']["RosterDB"],
-                                     credentials=self.bot.config["AWS"])
-            except Exception as e:
-                await ctx.send("I was unable to save the updated roster.")
-                logging.error(f"SU Error saving new roster: {str(e)}")
-                return
+            self.roster_changed(channel_id)
         except (UnknownError, NoDefaultError, NoRoleError) as e:
             raise e
         except Exception as e:
-            await ctx.send(f"{self.bot.language[user_language]['Unknown']}")
+            await ctx.send(f"{self.bot.catalog.get(user_language, 'replies.Unknown')}")
             logging.error(f"SUBU Error: {str(e)}")
             return
 
+    @commands.command(name="writes", hidden=True)
+    @permissions.creator_only()
+    async def roster_write_metrics(self, ctx: commands.Context):
+        """Owner Only: Shows how many roster saves were coalesced by the writer"""
+        metrics = self.writer.get_metrics()
+        await ctx.send(f"Roster changes: {metrics['marked']} | Writes: {metrics['written']} | "
+                       f"Coalesced: {metrics['coalesced']} | Failed: {metrics['failed']} | "
+                       f"Pending: {metrics['pending']}")
+
     @commands.command(name='status')
     async def send_status_embed(self, ctx: commands.Context):
         """Posts the current roster information"""
@@ -357,8 +566,7 @@ class Trials(commands.Cog, name="Trials"):
         try:
             channel_id = ctx.message.channel.id
             try:
-                roster_data = Librarian.get_roster(channel_id, table_config=self.bot.config['Dynamo']["RosterDB"],
-                                                   credentials=self.bot.config["AWS"])
+                roster_data = await self.cache.get_checked(channel_id)
                 if roster_data is None:
                     await ctx.send(f"Sorry! This command only works in a roster channel!")
                     return
@@ -367,27 +575,11 @@ class Trials(commands.Cog, name="Trials"):
                 logging.error(f"Status Load Raid Error: {str(e)}")
                 return
 
-            guild = ctx.message.author.guild
-            ui_lang = self.bot.language[user_language]["ui"]
-
-            if isinstance(limits[roster_data.role_limit], list):
-                # Need to work with 3 roles to check, dps | tank | healer order
-                # TODO: Make the prog roles be gotten if they exist, but for the main limiters consider global permanent variables
-                limiter_dps = utils.get(guild.roles, name=limits[roster_data.role_limit][0])
-                limiter_tank = utils.get(guild.roles, name=limits[roster_data.role_limit][1])
-                limiter_healer = utils.get(guild.roles, name=limits[roster_data.role_limit][2])
-
-                roles_req = f"{limiter_dps.mention} {limiter_tank.mention} {limiter_healer.mention}"
-            else:
-                limiter = utils.get(guild.roles, name=limits[roster_data.role_limit])
-                roles_req = f"{limiter.mention}"
-
-            embed = EmbedFactory.create_status(roster=roster_data, bot=self.bot, language=ui_lang['Status'],
-                                               roles_req=roles_req, guild=guild)
+            embed = self.render_status(channel_id, roster_data, ctx.message.author.guild, user_language)
 
             await ctx.send(embed=embed)
         except Exception as e:
-            await ctx.reply(f"{self.bot.language[user_language]['replies']['Unknown']}")
+            await ctx.reply(f"{self.bot.catalog.get(user_language, 'replies.Unknown')}")
             logging.error(f"Status Error: {str(e)}")
             return
 
@@ -403,7 +595,7 @@ class Trials(commands.Cog, name="Trials"):
                 message = await ctx.fetch_message(ref.message_id)
                 if message.pinned is True:
                     await message.unpin()
-                    await ctx.reply(f"{self.bot.language[user_language]['replies']['Pin']['Unpinned']}")
+                    await ctx.reply(f"{self.bot.catalog.get(user_language, 'replies.Pin.Unpinned')}")
                     return
                 else:
                     await message.pin()
@@ -413,7 +605,7 @@ class Trials(commands.Cog, name="Trials"):
                 await ctx.message.pin()
                 return
         except Exception as e:
-            await ctx.reply(f"{self.bot.language[user_language]['replies']['Unknown']}")
+            await ctx.reply(f"{self.bot.catalog.get(user_language, 'replies.Unknown')}")
             logging.error(f"Pin Error: {str(e)}")
 
     @commands.command(name="default")
@@ -429,36 +621,36 @@ class Trials(commands.Cog, name="Trials"):
                 role = "healer"
             if role == "dps" or role == "healer" or role == "tank":
                 try:
-                    Librarian.put_default(user_id=user_id, default=role,
-                                          table_config=self.bot.config['Dynamo']['DefaultDB'],
-                                          credentials=self.bot.config['AWS'])
+                    await Librarian.put_default(user_id=user_id, default=role,
+                                                table_config=self.bot.config['Dynamo']['DefaultDB'],
+                                                credentials=self.bot.config['AWS'])
                     await ctx.reply(
-                        f"{ctx.message.author.display_name}: {self.bot.language[language]['replies']['Default']['Set'] % role}")
+                        f"{ctx.message.author.display_name}: {self.bot.catalog.get(language, 'replies.Default.Set', role)}")
                 except Exception as e:
                     await ctx.reply(
-                        f"{Utilities.format_error(language, self.bot.language[language]['replies']['DBConError'])}")
+                        f"{self.bot.catalog.error(language, 'replies.DBConError')}")
                     logging.error(f"Default error: {str(e)}")
                     return
             elif role == "check":
                 try:
-                    default = Librarian.get_default(user_id, table_config=self.bot.config['Dynamo']['DefaultDB'],
-                                                    credentials=self.bot.config['AWS'])
+                    default = await Librarian.get_default(user_id, table_config=self.bot.config['Dynamo']['DefaultDB'],
+                                                          credentials=self.bot.config['AWS'])
                     if default is None:
                         await ctx.reply(
-                            f"{ctx.message.author.display_name}: {self.bot.language[language]['replies']['Default']['NoneSet']}")
+                            f"{ctx.message.author.display_name}: {self.bot.catalog.get(language, 'replies.Default.NoneSet')}")
                     else:
                         await ctx.reply(
-                            f"{ctx.message.author.display_name} {self.bot.language[language]['replies']['Default']['Answer']} {default}")
+                            f"{ctx.message.author.display_name} {self.bot.catalog.get(language, 'replies.Default.Answer')} {default}")
                 except Exception as e:
                     await ctx.send(
-                        f"{Utilities.format_error(language, self.bot.language[language]['replies']['DBConError'])}")
+                        f"{self.bot.catalog.error(language, 'replies.DBConError')}")
                     logging.error(f"Default error: {str(e)}")
                     return
             else:
                 await ctx.reply(
-                    f"{Utilities.format_error(language, self.bot.language[language]['replies']['Default']['BadRoleError'])}")
+                    f"{self.bot.catalog.error(language, 'replies.Default.BadRoleError')}")
         except Exception as e:
-            await ctx.send(f"{Utilities.format_error(language, self.bot.language[language]['replies']['DBConError'])}")
+            await ctx.send(f"{self.bot.catalog.error(language, 'replies.DBConError')}")
             logging.error(f"Default Role Set Error: {str(e)}")
 
 
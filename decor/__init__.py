@@ -2,4 +2,4 @@ from .perms import *
 from .misc import *
 
 __all__ = ['has_officer', 'has_raid_lead', 'has_prog_lead', 'application_has_raid_lead',
-           'application_has_prog_lead', 'creator_only', 'language']
\ No newline at end of file
+           'application_has_prog_lead', 'creator_only', 'language', 'timed']
\ No newline at end of file
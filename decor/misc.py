@@ -1,5 +1,6 @@
 from services import Utilities
 from functools import wraps
+from metrics import metrics
 from discord.ext import commands
 from errors import BotUserError
 
@@ -15,6 +16,19 @@ def language():
     return decorator
 
 
+def timed(name=None):
+    """Decorator that records how long a coroutine takes in the metrics, named after the class and function by default"""
+    def decorator(original_function):
+        metric = name if name is not None else f"call.{original_function.__qualname__}"
+
+        @wraps(original_function)
+        async def wrapper_function(*args, **kwargs):
+            with metrics.timer(metric):
+                return await original_function(*args, **kwargs)
+        return wrapper_function
+    return decorator
+
+
 def No_Bots():
     """Decorator that checks if a user is a Discord Bot User"""
     def decorator(original_function):
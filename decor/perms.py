@@ -1,12 +1,12 @@
-import discord
 from discord.ext import commands
 from discord import app_commands
 from functools import wraps
 
+from metrics import metrics
 from services import Utilities
 
 
-# TODO: Change these to use Role Names rather than getting the Roles themselves
+# Roles are checked by name through bot.role_index, so no check has to go through every role in the guild
 
 def has_officer():
     """A decorator that validates if someone has the officer role"""
@@ -16,13 +16,15 @@ def has_officer():
         async def wrapper_function(*args, **kwargs):
             ctx = args[1]
             self = args[0]
-            officer_role = discord.utils.get(ctx.guild.roles, name=self.bot.config["roles"]["admin"])
-            if officer_role in ctx.author.roles:
+            officer_role = self.bot.config["roles"]["admin"]
+            with metrics.timer("permission.has_officer"):
+                allowed = self.bot.role_index.has_role(ctx.author, officer_role)
+            if allowed:
                 return await original_function(*args, **kwargs)
             else:
                 lang = Utilities.get_language(ctx.author)
                 raise commands.MissingRole(
-                    f"{Utilities.format_error(lang, self.bot.config[lang]['replies']['NoPermissions'] % officer_role)}")
+                    f"{Utilities.format_error(lang, self.bot.language[lang]['replies']['NoPermissions'] % officer_role)}")
 
         return wrapper_function
 
@@ -37,8 +39,10 @@ def has_raid_lead():
         async def wrapper_function(*args, **kwargs):
             ctx = args[1]
             self = args[0]
-            raid_lead = discord.utils.get(ctx.guild.roles, name=self.bot.config["raids"]["lead"])
-            if raid_lead in ctx.author.roles:
+            raid_lead = self.bot.config["raids"]["lead"]
+            with metrics.timer("permission.has_raid_lead"):
+                allowed = self.bot.role_index.has_role(ctx.author, raid_lead)
+            if allowed:
                 return await original_function(*args, **kwargs)
             else:
                 raise commands.MissingRole(str(raid_lead))
@@ -56,8 +60,10 @@ def application_has_raid_lead():
         async def wrapper_function(*args, **kwargs):
             interaction = args[1]
             self = args[0]
-            raid_lead = discord.utils.get(interaction.guild.roles, name=self.bot.config["raids"]["lead"])
-            if raid_lead in interaction.user.roles:
+            raid_lead = self.bot.config["raids"]["lead"]
+            with metrics.timer("permission.application_has_raid_lead"):
+                allowed = self.bot.role_index.has_role(interaction.user, raid_lead)
+            if allowed:
                 return await original_function(*args, **kwargs)
             else:
                 raise app_commands.MissingRole(str(raid_lead))
@@ -94,9 +100,11 @@ def has_prog_lead():
         async def wrapper_function(*args, **kwargs):
             ctx = args[1]
             self = args[0]
-            raid_lead = discord.utils.get(ctx.guild.roles, name=self.bot.config["raids"]["lead"])
-            prog_lead = discord.utils.get(ctx.guild.roles, name=self.bot.config["raids"]["prog_lead"])
-            if raid_lead in ctx.author.roles or prog_lead in ctx.author.roles:
+            raid_lead = self.bot.config["raids"]["lead"]
+            prog_lead = self.bot.config["raids"]["prog_lead"]
+            with metrics.timer("permission.has_prog_lead"):
+                allowed = self.bot.role_index.has_any(ctx.author, raid_lead, prog_lead)
+            if allowed:
                 return await original_function(*args, **kwargs)
             else:
                 # TODO: Get user language and return it here, then print the error based on this.
@@ -115,9 +123,11 @@ def application_has_prog_lead():
         async def wrapper_function(*args, **kwargs):
             interaction = args[1]
             self = args[0]
-            raid_lead = discord.utils.get(interaction.guild.roles, name=self.bot.config["raids"]["lead"])
-            prog_lead = discord.utils.get(interaction.guild.roles, name=self.bot.config["raids"]["prog_lead"])
-            if raid_lead in interaction.user.roles or prog_lead in interaction.user.roles:
+            raid_lead = self.bot.config["raids"]["lead"]
+            prog_lead = self.bot.config["raids"]["prog_lead"]
+            with metrics.timer("permission.application_has_prog_lead"):
+                allowed = self.bot.role_index.has_any(interaction.user, raid_lead, prog_lead)
+            if allowed:
                 return await original_function(*args, **kwargs)
             else:
                 raise app_commands.MissingRole(str(f"{raid_lead} or {prog_lead}"))
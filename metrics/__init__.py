@@ -0,0 +1,4 @@
+from .registry import Metrics, Histogram, metrics
+from .server import start_server
+
+__all__ = ['Metrics', 'Histogram', 'metrics', 'start_server']
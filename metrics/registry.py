@@ -0,0 +1,127 @@
+import bisect
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+
+# Upper bounds in seconds, anything slower lands in the last bucket
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+
+class Histogram:
+    """Fixed bucket latency histogram, constant memory however many times an operation runs"""
+
+    __slots__ = ('counts', 'count', 'errors', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds, error=False):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if error:
+            self.errors += 1
+
+    def percentile(self, fraction):
+        """Estimated from the buckets, interpolated within the bucket the percentile falls in and capped at the max"""
+        if self.count == 0:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = BUCKETS[i - 1] if i > 0 else 0.0
+                upper = min(BUCKETS[i], self.max)
+                return lower + (upper - lower) * ((rank - seen) / count) if upper > lower else upper
+            seen += count
+        return self.max
+
+
+class Metrics:
+    """
+    Latency histograms keyed by operation name such as 'command.su' or 'dynamo.RosterDB.put_item'. Observed from the
+    event loop and the DynamoDB worker threads alike, so updates take a lock.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name, seconds, error=False):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds, error)
+
+    @contextmanager
+    def timer(self, name):
+        """Times the block, an exception leaving it is counted as an error and raised as normal"""
+        start = perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(name, perf_counter() - start, error=True)
+            raise
+        self.observe(name, perf_counter() - start)
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+    def summary(self):
+        """{name: {count, errors, p50, p95, p99, max, total}} with times in milliseconds"""
+        with self.lock:
+            items = list(self.histograms.items())
+        return {name: {
+            'count': h.count,
+            'errors': h.errors,
+            'p50': round(h.percentile(0.50) * 1000, 2),
+            'p95': round(h.percentile(0.95) * 1000, 2),
+            'p99': round(h.percentile(0.99) * 1000, 2),
+            'max': round(h.max * 1000, 2),
+            'total': round(h.total * 1000, 2),
+        } for name, h in items}
+
+    def report(self, prefix=None, limit=None):
+        """Plain text table sorted by total time, optionally only the operations starting with prefix"""
+        rows = sorted(((name, data) for name, data in self.summary().items()
+                       if prefix is None or name.startswith(prefix)), key=lambda i: i[1]['total'], reverse=True)
+        if limit is not None:
+            rows = rows[:limit]
+        width = max([len(name) for name, _ in rows] + [9])
+        lines = [f"{'operation':<{width}} {'count':>7} {'err':>5} {'p50ms':>8} {'p95ms':>8} {'p99ms':>8} {'maxms':>8}"]
+        for name, data in rows:
+            lines.append(f"{name:<{width}} {data['count']:>7} {data['errors']:>5} {data['p50']:>8} {data['p95']:>8} "
+                         f"{data['p99']:>8} {data['max']:>8}")
+        return "\n".join(lines)
+
+    def prometheus(self):
+        """The histograms in the Prometheus text exposition format"""
+        with self.lock:
+            items = [(name, list(h.counts), h.count, h.errors, h.total) for name, h in self.histograms.items()]
+        lines = ["# HELP bokbot_operation_seconds Time taken by commands, interactions, listeners and DynamoDB calls",
+                 "# TYPE bokbot_operation_seconds histogram"]
+        errors = ["# HELP bokbot_operation_errors_total Operations that raised",
+                  "# TYPE bokbot_operation_errors_total counter"]
+        for name, counts, count, error_count, total in sorted(items):
+            label = name.replace('\\', '\\\\').replace('"', '\\"')
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, counts):
+                cumulative += bucket
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f'bokbot_operation_seconds_bucket{{operation="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'bokbot_operation_seconds_sum{{operation="{label}"}} {total}')
+            lines.append(f'bokbot_operation_seconds_count{{operation="{label}"}} {count}')
+            errors.append(f'bokbot_operation_errors_total{{operation="{label}"}} {error_count}')
+        return "\n".join(lines + errors) + "\n"
+
+
+# Shared by everything that records timings, including aws.dynamo which has no bot to hang it from
+metrics = Metrics()
@@ -0,0 +1,20 @@
+import logging
+
+from aiohttp import web
+
+from metrics.registry import metrics
+
+
+async def serve_metrics(request):
+    return web.Response(text=metrics.prometheus(), content_type='text/plain', charset='utf-8')
+
+
+async def start_server(port, host='127.0.0.1'):
+    """Serve /metrics for a Prometheus scraper, local only unless a host is given. Returns the runner to clean up."""
+    app = web.Application()
+    app.router.add_get('/metrics', serve_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"Metrics served on http://{host}:{port}/metrics")
+    return runner
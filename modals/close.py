@@ -2,24 +2,19 @@ from discord import Interaction, TextStyle, Member
 from discord.ui import Modal, TextInput
 from models import Roster
 from services import Utilities, RosterExtended, Librarian
+from decor import timed
 import logging
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
 
 class CloseModal(Modal):
-    def __init__(self, roster: Roster, interaction: Interaction, bot, lang, roster_map, channel_id=None):
+    def __init__(self, roster: Roster, interaction: Interaction, bot, lang, roster_map, channel_id=None, leader=None):
         self.localization = bot.language[lang]["replies"]
         self.ui_language = bot.language[lang]["ui"]
         self.bot = bot
         self.user_language = lang
         self.config = bot.config
         self.channel_id = channel_id
+        self.leader = leader
         self.roster = roster
         self.roster_map = roster_map
         self.channel = interaction.guild.get_channel(int(self.channel_id))
@@ -55,6 +50,7 @@ class CloseModal(Modal):
         self.add_item(self.runs)
         self.add_item(self.runscount)
 
+    @timed("modal.CloseModal")
     async def on_submit(self, interaction: Interaction):
         confirm_value = self.confirm.value.strip().lower()
         runs_inc = self.runs.value.strip().lower()
@@ -72,18 +68,23 @@ class CloseModal(Modal):
                 inc_val = int(self.runscount.value)
                 if inc_val < 1:
                     inc_val = 1
-                RosterExtended.increase_roster_count(self.roster, inc_val,
-                                                     table_config=self.bot.config['Dynamo']["CountDB"],
-                                                     creds_config=self.bot.config["AWS"])
+                await RosterExtended.increase_roster_count(self.roster, inc_val,
+                                                           table_config=self.bot.config['Dynamo']["CountDB"],
+                                                           creds_config=self.bot.config["AWS"])
                 runs_increased = True
             except ValueError:
                 await interaction.response.send_message(
                     f"{Utilities.format_error(self.user_language, self.localization['Close']['NotNumberError'])}")
                 return
 
+        # Let any queued or in-flight save finish first so it can't recreate the roster after the delete, then drop it
+        # from memory so a signup before the listener runs can't mark it dirty for the next flush to save again
+        await self.bot.roster_writer.flush(self.channel_id)
+        self.bot.roster_cache.remove(self.channel_id)
+        self.bot.roster_writer.discard(self.channel_id)
         logging.info(f"Deleting Roster {self.name}")
-        Librarian.delete_roster(self.channel_id, table_config=self.config['Dynamo']['RosterDB'],
-                                credentials=self.config['AWS'])
+        await Librarian.delete_roster(self.channel_id, table_config=self.config['Dynamo']['RosterDB'],
+                                      credentials=self.config['AWS'])
         logging.info(f"Roster Deleted")
 
         self.bot.dispatch("update_rosters_data", channel_id=self.channel_id, channel_name=self.channel.name,
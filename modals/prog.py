@@ -1,30 +1,25 @@
 from discord.ui import Modal, TextInput
 from discord import Interaction, TextStyle, Embed, Color
 from services import Librarian
+from decor import timed
 import logging
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
 
 class ProgModal(Modal):
-    def __init__(self, bot, interaction: Interaction, user_language):
-        self.config = self.bot.config
+    def __init__(self, bot, interaction: Interaction, user_language, roles=None):
         self.bot = bot
+        self.config = self.bot.config
+        self.roles = roles
         self.language = self.bot.language[user_language]['replies']
         self.ui_language = self.bot.language[user_language]['ui']
         super().__init__(title=self.ui_language['Prog']['Title'])
         self.initialize()
 
     def initialize(self):
-        roles = Librarian.get_progs(self.config['Dynamo']['ProgDB'], self.config['AWS'])
+        # Prog roles are fetched by the caller, a Modal can't await during construction
         default_vals = ""
-        if roles is not None:
-            for i in roles:
+        if self.roles is not None:
+            for i in self.roles:
                 default_vals += f"{str(i)}\n"
         self.roles_input = TextInput(
             label=self.ui_language['Prog']['RolesInput']['Label'],
@@ -35,10 +30,11 @@ class ProgModal(Modal):
         )
         self.add_item(self.roles_input)
 
+    @timed("modal.ProgModal")
     async def on_submit(self, interaction: Interaction):
         role_list = self.roles_input.value.splitlines()
         logging.info(f"Updating Prog Role Data")
-        Librarian.put_progs(role_list, self.config['Dynamo']['ProgDB'], self.config['AWS'])
+        await Librarian.put_progs(role_list, self.config['Dynamo']['ProgDB'], self.config['AWS'])
         logging.info(f"Updated Prog Role Data")
         self.bot.dispatch("update_limits_data")
         await interaction.response.send_message(self.language['Prog']['Updated'])
@@ -1,20 +1,12 @@
 from models.roster import Roster
 from discord.ui import Modal, TextInput
 from discord import Interaction, TextStyle, Embed, Color
-from discord.utils import get
 from aws import Dynamo
 from services import Utilities, RosterExtended, EmbedFactory
+from decor import timed
 import logging
 
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
-
 class TrialModal(Modal):
     def __init__(self, roster: Roster, interaction: Interaction, bot, lang, roster_map, channel=None):
         self.localization = bot.language[lang]['replies']
@@ -85,15 +77,14 @@ class TrialModal(Modal):
         self.add_item(self.role_nums)
         self.add_item(self.memo)
 
+    @timed("modal.TrialModal")
     async def on_submit(self, interaction: Interaction):
         # Split the values:
         try:
-            roles = RosterExtended.get_limits(table_config=self.config['Dynamo']['ProgDB'],
-                                              roles_config=self.config['raids']['ranks'],
-                                              creds_config=self.config['AWS'])
+            roles = self.bot.limits
 
             role_limit = int(self.limit.value)
-            if role_limit < 0 or role_limit > len(roles):
+            if role_limit < 0 or role_limit >= len(roles):
                 await interaction.response.send_message(f"{Utilities.format_error(self.user_language, self.localization['TrialModify']['BadLimit'] % len(roles))}")
                 return
         except (NameError, ValueError) as e:
@@ -178,19 +169,7 @@ class TrialModal(Modal):
                         await interaction.response.send_message(f"{Utilities.format_error(self.user_language, self.localization['TrialModify']['CantCreate'])}")
                         logging.error(f"Unable To Create New Roster Channel: {str(e)}")
                         return
-                    roles_req = ""
-                    if isinstance(roles[role_limit], list):
-                        # Need to work with 3 roles to check, dps | tank | healer order
-
-                        limiter_dps = get(interaction.guild.roles, name=roles[role_limit][0])
-                        limiter_tank = get(interaction.guild.roles, name=roles[role_limit][1])
-                        limiter_healer = get(interaction.guild.roles, name=roles[role_limit][2])
-
-                        roles_req += f"{limiter_dps.mention} {limiter_tank.mention} {limiter_healer.mention}"
-
-                    else:
-                        limiter = get(interaction.guild.roles, name=roles[role_limit])
-                        roles_req += f"{limiter.mention}"
+                    roles_req = roles.mention(role_limit)
 
                     embed = EmbedFactory.create_new_roster(trial=self.roster.trial, date=self.roster.date,
                                                            roles_req=roles_req, leader=self.roster.leader, memo=self.roster.memo)
@@ -215,10 +194,8 @@ class TrialModal(Modal):
 
         if self.sort_channels:
             try:
-                # Put new channel into the right position
-                position = RosterExtended.get_channel_position(self.roster, self.config["raids"]["timezone"])
-                self.channel.position = position
-                await self.channel.edit(position=self.channel.position)
+                # The sorter moves the channel into place shortly, along with anything else created or changed meanwhile
+                self.bot.channel_sorter.schedule()
             except Exception as e:
                 logging.error(f"Position Change Error: {str(e)}")
                 await interaction.response.send_message(f"{Utilities.format_error(self.user_language, self.localization['TrialModify']['CantPosition'])}")
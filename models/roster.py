@@ -1,22 +1,47 @@
+import logging
+from collections import OrderedDict
+
+roster_roles = ('dps', 'healer', 'tank')
+
+
 class Roster:
     """Class for handling roster and related information"""
 
-    def __init__(self, trial, date, leader, dps={}, healers={}, tanks={}, backup_dps={}, backup_healers={},
-                 backup_tanks={}, dps_limit=0, healer_limit=0, tank_limit=0, role_limit=0, memo="delete"):
+    # Every roster is in memory for the life of the bot, slots keep each one small and fixed in shape.
+    __slots__ = ('trial', 'date', 'leader', 'dps', 'healers', 'tanks', 'backup_dps', 'backup_healers',
+                 'backup_tanks', 'dps_limit', 'healer_limit', 'tank_limit', 'role_limit', 'memo', 'version',
+                 '_index', '_revision')
+
+    def __init__(self, trial, date, leader, dps=None, healers=None, tanks=None, backup_dps=None, backup_healers=None,
+                 backup_tanks=None, dps_limit=0, healer_limit=0, tank_limit=0, role_limit=0, memo="delete", version=0):
         self.trial = trial
         self.date = date
         self.leader = leader
-        self.dps = dps
-        self.tanks = tanks
-        self.healers = healers
-        self.backup_dps = backup_dps
-        self.backup_tanks = backup_tanks
-        self.backup_healers = backup_healers
+        self.dps = dps if dps is not None else {}
+        self.tanks = tanks if tanks is not None else {}
+        self.healers = healers if healers is not None else {}
+        # Backups are queues, the oldest signup is promoted first and popped in constant time
+        self.backup_dps = OrderedDict(backup_dps or ())
+        self.backup_tanks = OrderedDict(backup_tanks or ())
+        self.backup_healers = OrderedDict(backup_healers or ())
         self.dps_limit = dps_limit
         self.tank_limit = tank_limit
         self.healer_limit = healer_limit
         self.role_limit = role_limit
         self.memo = memo
+        # Bumped on every change, stored beside the roster data rather than in it
+        self.version = version
+        # user id: (role, True for main or False for backup), kept in step with the six member dictionaries.
+        # User IDs are always kept as strings, the same as they come back from the database.
+        self._index = {}
+        # Counts membership changes so did_values_change never has to compare the member dictionaries
+        self._revision = 0
+        for role in roster_roles:
+            main, backup = self._slots(role)
+            for user_id in main:
+                self._index[user_id] = (role, True)
+            for user_id in backup:
+                self._index[user_id] = (role, False)
 
     def get_roster_data(self):
         all_data = {
@@ -37,43 +62,88 @@ class Roster:
         }
         return all_data
 
+    def _slots(self, role):
+        """Returns the main and backup dictionaries for a role."""
+        if role == 'dps':
+            return self.dps, self.backup_dps
+        elif role == 'healer':
+            return self.healers, self.backup_healers
+        elif role == 'tank':
+            return self.tanks, self.backup_tanks
+        raise KeyError(role)
+
+    def _limit(self, role):
+        if role == 'dps':
+            return self.dps_limit
+        elif role == 'healer':
+            return self.healer_limit
+        return self.tank_limit
+
+    def _place(self, user_id, role, main, p_class):
+        """Puts a user into a slot, moving them out of any slot they already hold on this roster."""
+        user_id = str(user_id)
+        main_slots, backup_slots = self._slots(role)
+        existing = self._index.get(user_id)
+        if existing == (role, main):
+            # Same slot again, only the message changes and they keep their place in line
+            (main_slots if main else backup_slots)[user_id] = p_class
+            self._revision += 1
+            return main
+        if existing is not None:
+            self.remove_member(user_id)
+        if main:
+            main_slots[user_id] = p_class
+        else:
+            backup_slots[user_id] = p_class
+        self._index[user_id] = (role, main)
+        self._revision += 1
+        return main
+
+    def _add(self, user_id, role, p_class):
+        main_slots, _ = self._slots(role)
+        existing = self._index.get(str(user_id))
+        # Someone already slotted in this role keeps their spot, their own entry doesn't count against the limit
+        taken = len(main_slots) - (1 if existing == (role, True) else 0)
+        return self._place(user_id, role, taken < self._limit(role), p_class)
+
+    def find_member(self, user_id):
+        """Returns (role, True for main or False for backup) if the user is on the roster, otherwise None."""
+        return self._index.get(str(user_id))
+
+    def member_message(self, user_id):
+        """Returns the message a user signed up with, or None if they aren't on the roster."""
+        found = self._index.get(str(user_id))
+        if found is None:
+            return None
+        main_slots, backup_slots = self._slots(found[0])
+        return (main_slots if found[1] else backup_slots)[str(user_id)]
+
+    def __contains__(self, user_id):
+        return str(user_id) in self._index
+
+    def member_ids(self):
+        """A live view of the IDs of everyone on the roster, main and backup."""
+        return self._index.keys()
+
     # Add people into the right spots
     # True for Main, False of Backup
     def add_dps(self, n_dps, p_class=""):
-        if len(self.dps) < self.dps_limit:
-            self.dps[n_dps] = p_class
-            return True
-        else:
-            self.backup_dps[n_dps] = p_class
-            return False
+        return self._add(n_dps, 'dps', p_class)
 
     def add_healer(self, n_healer, p_class=""):
-        if len(self.healers) < self.healer_limit:
-            self.healers[n_healer] = p_class
-            return True
-        else:
-            self.backup_healers[n_healer] = p_class
-            return False
+        return self._add(n_healer, 'healer', p_class)
 
     def add_tank(self, n_tank, p_class=""):
-        if len(self.tanks) < self.tank_limit:
-            self.tanks[n_tank] = p_class
-            return True
-        else:
-            self.backup_tanks[n_tank] = p_class
-            return False
+        return self._add(n_tank, 'tank', p_class)
 
     def add_backup_dps(self, n_dps, p_class=""):
-        self.backup_dps[n_dps] = p_class
-        return False
+        return self._place(n_dps, 'dps', False, p_class)
 
     def add_backup_healer(self, n_healer, p_class=""):
-        self.backup_healers[n_healer] = p_class
-        return False
+        return self._place(n_healer, 'healer', False, p_class)
 
     def add_backup_tank(self, n_tank, p_class=""):
-        self.backup_tanks[n_tank] = p_class
-        return False
+        return self._place(n_tank, 'tank', False, p_class)
 
     def add_member(self, user_id, role, which, msg=''):
         check = None
@@ -99,57 +169,81 @@ class Roster:
             return 0
         return 1
 
+    def remove_member(self, user_id):
+        """Removes a user from whichever slot they hold, returns their (role, main) or None if they weren't on it."""
+        user_id = str(user_id)
+        found = self._index.pop(user_id, None)
+        if found is None:
+            return None
+        role, main = found
+        main_slots, backup_slots = self._slots(role)
+        if main:
+            del main_slots[user_id]
+        else:
+            del backup_slots[user_id]
+        self._revision += 1
+        return found
+
     # remove people from right spots
     def remove_dps(self, n_dps):
-        if n_dps in self.dps:
-            del self.dps[n_dps]
-        else:
-            del self.backup_dps[n_dps]
+        self.remove_member(n_dps)
 
     def remove_healer(self, n_healer):
-        if n_healer in self.healers:
-            del self.healers[n_healer]
-        else:
-            del self.backup_healers[n_healer]
+        self.remove_member(n_healer)
 
     def remove_tank(self, n_tank):
-        if n_tank in self.tanks:
-            del self.tanks[n_tank]
-        else:
-            del self.backup_tanks[n_tank]
+        self.remove_member(n_tank)
+
+    def set_limits(self, dps_limit, healer_limit, tank_limit):
+        """Changes the role limits, the most recent main signups over a lowered limit move to the front of backup."""
+        for role, limit in (('dps', dps_limit), ('healer', healer_limit), ('tank', tank_limit)):
+            main_slots, backup_slots = self._slots(role)
+            overflow = len(main_slots) - limit
+            if overflow > 0:
+                moved = list(main_slots.items())[-overflow:]
+                # Moved members go to the front of backup, in their signup order, so they are promoted again first
+                for user_id, p_class in reversed(moved):
+                    del main_slots[user_id]
+                    backup_slots[user_id] = p_class
+                    backup_slots.move_to_end(user_id, last=False)
+                    self._index[user_id] = (role, False)
+                self._revision += 1
+                logging.info(f"Moved {overflow} overflow {role} to backup")
+        self.dps_limit = dps_limit
+        self.healer_limit = healer_limit
+        self.tank_limit = tank_limit
+
+    def _promote(self, role):
+        """Moves the oldest backups for a role into main until it is full, returns the promoted user IDs in order."""
+        main_slots, backup_slots = self._slots(role)
+        limit = self._limit(role)
+        promoted = []
+        while len(main_slots) < limit and backup_slots:
+            user_id, p_class = backup_slots.popitem(last=False)
+            main_slots[user_id] = p_class
+            self._index[user_id] = (role, True)
+            promoted.append(user_id)
+        if promoted:
+            self._revision += 1
+        return promoted
 
     def fill_spots(self, num):
+        """Fills open main spots from backup, oldest first. Returns the user IDs that were promoted."""
+        promoted = []
         try:
-            loop = True
-            while loop:
-                if len(self.dps) < self.dps_limit and len(self.backup_dps) > 0:
-                    first = list(self.backup_dps.keys())[0]
-                    self.dps[first] = self.backup_dps.get(first)
-                    del self.backup_dps[first]
-                else:
-                    loop = False
-            loop = True
-            while loop:
-                if len(self.healers) < self.healer_limit and len(self.backup_healers) > 0:
-                    first = list(self.backup_healers.keys())[0]
-                    self.healers[first] = self.backup_healers.get(first)
-                    del self.backup_healers[first]
-                else:
-                    loop = False
-            loop = True
-            while loop:
-                if len(self.tanks) < self.tank_limit and len(self.backup_tanks) > 0:
-                    first = list(self.backup_tanks.keys())[0]
-                    self.tanks[first] = self.backup_tanks.get(first)
-                    del self.backup_tanks[first]
-                else:
-                    loop = False
-            logging.info(f"Spots filled in roster id {str(num)}")
+            for role in roster_roles:
+                promoted.extend(self._promote(role))
+            logging.info(f"Spots filled in roster id {str(num)}, {len(promoted)} promoted")
         except Exception as e:
             logging.error(f"Fill Spots error: {str(e)}")
+        return promoted
 
-    def did_values_change(self, old_roster: Roster):
-        for key, value in vars(self).items():
-            if value != getattr(old_roster, key, None):
-                return True
-        return False
+    def did_values_change(self, old_roster: 'Roster'):
+        """
+        Compares the roster details, membership is compared through the change counter so the roster passed in must be
+        a copy of this one, which is how the modify modal gets it.
+        """
+        return (self.trial != old_roster.trial or self.date != old_roster.date or self.leader != old_roster.leader or
+                self.dps_limit != old_roster.dps_limit or self.healer_limit != old_roster.healer_limit or
+                self.tank_limit != old_roster.tank_limit or self.role_limit != old_roster.role_limit or
+                self.memo != old_roster.memo or self._revision != old_roster._revision)
@@ -1,6 +1,21 @@
 from .utilities import Utilities
-from .roster_extended import RosterExtended
+from .codec import Codec
+from .catalog import Catalog
 from .librarian import Librarian
+from .roster_extended import RosterExtended
+from .roster_writer import RosterWriter
+from .roster_cache import RosterCache
+from .channel_sorter import ChannelSorter
+from .status_cache import StatusCache
+from .status_board import StatusBoard
+from .limits_registry import LimitsRegistry
+from .role_index import RoleIndex
+from .mongo import LazyCollection
+from .snapshot import Snapshot
+from .config_manager import ConfigManager
 from.embed_factory import EmbedFactory
 
-__all__ = ['Librarian', 'Utilities', 'RosterExtended', 'EmbedFactory']
\ No newline at end of file
+__all__ = ['Librarian', 'Utilities', 'RosterExtended', 'EmbedFactory', 'RosterWriter', 'RosterCache', 'Codec',
+           'ChannelSorter', 'StatusCache', 'StatusBoard', 'LimitsRegistry',
+           'RoleIndex', 'Catalog',
+           'LazyCollection', 'Snapshot', 'ConfigManager']
\ No newline at end of file
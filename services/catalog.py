@@ -0,0 +1,140 @@
+"""
+Compiled message catalog built from the YAML files under languages/. See services/check_catalog.py to check the
+languages and the keys used in the code without starting the bot.
+"""
+import logging
+import os
+import re
+import sys
+
+import yaml
+
+from services.utilities import languages
+
+default_language = 'english'
+
+# printf style placeholders, %% is a literal percent sign and not counted
+placeholder_pattern = re.compile(r"%(?:\([^)]*\))?[#0\- +]*(?:\*|\d+)?(?:\.(?:\*|\d+))?[diouxXeEfFgGcrsa%]")
+# The literal key given to the catalog get and error calls in the code
+usage_pattern = re.compile(r"catalog\.(?:get|error)\(\s*[^,()]+,\s*['\"]([^'\"]+)['\"]")
+
+
+def read_languages(directory):
+    """Loads every languages/<language>/<section>.yaml into {language: {section: data}}"""
+    loaded = {}
+    for root, _, files in os.walk(directory):
+        for file in files:
+            if file.endswith(".yaml"):
+                filepath = os.path.join(root, file)
+                language = os.path.basename(root)
+                section = os.path.splitext(file)[0]
+
+                if language not in loaded:
+                    loaded[language] = {}
+
+                with open(filepath, "r", encoding="utf-8") as f:
+                    data = yaml.safe_load(f)
+                    loaded[language][section] = data
+    return loaded
+
+
+def flatten(data, prefix, into):
+    """Flattens nested dictionaries into dotted keys, strings are interned and lists become tuples"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            flatten(value, f"{prefix}.{key}" if prefix else str(key), into)
+    elif isinstance(data, str):
+        into[prefix] = sys.intern(data)
+    elif isinstance(data, list):
+        into[prefix] = tuple(sys.intern(i) if isinstance(i, str) else i for i in data)
+    elif data is not None:
+        into[prefix] = data
+    return into
+
+
+def count_placeholders(template):
+    if not isinstance(template, str):
+        return 0
+    return sum(1 for i in placeholder_pattern.findall(template) if i != '%%')
+
+
+class Catalog:
+    """
+    Every message of every language flattened to dotted keys such as 'replies.TrialModify.DBSaveError', with the
+    language error prefix built in ahead of time for error replies. Messages missing from a language fall back to
+    english. Shared through bot.catalog.
+    """
+
+    def __init__(self, messages, errors, problems):
+        # language: {key: template}
+        self.messages = messages
+        # language: {key: template with the format_error prefix}
+        self.errors = errors
+        self.problems = problems
+
+    @staticmethod
+    def compile(language_data):
+        """Builds the catalog from loaded language files, checking each language against english."""
+        messages = {}
+        for language, sections in language_data.items():
+            # languages/mapping.yaml sits in the languages folder itself, it isn't a language
+            if language.capitalize() not in languages:
+                continue
+            messages[language] = flatten(sections, "", {})
+
+        base = messages.get(default_language, {})
+        problems = Catalog.validate(messages, base)
+
+        errors = {}
+        for language, templates in messages.items():
+            # Missing messages are copied from english once here instead of falling back on every lookup
+            for key, template in base.items():
+                templates.setdefault(key, template)
+            prefix = str(languages.index(language.capitalize()) + 1)
+            errors[language] = {key: sys.intern(f"{prefix}{template}") for key, template in templates.items()
+                                if isinstance(template, str)}
+        return Catalog(messages, errors, problems)
+
+    @staticmethod
+    def validate(messages, base):
+        """Returns a list of problems: keys missing from or unknown to a language and placeholder count mismatches"""
+        problems = []
+        for language, templates in messages.items():
+            if language == default_language:
+                continue
+            missing = [key for key in base if key not in templates]
+            if len(missing) > 0:
+                problems.append(f"{language}: {len(missing)} missing key(s), english is used for: {', '.join(missing)}")
+            unknown = [key for key in templates if key not in base]
+            if len(unknown) > 0:
+                problems.append(f"{language}: {len(unknown)} key(s) not in english: {', '.join(unknown)}")
+            for key, template in templates.items():
+                if key in base and count_placeholders(template) != count_placeholders(base[key]):
+                    problems.append(f"{language}: {key} has {count_placeholders(template)} placeholder(s), "
+                                    f"english has {count_placeholders(base[key])}")
+        return problems
+
+    def report(self):
+        for problem in self.problems:
+            logging.warning(f"Language Catalog: {problem}")
+        logging.info(f"Language Catalog compiled for {', '.join(self.messages)}, {len(self.problems)} problem(s)")
+
+    def _lookup(self, table, language, key):
+        templates = table.get(language)
+        if templates is None:
+            templates = table[default_language]
+        try:
+            return templates[key]
+        except KeyError:
+            raise KeyError(f"Unknown catalog key {key}")
+
+    def get(self, language, key, *args):
+        """The message for a key, formatted with args when given"""
+        template = self._lookup(self.messages, language, key)
+        return template % args if args else template
+
+    def error(self, language, key, *args):
+        """The message for a key with the language error prefix, the same as Utilities.format_error gives"""
+        template = self._lookup(self.errors, language, key)
+        return template % args if args else template
+
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+
+from discord import HTTPException
+
+from services import RosterExtended
+
+SORT_RETRIES = 3
+SORT_BACKOFF = 2
+
+
+class ChannelSorter:
+    """
+    Keeps the roster channels in the raids category in date order. Sort requests are debounced so a burst of new or
+    changed rosters ends in one reorder, and a reorder only moves the channels that are out of place, all in one bulk
+    position update. Shared through bot.channel_sorter.
+    """
+
+    def __init__(self, bot, get_roster):
+        self.bot = bot
+        self.get_roster = get_roster
+        self.pending = False
+        self.task = None
+        self.sorts = 0
+        self.moves = 0
+
+    def schedule(self):
+        """Ask for the category to be sorted, requests within the sort delay of each other are handled together."""
+        self.pending = True
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.pending = False
+
+    async def _run(self):
+        while self.pending:
+            await asyncio.sleep(self.bot.config['raids'].get('sort_delay', 2))
+            # Anything asking after this point gets another pass, the sort below may already be working from old data
+            self.pending = False
+            try:
+                await self.sort()
+            except Exception as e:
+                logging.error(f"Channel Sort Error: {str(e)}")
+
+    def _sort_key(self, channel):
+        """Channels that aren't rosters stay first in their current order, rosters follow in date order."""
+        roster = self.get_roster(channel.id)
+        if roster is None:
+            return 0, 0, channel.position
+        try:
+            weight = RosterExtended.get_channel_position(roster, self.bot.config["raids"]["timezone"])
+        except Exception:
+            weight = float('inf')
+        return 1, weight, channel.position
+
+    def get_moves(self, channels):
+        """Returns (channel, new position) for only the channels whose position has to change."""
+        current = sorted(channels, key=lambda c: c.position)
+        slots = [c.position for c in current]
+        if len(set(slots)) != len(slots):
+            # Duplicate positions can't be reused as slots, lay the category out from its first position instead
+            slots = [slots[0] + i for i in range(len(slots))] if slots else []
+        target = sorted(current, key=self._sort_key)
+        return [(channel, position) for channel, position in zip(target, slots) if channel.position != position]
+
+    async def sort(self):
+        """Reorder the raids category now, returns the number of channels moved."""
+        guild = self.bot.get_guild(self.bot.config['guild'])
+        category = guild.get_channel(self.bot.config['raids']['category'])
+        if category is None:
+            return 0
+        moves = self.get_moves(category.text_channels)
+        self.sorts += 1
+        if len(moves) == 0:
+            return 0
+
+        payload = [{'id': channel.id, 'position': position} for channel, position in moves]
+        for attempt in range(SORT_RETRIES):
+            try:
+                # discord.py waits out 429s itself, this covers the remaining transient failures
+                await self.bot.http.bulk_channel_update(guild.id, payload, reason="Roster channel sort")
+                break
+            except HTTPException as e:
+                if attempt == SORT_RETRIES - 1 or (e.status < 500 and e.status != 429):
+                    raise e
+                await asyncio.sleep(SORT_BACKOFF * 2 ** attempt)
+
+        self.moves += len(moves)
+        logging.info(f"Sorted roster channels, moved {len(moves)} of {len(category.text_channels)}")
+        return len(moves)
@@ -0,0 +1,38 @@
+"""
+Checks every language against english and every literal catalog key used in the code, exiting non-zero on problems.
+
+Run from the repository root with: python -m services.check_catalog
+"""
+import os
+import sys
+
+from services.catalog import Catalog, read_languages, default_language, usage_pattern
+
+
+def check_usages(catalog, directory):
+    """Returns the literal catalog keys used in the code that don't exist in english"""
+    problems = []
+    base = catalog.messages.get(default_language, {})
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [i for i in dirs if not i.startswith('.') and i != '__pycache__']
+        for file in files:
+            if file.endswith(".py"):
+                path = os.path.join(root, file)
+                with open(path, "r", encoding="utf-8") as f:
+                    for key in usage_pattern.findall(f.read()):
+                        if key not in base:
+                            problems.append(f"{path}: unknown catalog key {key}")
+    return problems
+
+
+def main():
+    catalog = Catalog.compile(read_languages("languages"))
+    problems = catalog.problems + check_usages(catalog, ".")
+    for problem in problems:
+        print(problem)
+    print(f"{len(problems)} problem(s) in {', '.join(catalog.messages)}")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+# boto3's serializers hold no state, one of each is shared rather than built per call.
+serializer = TypeSerializer()
+deserializer = TypeDeserializer()
+
+roster_text_fields = ('trial', 'date', 'leader', 'memo')
+roster_member_fields = ('dps', 'healers', 'tanks', 'backup_dps', 'backup_healers', 'backup_tanks')
+roster_number_fields = ('dps_limit', 'healer_limit', 'tank_limit', 'role_limit')
+count_number_fields = ('count', 'dpsRuns', 'tankRuns', 'healerRuns')
+count_text_fields = ('lastTrial', 'lastDate')
+
+
+def encode_value(value):
+    """Encodes a single value, strings take the fast path and anything else goes through boto3."""
+    if type(value) is str:
+        return {'S': value}
+    return serializer.serialize(value)
+
+
+def decode_value(value):
+    """Decodes a single value, strings take the fast path and anything else goes through boto3."""
+    text = value.get('S')
+    if text is not None:
+        return text
+    return deserializer.deserialize(value)
+
+
+def decode_number(value):
+    """Decodes a number attribute straight to an int, the schemas below only ever store whole numbers."""
+    number = value.get('N')
+    if number is not None:
+        return int(number)
+    return int(deserializer.deserialize(value))
+
+
+class Codec:
+    """
+    Static Methods that convert the known table schemas to and from the DynamoDB wire format directly, skipping the
+    per-value type dispatch of boto3's generic serializers.
+    """
+
+    @staticmethod
+    def encode_text_map(data):
+        """{key: text} such as a roster member list or the roster map, as the inner map of an 'M' attribute."""
+        return {str(k): encode_value(v) for k, v in data.items()}
+
+    @staticmethod
+    def decode_text_map(data):
+        return {k: decode_value(v) for k, v in data.items()}
+
+    @staticmethod
+    def encode_roster(data):
+        """Roster.get_roster_data() to the inner map of the roster 'data' attribute."""
+        encoded = {}
+        for key in roster_text_fields:
+            encoded[key] = encode_value(data[key])
+        for key in roster_member_fields:
+            encoded[key] = {'M': Codec.encode_text_map(data[key])}
+        for key in roster_number_fields:
+            encoded[key] = {'N': str(int(data[key]))}
+        return encoded
+
+    @staticmethod
+    def decode_roster(data):
+        """The inner map of a roster 'data' attribute to the same dictionary Roster.get_roster_data() returns."""
+        decoded = {}
+        for key in roster_text_fields:
+            decoded[key] = decode_value(data[key])
+        for key in roster_member_fields:
+            decoded[key] = Codec.decode_text_map(data[key]['M'])
+        for key in roster_number_fields:
+            decoded[key] = decode_number(data[key])
+        return decoded
+
+    @staticmethod
+    def encode_count(data):
+        """Count.get_count_data() to the inner map of the count 'data' attribute."""
+        encoded = {}
+        for key in count_number_fields:
+            encoded[key] = {'N': str(int(data[key]))}
+        for key in count_text_fields:
+            encoded[key] = encode_value(data[key])
+        return encoded
+
+    @staticmethod
+    def decode_count(data):
+        decoded = {}
+        for key in count_number_fields:
+            decoded[key] = decode_number(data[key])
+        for key in count_text_fields:
+            decoded[key] = decode_value(data[key])
+        return decoded
+
+    @staticmethod
+    def encode_text_list(data):
+        """A list of text such as the prog roles, as the inner list of an 'L' attribute."""
+        return [encode_value(i) for i in data]
+
+    @staticmethod
+    def decode_text_list(data):
+        return [decode_value(i) for i in data]
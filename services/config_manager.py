@@ -0,0 +1,95 @@
+import logging
+import os
+
+import yaml
+
+# Sections read once when the bot starts, changing them needs a restart
+restart_sections = ('bot',)
+
+
+def load_configurations(directory):
+    """Merges every non template YAML file in the directory into one dictionary, None if the directory is missing"""
+    full_config = {}
+    if not os.path.exists(directory):
+        logging.error(f"The directory {directory} does not exist.")
+        return None
+    for filename in sorted(os.listdir(directory)):  # Go through all the config files but ignore templates
+        if filename.endswith('.yaml') or filename.endswith('.yml'):
+            if not filename.lower().startswith('template'):
+                file_path = os.path.join(directory, filename)
+
+                # Open and read the YAML file
+                with open(file_path, 'r') as file:
+                    file_content = yaml.safe_load(file)
+
+                    # Ensure the file content is a dictionary
+                    if isinstance(file_content, dict):
+                        full_config.update(file_content)
+                    else:
+                        logging.warning(f"Load Configuration Warning: {filename} is improperly formatted "
+                                        f"and doesn't make a dictionary")
+    return full_config
+
+
+def diff_paths(old, new, prefix, into):
+    """Collects the dotted path of every value added, removed or changed between two configs"""
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old.keys() | new.keys():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if key not in old or key not in new:
+                into.add(path)
+            else:
+                diff_paths(old[key], new[key], path, into)
+    elif old != new:
+        into.add(prefix)
+    return into
+
+
+class ConfigDiff:
+    """What changed in a config reload, as dotted paths such as 'raids.write_interval'"""
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self.paths = diff_paths(old, new, "", set())
+        self.sections = {path.split(".", 1)[0] for path in self.paths}
+
+    def __bool__(self):
+        return len(self.paths) > 0
+
+    def touches(self, *prefixes):
+        """True if anything at or under one of the dotted prefixes changed"""
+        return any(path == prefix or path.startswith(f"{prefix}.") or prefix.startswith(f"{path}.")
+                   for path in self.paths for prefix in prefixes)
+
+
+class ConfigManager:
+    """
+    Loads the config from every file in the config folder and reloads it in place. A reload works out what changed and
+    dispatches a config_changed event with the ConfigDiff, so each cog only rebuilds what depends on the changed
+    values instead of the cogs being reloaded. Shared through bot.config_manager.
+    """
+
+    def __init__(self, bot, directory=None):
+        self.bot = bot
+        self.directory = directory if directory is not None else os.path.join(os.getcwd(), 'config')
+
+    def load(self):
+        self.bot.config = load_configurations(self.directory)
+        return self.bot.config
+
+    def reload(self):
+        """Reload the config, returning the ConfigDiff. A config that fails to load leaves the current one in place."""
+        new = load_configurations(self.directory)
+        if new is None:
+            raise FileNotFoundError(f"The directory {self.directory} does not exist.")
+        changes = ConfigDiff(self.bot.config, new)
+        if not changes:
+            return changes
+        self.bot.config = new
+        for section in restart_sections:
+            if section in changes.sections:
+                logging.warning(f"Config section {section} changed, it is only applied on restart")
+        logging.info(f"Config changed: {', '.join(sorted(changes.paths))}")
+        self.bot.dispatch('config_changed', changes)
+        return changes
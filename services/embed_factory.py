@@ -7,12 +7,17 @@ class EmbedFactory:
     """Class of Static Methods that create and return embeds"""
 
     @staticmethod
-    def create_status(roster: Roster, language, bot, roles_req, guild):
-
-        dps_count = 0
-        healer_count = 0
-        tank_count = 0
+    def member_lines(members, emoji, guild):
+        """Returns the embed text for a dictionary of signups and how many of them are still in the guild."""
+        lines = []
+        for user_id, msg in members.items():
+            member = guild.get_member(int(user_id))
+            if member is not None:
+                lines.append(f"{emoji}{member.display_name} {msg}\n")
+        return "".join(lines), len(lines)
 
+    @staticmethod
+    def create_status(roster: Roster, language, bot, roles_req, guild):
         desc = f"{language['Rank']} {roles_req}"
 
         if roster.memo != "None":
@@ -26,85 +31,21 @@ class EmbedFactory:
         embed.set_footer(text=f"{language['Footer']}")
         embed.set_author(name=f"{language['Author']} {roster.leader}")
 
-        names = ""
-        # DPS
-        if not len(roster.dps) == 0:
-            dps = roster.dps
-            for i in dps:
-                member_name = guild.get_member(int(i))
-                if member_name is not None:
-                    names += f"{bot.config['raids']['dps_emoji']}{member_name.display_name} {roster.dps[i]}\n"
-                    dps_count += 1
-
-        embed.add_field(name=f"{language['DPS']} {dps_count}/{roster.dps_limit}", value=names, inline=True)
-
-        names = ""
-        # TANKS
-        if not len(roster.tanks) == 0:
-            tanks = roster.tanks
-            for i in tanks:
-                member_name = guild.get_member(int(i))
-                if member_name is not None:
-                    names += f"{bot.config['raids']['tank_emoji']}{member_name.display_name} {roster.tanks[i]}\n"
-                    tank_count += 1
-
-        embed.add_field(name=f"{language['Tanks']} {tank_count}/{roster.tank_limit}", value=names, inline=True)
-
-        names = ""
-        # HEALERS
-        if not len(roster.healers) == 0:
-            for i in roster.healers:
-                member_name = guild.get_member(int(i))
-                if member_name is not None:
-                    names += f"{bot.config['raids']['healer_emoji']}{member_name.display_name} {roster.healers[i]}\n"
-                    healer_count += 1
-
-        embed.add_field(name=f"{language['Healers']} {healer_count}/{roster.healer_limit}", value=names, inline=True)
+        raids = bot.config['raids']
+        roles = ((roster.dps, roster.backup_dps, raids['dps_emoji'], 'DPS', 'Backup_DPS', roster.dps_limit),
+                 (roster.tanks, roster.backup_tanks, raids['tank_emoji'], 'Tanks', 'Backup_Tanks', roster.tank_limit),
+                 (roster.healers, roster.backup_healers, raids['healer_emoji'], 'Healers', 'Backup_Healers',
+                  roster.healer_limit))
+
+        for main, _, emoji, title, _, limit in roles:
+            names, count = EmbedFactory.member_lines(main, emoji, guild)
+            embed.add_field(name=f"{language[title]} {count}/{limit}", value=names, inline=True)
 
         # Show Backup/Overflow Roster
-        dps_count = 0
-        healer_count = 0
-        tank_count = 0
-
-        names = ""
-        # BACKUP DPS
-        if not len(roster.backup_dps) == 0:
-            dps = roster.backup_dps
-            for i in dps:
-                member_name = guild.get_member(int(i))
-                if member_name is not None:
-                    names += f"{bot.config['raids']['dps_emoji']}{member_name.display_name} {roster.backup_dps[i]}\n"
-                    dps_count += 1
-
-
-        if dps_count > 0:
-            embed.add_field(name=f"{language['Backup_DPS']} {dps_count}", value=names, inline=True)
-
-        names = ""
-        # BACKUP TANKS
-        if not len(roster.backup_tanks) == 0:
-            tanks = roster.backup_tanks
-            for i in tanks:
-                member_name = guild.get_member(int(i))
-                if member_name is not None:
-                    names += f"{bot.config['raids']['tank_emoji']}{member_name.display_name} {roster.backup_tanks[i]}\n"
-                    tank_count += 1
-
-        if tank_count > 0:
-            embed.add_field(name=f"{language['Backup_Tanks']} {tank_count}", value=names, inline=True)
-
-        names = ""
-        # BACKUP HEALERS
-        if not len(roster.backup_healers) == 0:
-            backup_healers = roster.backup_healers
-            for i in backup_healers:
-                member_name = guild.get_member(int(i))
-                if member_name is not None:
-                    names += f"{bot.config['raids']['healer_emoji']}{member_name.display_name} {roster.backup_healers[i]}\n"
-                    healer_count += 1
-
-        if healer_count > 0:
-            embed.add_field(name=f"{language['Backup_Healers']} {healer_count}", value=names, inline=True)
+        for _, backup, emoji, _, title, _ in roles:
+            names, count = EmbedFactory.member_lines(backup, emoji, guild)
+            if count > 0:
+                embed.add_field(name=f"{language[title]} {count}", value=names, inline=True)
 
         return embed
 
@@ -1,15 +1,17 @@
+import asyncio
 from aws import Dynamo
-from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
 from models import Roster, Count
+from services.codec import Codec, serializer, deserializer, encode_value, decode_number
 
 
 def create_instance(table_config, credentials):
+    """Returns a table wrapper, the underlying client is pooled in aws.dynamo so this is cheap to call."""
     return Dynamo(table=table_config['TableName'], endpoint=table_config['Endpoint'], region=table_config['Region'],
                   access=credentials['Access'], secret=credentials['Secret'])
 
 
 def serialize(data):
-    serializer = TypeSerializer()
     if isinstance(data, dict):
         serialized = {k: serializer.serialize(v) for k, v in data.items()}
     elif isinstance(data, list):
@@ -20,7 +22,6 @@ def serialize(data):
 
 
 def deserialize(data):
-    deserializer = TypeDeserializer()
     if isinstance(data, dict):
         deserialized = {k: deserializer.deserialize(v) for k, v in data.items()}
     elif isinstance(data, list):
@@ -30,164 +31,296 @@ def deserialize(data):
     return deserialized
 
 
+role_runs = {
+    'dps': 'dpsRuns',
+    'tank': 'tankRuns',
+    'healer': 'healerRuns'
+}
+
+
+def count_from_item(item):
+    """Builds a Count from a raw CountDB item."""
+    data = Codec.decode_count(item['data']['M'])
+    return Count(runs=data['count'], trial=data['lastTrial'], date=data['lastDate'], dps=data['dpsRuns'],
+                 tank=data['tankRuns'], healer=data['healerRuns'])
+
+
+def roster_from_item(item):
+    """Builds a Roster from a raw RosterDB item, keeping the item version for cache checks."""
+    data = Codec.decode_roster(item['data']['M'])
+    version = decode_number(item['version']) if 'version' in item else 0
+    return Roster(data['trial'], data['date'], data['leader'], data['dps'], data['healers'], data['tanks'],
+                  data['backup_dps'], data['backup_healers'], data['backup_tanks'], data['dps_limit'],
+                  data['healer_limit'], data['tank_limit'], data['role_limit'], data['memo'], version=version)
+
+
 class Librarian:
     """
     Utility Service Class featuring static methods to consolidate DynamoDB interactions into one class rather than
-    spread out across various components.
+    spread out across various components. All methods are coroutines and must be awaited.
     """
 
     @staticmethod
-    def get_all_rosters(table_config, credentials):
+    async def iter_rosters(table_config, credentials):
+        """
+        Async generator yielding (channel ID, Roster) for every stored roster page by page, using a parallel scan when
+        the table config sets ScanSegments.
+        """
         db_instance = create_instance(table_config, credentials)
-        db_data = db_instance.scan_get_all()
-        if db_data is None:
+        async for page in db_instance.scan_pages(segments=int(table_config.get('ScanSegments', 1))):
+            for i in page:
+                yield int(i['channelID']['S']), roster_from_item(i)
+
+    @staticmethod
+    async def get_all_rosters(table_config, credentials):
+        try:
+            all_rosters = {}
+            async for channel_id, roster in Librarian.iter_rosters(table_config, credentials):
+                all_rosters[channel_id] = roster
+            return all_rosters
+        except ClientError:
+            # Already logged by Dynamo, callers treat None as nothing loaded
             return None
 
-        all_rosters = {}
-        for i in db_data:
-            deserial = deserialize(i)
-            data = deserial['data']
-            channel_id = deserial['channelID']
-            all_rosters[int(channel_id)] = Roster(data['trial'], data['date'], data['leader'], data['dps'],
-                                                  data['healers'], data['tanks'],
-                                                  data['backup_dps'], data['backup_healers'], data['backup_tanks'],
-                                                  data['dps_limit'], data['healer_limit'],
-                                                  data['tank_limit'], data['role_limit'], data['memo'])
-        return all_rosters
+    @staticmethod
+    async def get_roster(channel_id, table_config, credentials):
+        db_instance = create_instance(table_config, credentials)
+        query = {'channelID': {'S': str(channel_id)}}
+        db_data = await db_instance.get(query)
+        if db_data is not None and 'Item' in db_data:
+            return roster_from_item(db_data['Item'])
+        else:
+            return None
 
     @staticmethod
-    def get_roster(channel_id, table_config, credentials):
+    async def get_roster_version(channel_id, table_config, credentials):
+        """Fetches only the version of a stored roster, None if the roster doesn't exist."""
         db_instance = create_instance(table_config, credentials)
         query = {'channelID': {'S': str(channel_id)}}
-        db_data = db_instance.get(query)
+        db_data = await db_instance.get(query, ProjectionExpression='#version',
+                                        ExpressionAttributeNames={'#version': 'version'})
         if db_data is not None and 'Item' in db_data:
-            data = deserialize(db_data['Item'])['data']
-            return Roster(data['trial'], data['date'], data['leader'], data['dps'], data['healers'], data['tanks'],
-                          data['backup_dps'], data['backup_healers'], data['backup_tanks'], int(data['dps_limit']),
-                          int(data['healer_limit']),
-                          int(data['tank_limit']), int(data['role_limit']), data['memo'])
+            item = db_data['Item']
+            return decode_number(item['version']) if 'version' in item else 0
         else:
             return None
 
     @staticmethod
-    def put_roster(channel_id, data, table_config, credentials):
+    async def get_roster_versions(table_config, credentials):
+        """Returns {channel ID: version} for every stored roster, scanning only the key and version attributes."""
+        db_instance = create_instance(table_config, credentials)
+        versions = {}
+        async for page in db_instance.scan_pages(segments=int(table_config.get('ScanSegments', 1)),
+                                                 projection=['channelID', 'version']):
+            for i in page:
+                versions[int(i['channelID']['S'])] = decode_number(i['version']) if 'version' in i else 0
+        return versions
+
+    @staticmethod
+    async def get_rosters(channel_ids, table_config, credentials):
+        """Fetches the given rosters with batched reads, returns {channel ID: Roster} for the ones that exist."""
+        db_instance = create_instance(table_config, credentials)
+        items = await db_instance.batch_get([{'channelID': {'S': str(channel_id)}} for channel_id in channel_ids])
+        return {int(i['channelID']['S']): roster_from_item(i) for i in items}
+
+    @staticmethod
+    async def put_roster(channel_id, data, table_config, credentials, version=None):
         db_instance = create_instance(table_config, credentials)
         item = {
             'channelID': {'S': str(channel_id)},
-            'data': {'M': serialize(data)}
+            'data': {'M': Codec.encode_roster(data)}
         }
-        db_instance.put(item)
+        if version is not None:
+            item['version'] = {'N': str(version)}
+        await db_instance.put(item)
 
     @staticmethod
-    def delete_roster(channel_id, table_config, credentials):
+    async def put_rosters(rosters, table_config, credentials):
+        """Save a dictionary of channel ID to (roster data, version) with batched writes."""
+        db_instance = create_instance(table_config, credentials)
+        items = [{
+            'channelID': {'S': str(channel_id)},
+            'data': {'M': Codec.encode_roster(data)},
+            'version': {'N': str(version)}
+        } for channel_id, (data, version) in rosters.items()]
+        await db_instance.batch_write(items=items)
+
+    @staticmethod
+    async def delete_roster(channel_id, table_config, credentials):
         db_instance = create_instance(table_config, credentials)
         query = {'channelID': {'S': str(channel_id)}}
-        db_instance.delete(query)
+        await db_instance.delete(query)
 
     @staticmethod
-    def get_roster_map(table_config, credentials):
+    async def get_roster_map(table_config, credentials):
         db_instance = create_instance(table_config, credentials)
         query = {'key': {'S': 'rosters'}}
-        db_data = db_instance.get(query)
+        db_data = await db_instance.get(query)
         if db_data is not None and 'Item' in db_data:
-            return deserialize(db_data['Item'])['data']
+            return Codec.decode_text_map(db_data['Item']['data']['M'])
         else:
             return None
 
     @staticmethod
-    def put_roster_map(data, table_config, credentials):
+    async def put_roster_map(data, table_config, credentials):
         db_instance = create_instance(table_config, credentials)
         # Dictionary that is {channel ID: channel Name} mapping
         item = {
             'key': {'S': 'rosters'},
-            'data': {'M': serialize(data)}
+            'data': {'M': Codec.encode_text_map(data)}
         }
-        db_instance.put(item)
+        await db_instance.put(item)
         return
 
     @staticmethod
-    def get_default(user_id, table_config, credentials):
+    async def get_default(user_id, table_config, credentials):
         db_instance = create_instance(table_config, credentials)
         query = {'userID': {'S': str(user_id)}}
-        db_data = db_instance.get(query)
+        db_data = await db_instance.get(query)
         if db_data is not None and 'Item' in db_data:
             return deserialize(db_data['Item'])['default']
         else:
             return None
 
     @staticmethod
-    def put_default(user_id, default, table_config, credentials):
+    async def put_default(user_id, default, table_config, credentials):
         db_instance = create_instance(table_config, credentials)
         item = {
             'userID': {'S': str(user_id)},
             'default': {'S': default}
         }
-        db_instance.put(item)
+        await db_instance.put(item)
         return
 
     @staticmethod
-    def get_count(user_id, table_config, credentials):
+    async def get_languages(table_config, credentials):
+        """Returns every stored language preference as a dictionary of user ID to language."""
+        db_instance = create_instance(table_config, credentials)
+        languages = {}
+        async for page in db_instance.scan_pages():
+            for i in page:
+                languages[int(i['userID']['S'])] = i['language']['S']
+        return languages
+
+    @staticmethod
+    async def put_language(user_id, language, table_config, credentials):
+        db_instance = create_instance(table_config, credentials)
+        item = {
+            'userID': {'S': str(user_id)},
+            'language': {'S': language}
+        }
+        await db_instance.put(item)
+        return
+
+    @staticmethod
+    async def delete_language(user_id, table_config, credentials):
+        db_instance = create_instance(table_config, credentials)
+        query = {'userID': {'S': str(user_id)}}
+        await db_instance.delete(query)
+
+    @staticmethod
+    async def get_count(user_id, table_config, credentials):
         db_instance = create_instance(table_config, credentials)
         query = {'key': {'S': str(user_id)}}
-        db_data = db_instance.get(query)
+        db_data = await db_instance.get(query)
         if db_data is not None and 'Item' in db_data:
-            data = deserialize(db_data['Item'])['data']
-            return Count(runs=data['count'], trial=data['lastTrial'], date=data['lastDate'], dps=data['dpsRuns'],
-                         tank=data['tankRuns'], healer=data['healerRuns'])
+            return count_from_item(db_data['Item'])
         else:
             return Count()
 
     @staticmethod
-    def put_count(user_id, count, table_config, credentials):
+    async def put_count(user_id, count, table_config, credentials):
         db_instance = create_instance(table_config, credentials)
         data = count.get_count_data()
         item = {
             'key': {'S': str(user_id)},
-            'data': {'M': serialize(data)}
+            'data': {'M': Codec.encode_count(data)}
         }
-        db_instance.put(item)
+        await db_instance.put(item)
         return
 
     @staticmethod
-    def get_progs(table_config, credentials):
+    async def increase_count(user_id, role, runs, trial, date, table_config, credentials):
+        """
+        Atomically add runs to a user's total and role count and set their last trial, without reading the record
+        first. Negative runs decrease the counts, but never below zero and never for a user with no record. Without a
+        role only the total changes, and without a trial and date the last trial is left as it is. Returns the updated
+        Count, or None if there weren't enough runs to take away.
+        """
+        db_instance = create_instance(table_config, credentials)
+        # Role names match the Count keyword arguments, used when this is the user's first run
+        initial = Count()
+        initial.increase_data(runs=runs, trial=trial, date=date, **({role: runs} if role is not None else {}))
+        counters = {'count': runs}
+        if role is not None:
+            counters[role_runs[role]] = runs
+        values = {}
+        if trial is not None and date is not None:
+            values = {'lastTrial': encode_value(trial), 'lastDate': encode_value(date)}
+        try:
+            item = await db_instance.increment(
+                query={'key': {'S': str(user_id)}},
+                counters=counters,
+                values=values,
+                path='data',
+                # Taking runs away never creates a record
+                initial={
+                    'key': {'S': str(user_id)},
+                    'data': {'M': Codec.encode_count(initial.get_count_data())}
+                } if runs > 0 else None)
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return None
+            raise e
+        return count_from_item(item)
+
+    @staticmethod
+    async def increase_counts(members, runs, trial, date, table_config, credentials):
+        """Atomically increase the counts of a dictionary of user ID to role, returns user ID to updated Count."""
+        results = await asyncio.gather(*(Librarian.increase_count(user_id, role, runs, trial, date, table_config,
+                                                                  credentials) for user_id, role in members.items()))
+        return dict(zip((str(user_id) for user_id in members), results))
+
+    @staticmethod
+    async def get_progs(table_config, credentials):
         db_instance = create_instance(table_config, credentials)
         query = {'key': {'S': 'progs'}}
-        db_data = db_instance.get(query)
+        db_data = await db_instance.get(query)
         if db_data is not None and 'Item' in db_data:
-            return deserialize(db_data['Item'])['data']
+            return Codec.decode_text_list(db_data['Item']['data']['L'])
         else:
             return None
 
     @staticmethod
-    def put_progs(data, table_config, credentials):
+    async def put_progs(data, table_config, credentials):
         db_instance = create_instance(table_config, credentials)
         item = {
             'key': {'S': 'progs'},
-            'data': {'L': serialize(data)}
+            'data': {'L': Codec.encode_text_list(data)}
         }
-        db_instance.put(item)
+        await db_instance.put(item)
         return
 
     @staticmethod
-    def get_rank(user_id, table_config, credentials):
+    async def get_rank(user_id, table_config, credentials):
         pass
 
     @staticmethod
-    def put_rank(user_id, data, table_config, credentials):
+    async def put_rank(user_id, data, table_config, credentials):
         pass
 
     @staticmethod
-    def get_role_channel(table_config, credentials):
+    async def get_role_channel(table_config, credentials):
         pass
 
     @staticmethod
-    def put_role_chanel(data, table_config, credentials):
+    async def put_role_chanel(data, table_config, credentials):
         pass
 
     @staticmethod
-    def put_raid_lead_check(user_id, data, table_config, credentials):
+    async def put_raid_lead_check(user_id, data, table_config, credentials):
         pass
 
     @staticmethod
-    def get_raid_lead_check(user_id, table_config, credentials):
+    async def get_raid_lead_check(user_id, table_config, credentials):
         pass
\ No newline at end of file
@@ -0,0 +1,72 @@
+import logging
+
+from services import Librarian, RosterExtended
+
+
+class LimitsRegistry:
+    """
+    The roster limits, loaded once and reloaded when the prog roles change, with every role name in them resolved to
+    its guild Role ahead of time. Shared through bot.limits so nothing needs the database or a scan of the guild roles
+    to check or show a roster's required rank.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        # Index is the roster role_limit, each entry is a role name or a [dps, tank, healer] list of role names
+        self.limits = []
+        self.progs = None
+        self.roles = {}
+
+    def __len__(self):
+        return len(self.limits)
+
+    def __getitem__(self, index):
+        return self.limits[index]
+
+    async def load(self):
+        """Fetch the prog roles and rebuild the limits, keeping the current ones if the fetch fails."""
+        try:
+            progs = await Librarian.get_progs(self.bot.config['Dynamo']['ProgDB'], self.bot.config['AWS'])
+            self.limits = RosterExtended.build_limits(self.bot.config['raids']['ranks'], progs)
+            self.progs = progs
+            self.resolve()
+            logging.info(f"Found and Loaded {len(self.limits)} Limits")
+        except Exception as e:
+            logging.error(f"Limits Load Error: {str(e)}")
+
+    def restore(self, progs):
+        """Build the limits from prog roles kept in a snapshot, load is still called afterwards to refresh them."""
+        self.limits = RosterExtended.build_limits(self.bot.config['raids']['ranks'], progs)
+        self.progs = progs
+        self.resolve()
+
+    def resolve(self):
+        """Resolve every role name in the limits to the guild's Role in one pass over the guild roles."""
+        guild = self.bot.get_guild(self.bot.config['guild'])
+        if guild is None:
+            return
+        names = set()
+        for limit in self.limits:
+            names.update(limit if isinstance(limit, list) else [limit])
+        self.roles = {role.name: role for role in guild.roles if role.name in names}
+
+    def get_role(self, name):
+        return self.roles.get(name)
+
+    def required(self, role_limit, roster_role=None):
+        """The required role name for a roster limit, for one of dps, tank or healer when the limit is split by role."""
+        limit = self.limits[role_limit]
+        if isinstance(limit, list):
+            if roster_role is None:
+                return limit
+            return limit[RosterExtended.role_to_limit_num[roster_role]]
+        return limit
+
+    def mention(self, role_limit):
+        """Returns the mentions of the required role(s) for a roster limit, dps | tank | healer order when split."""
+        limit = self.limits[role_limit]
+        names = limit if isinstance(limit, list) else [limit]
+        if any(name not in self.roles for name in names):
+            # The role may have been created since the limits were loaded
+            self.resolve()
+        return " ".join(self.get_role(name).mention for name in names)
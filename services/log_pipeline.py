@@ -0,0 +1,115 @@
+"""
+The logging set up for the whole bot, configured once by bot.py. Records are put on a queue by the thread that logs
+them and written to the console and a rotating log file by a background thread, so logging never waits on file I/O on
+the event loop. The file gets one JSON record per line tagged with the correlation ID of the command that logged it.
+"""
+import copy
+import json
+import logging
+import os
+import queue
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+log_name = 'log.log'
+# The current log rolls over to log.log.1 and so on past this size and on every start, the oldest is deleted
+log_max_bytes = 5 * 1024 * 1024
+log_backups = 10
+console_format = '%(asctime)s: %(message)s'
+
+# Set for the command or interaction being handled, every record logged while handling it carries the ID
+correlation_id = ContextVar('correlation_id', default=None)
+
+listener = None
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamps records with the current correlation ID, runs where the record is logged so the context is right"""
+
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'module': record.module,
+            'function': record.funcName,
+            'line': record.lineno,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'correlation_id', None) is not None:
+            entry['correlation_id'] = record.correlation_id
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TracebackQueueHandler(QueueHandler):
+    """
+    Queues records with the traceback in exc_text instead of folded into the message the way QueueHandler does, so the
+    file gets it in its own field and the console formatter still prints it after the message
+    """
+
+    def prepare(self, record):
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+
+def setup_logging(path=log_name, level=logging.INFO):
+    """
+    Replace any root handlers with the queue and start the writer thread. Called once at startup, the log from the last
+    run is rolled over first so every run starts a new file.
+    """
+    global listener
+    if listener is not None:
+        return listener
+
+    file_handler = RotatingFileHandler(path, maxBytes=log_max_bytes, backupCount=log_backups, encoding='utf-8',
+                                       delay=True)
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        file_handler.doRollover()
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(console_format))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = TracebackQueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationFilter())
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def stop_logging():
+    """Write out everything still queued and stop the writer thread"""
+    global listener
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        listener = None
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+
+# uri: MongoClient, one client per server shared by every collection as pymongo recommends
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class LazyCollection:
+    """
+    Stands in for a MongoDB collection for the cogs still on MongoDB. Nothing is imported or connected until the
+    collection is first used, so loading those cogs never waits on the database. pymongo is only needed by the cogs
+    that use it.
+    """
+
+    def __init__(self, uri, database, collection):
+        self._uri = uri
+        self._database = database
+        self._name = collection
+        self._collection = None
+
+    def _get(self):
+        if self._collection is None:
+            from pymongo import MongoClient
+            with _clients_lock:
+                client = _clients.get(self._uri)
+                if client is None:
+                    client = MongoClient(self._uri)
+                    _clients[self._uri] = client
+            self._collection = client[self._database][self._name]
+        return self._collection
+
+    async def call(self, method, *args, **kwargs):
+        """Runs a collection method such as find_one on a worker thread, connecting there on first use."""
+        return await asyncio.to_thread(lambda: getattr(self._get(), method)(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
@@ -0,0 +1,32 @@
+class RoleIndex:
+    """
+    Per guild index of role name to role ID, so permission and rank checks are a dictionary lookup plus a check of the
+    member's role IDs instead of a scan of every guild role. Built the first time a guild is checked and refreshed by
+    the guild role events in bot.py. Shared through bot.role_index.
+    """
+
+    def __init__(self):
+        # guild id: {role name: role id}
+        self.guilds = {}
+
+    def refresh(self, guild):
+        # Reversed so a duplicated name maps to the lowest role, the same one discord.utils.get would find
+        self.guilds[guild.id] = {role.name: role.id for role in reversed(guild.roles)}
+
+    def get_id(self, guild, name):
+        """Returns the ID of the role with this name in the guild, or None if there isn't one."""
+        names = self.guilds.get(guild.id)
+        if names is None:
+            self.refresh(guild)
+            names = self.guilds[guild.id]
+        return names.get(name)
+
+    def has_role(self, member, name):
+        """Checks if a member has the role with this name, everyone has the default role."""
+        role_id = self.get_id(member.guild, name)
+        if role_id is None:
+            return False
+        return role_id == member.guild.id or member.get_role(role_id) is not None
+
+    def has_any(self, member, *names):
+        return any(self.has_role(member, name) for name in names)
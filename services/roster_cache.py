@@ -0,0 +1,230 @@
+import logging
+
+from services import Librarian
+
+
+class RosterCache:
+    """
+    The single in-memory copy of every roster and the roster map. Loaded once when the bot is ready and kept current by
+    every change, so reads never need the database. Shared through bot.roster_cache.
+
+    Also keeps an index of user ID to the channels of every roster they are on, so anything looking for one user only
+    visits their rosters instead of all of them.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.rosters = {}
+        self.roster_map = {}
+        # user id: set of channel ids, plus the members last indexed for each channel to work out what changed
+        self.members = {}
+        self.indexed = {}
+        # channel id: (version, {user id: (role, main)}, details) of each roster restored from a snapshot, kept until
+        # reconcile so changes made since the restore can be told apart from what the snapshot held
+        self.restored = {}
+
+    def reindex(self, channel_id):
+        """Bring the user index in line with the current members of a roster, or drop it if the roster is gone."""
+        channel_id = int(channel_id)
+        roster = self.rosters.get(channel_id)
+        old = self.indexed.pop(channel_id, frozenset())
+        new = frozenset(roster.member_ids()) if roster is not None else frozenset()
+        for user_id in old - new:
+            channels = self.members.get(user_id)
+            if channels is not None:
+                channels.discard(channel_id)
+                if len(channels) == 0:
+                    del self.members[user_id]
+        for user_id in new - old:
+            self.members.setdefault(user_id, set()).add(channel_id)
+        if roster is not None:
+            self.indexed[channel_id] = new
+
+    def rebuild_index(self):
+        self.members = {}
+        self.indexed = {}
+        for channel_id in self.rosters:
+            self.reindex(channel_id)
+
+    def get_user_rosters(self, user_id):
+        """Returns the channel IDs of every roster the user is on."""
+        return set(self.members.get(str(user_id), ()))
+
+    async def load(self, is_dirty=None):
+        """
+        Load the roster map and every roster from the database, replacing what is in memory. Rosters with changes that
+        haven't been saved yet, according to is_dirty, keep their memory copy since the database one is older.
+        """
+        fetched = await Librarian.get_roster_map(table_config=self.bot.config['Dynamo']["MapDB"],
+                                                 credentials=self.bot.config["AWS"])
+        if fetched is not None:
+            if is_dirty is not None:
+                for channel_id in self.roster_map:
+                    if is_dirty(int(channel_id)):
+                        fetched[channel_id] = self.roster_map[channel_id]
+            self.roster_map = fetched
+            logging.info(f"Found and Loaded Roster Map")
+        else:
+            logging.info(f"No Roster Map Found")
+        try:
+            # Rosters stream in page by page, the finished dictionary is swapped in so readers never see half of it
+            fetched = {}
+            async for channel_id, roster in Librarian.iter_rosters(table_config=self.bot.config['Dynamo']["RosterDB"],
+                                                                   credentials=self.bot.config["AWS"]):
+                fetched[channel_id] = roster
+            if is_dirty is not None:
+                # Checked once the scan is done, so signups made while it was running are kept too
+                for channel_id, roster in self.rosters.items():
+                    if is_dirty(channel_id):
+                        fetched[channel_id] = roster
+            self.rosters = fetched
+            self.rebuild_index()
+            logging.info(f"Found and Loaded {len(fetched)} Rosters")
+        except Exception as e:
+            logging.error(f"Roster Load Error: {str(e)}")
+
+    def restore(self, rosters, roster_map, restored=None):
+        """
+        Swap in rosters and a roster map from a snapshot, to be checked against the database with reconcile. restored
+        has what rosters written before they were checked were first restored as, they're checked against that.
+        """
+        restored = restored or {}
+        self.rosters = rosters
+        self.roster_map = roster_map
+        self.restored = {channel_id: restored.get(channel_id) or
+                         (roster.version, {i: roster.find_member(i) for i in roster.member_ids()}, self.details(roster))
+                         for channel_id, roster in rosters.items()}
+        self.rebuild_index()
+        logging.info(f"Restored {len(rosters)} Rosters From Snapshot")
+
+    @staticmethod
+    def details(roster):
+        return {i: getattr(roster, i) for i in ('trial', 'date', 'leader', 'dps_limit', 'healer_limit', 'tank_limit',
+                                                'role_limit', 'memo')}
+
+    @staticmethod
+    def merge(stored, current, members, details):
+        """Make the changes current had since it was restored with these members and details again on stored."""
+        changed = {i: v for i, v in RosterCache.details(current).items() if details[i] != v}
+        for name in ('trial', 'date', 'leader', 'role_limit', 'memo'):
+            if name in changed:
+                setattr(stored, name, changed[name])
+        if any(i in changed for i in ('dps_limit', 'healer_limit', 'tank_limit')):
+            stored.set_limits(current.dps_limit, current.healer_limit, current.tank_limit)
+        for user_id in members:
+            if user_id not in current:
+                stored.remove_member(user_id)
+        for user_id in current.member_ids():
+            placed = current.find_member(user_id)
+            if members.get(user_id) != placed:
+                stored.add_member(user_id=user_id, role=placed[0], which='su' if placed[1] else 'bu',
+                                  msg=current.member_message(user_id))
+
+    async def reconcile(self, is_dirty, mark_dirty):
+        """
+        Bring restored rosters in line with the database by comparing stored versions, fetching only the rosters that
+        are newer in the database than in the snapshot and dropping the ones that no longer exist there. A fetched
+        roster that also changed since the restore gets those changes made again on top of the stored copy, and any
+        held at a newer version than the stored one are marked dirty so they get saved. Writes of restored rosters
+        must be held until this returns, or a stale copy could replace the stored one first.
+        """
+        restored = self.restored
+        fetched = await Librarian.get_roster_map(table_config=self.bot.config['Dynamo']["MapDB"],
+                                                 credentials=self.bot.config["AWS"])
+        versions = await Librarian.get_roster_versions(table_config=self.bot.config['Dynamo']["RosterDB"],
+                                                       credentials=self.bot.config["AWS"])
+        if fetched is not None:
+            # Channels created or renamed since the restore are kept
+            for channel_id in self.roster_map:
+                if is_dirty(int(channel_id)):
+                    fetched[channel_id] = self.roster_map[channel_id]
+            self.roster_map = fetched
+
+        stale = []
+        for channel_id, version in versions.items():
+            roster = self.rosters.get(channel_id)
+            if roster is None:
+                # Closed since the restore if it was restored, otherwise created after the snapshot was written
+                if channel_id not in restored:
+                    stale.append(channel_id)
+                continue
+            # Signups since the restore move the memory version on without it seeing what the database got after the
+            # snapshot was written, so the snapshot's version is the one to compare
+            if version > (restored[channel_id][0] if channel_id in restored else roster.version):
+                stale.append(channel_id)
+            elif version < roster.version:
+                mark_dirty(channel_id)
+        # Only rosters that came from the snapshot can have been closed while the bot was down, ones created since the
+        # restore may have been saved after the scan read past them
+        removed = [i for i in restored if i in self.rosters and i not in versions and not is_dirty(i)]
+
+        updated = await Librarian.get_rosters(stale, table_config=self.bot.config['Dynamo']["RosterDB"],
+                                              credentials=self.bot.config["AWS"]) if len(stale) > 0 else {}
+        for channel_id, roster in updated.items():
+            current = self.rosters.get(channel_id)
+            if current is None:
+                if channel_id in restored:
+                    # Closed while the fetch was out
+                    continue
+            elif channel_id in restored:
+                version, members, details = restored[channel_id]
+                if current.version != version:
+                    self.merge(roster, current, members, details)
+                    roster.version = max(roster.version, current.version) + 1
+                    mark_dirty(channel_id)
+            elif roster.version <= current.version:
+                # A signup while the fetch was out makes the memory copy the newer one
+                continue
+            self.rosters[channel_id] = roster
+            self.reindex(channel_id)
+        for channel_id in removed:
+            if is_dirty(channel_id):
+                continue
+            self.rosters.pop(channel_id, None)
+            self.reindex(channel_id)
+        self.restored = {}
+        logging.info(f"Reconciled Rosters: {len(updated)} updated, {len(removed)} removed, "
+                     f"{len(versions) - len(stale)} unchanged")
+        return list(updated) + removed
+
+    def get(self, channel_id):
+        """Returns the roster for a channel or None if the channel isn't a roster."""
+        return self.rosters.get(int(channel_id))
+
+    def add(self, channel_id, roster, channel_name):
+        self.rosters[int(channel_id)] = roster
+        self.roster_map[str(channel_id)] = channel_name
+        self.reindex(channel_id)
+
+    def remove(self, channel_id):
+        self.rosters.pop(int(channel_id), None)
+        self.roster_map.pop(str(channel_id), None)
+        self.reindex(channel_id)
+
+    def touch(self, channel_id):
+        """Record that a roster changed, bumping the version that is saved alongside it and updating the user index."""
+        roster = self.get(channel_id)
+        if roster is not None:
+            roster.version += 1
+        self.reindex(channel_id)
+
+    async def get_checked(self, channel_id):
+        """
+        Returns the roster for a channel. When raids.verify_cache is enabled, the stored version is checked first and
+        the roster is reloaded if the database holds a newer copy than memory.
+        """
+        roster = self.get(channel_id)
+        if roster is None or not self.bot.config['raids'].get('verify_cache', False):
+            return roster
+
+        stored = await Librarian.get_roster_version(channel_id, table_config=self.bot.config['Dynamo']["RosterDB"],
+                                                    credentials=self.bot.config["AWS"])
+        if stored is not None and stored > roster.version:
+            fetched = await Librarian.get_roster(channel_id, table_config=self.bot.config['Dynamo']["RosterDB"],
+                                                 credentials=self.bot.config["AWS"])
+            if fetched is not None:
+                logging.info(f"Roster channelID {channel_id} was stale, reloaded version {fetched.version}")
+                self.rosters[int(channel_id)] = fetched
+                self.reindex(channel_id)
+                return fetched
+        return roster
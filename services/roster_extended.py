@@ -7,13 +7,6 @@ from zoneinfo import ZoneInfo
 from models import Roster, Count
 from discord import Member
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
-
 
 def generate_time_from_timestamp(timestamp, tz):
     """Generates the time according to the bots default timezone in config from a timestamp"""
@@ -23,6 +16,13 @@ def generate_time_from_timestamp(timestamp, tz):
 class RosterExtended:
     """Class of static methods for trial operations."""
 
+    # Position of each role in a limit that is split by role
+    role_to_limit_num = {
+        'dps': 0,
+        'tank': 1,
+        'healer': 2
+    }
+
     @staticmethod
     def factory(fact_leader, fact_raid, fact_date, fact_dps_limit, fact_healer_limit, fact_tank_limit,
                 fact_role_limit, fact_memo, config):
@@ -107,11 +107,17 @@ class RosterExtended:
         return old_trial != new_trial
 
     @staticmethod
-    def get_limits(table_config, roles_config, creds_config):
+    async def get_limits(table_config, roles_config, creds_config):
         """Create list of roles with nested lists for 1-3 indexes"""
 
         from services import Librarian
 
+        prog_roles = await Librarian.get_progs(table_config, creds_config)
+        return RosterExtended.build_limits(roles_config, prog_roles)
+
+    @staticmethod
+    def build_limits(roles_config, prog_roles):
+        """The limits list from the configured ranks followed by the prog roles, if there are any"""
         list_roles = [
             roles_config['base'],
             [
@@ -125,63 +131,42 @@ class RosterExtended:
             ]
         ]
 
-        prog_roles = Librarian.get_progs(table_config, creds_config)
-
         if prog_roles is not None and prog_roles[0] != "None":
             for i in prog_roles:
                 list_roles.append(i)
         return list_roles
 
     @staticmethod
-    def increase_individual_count(user_id, trial, role, date, runs, table_config, creds_config):
-        """Increases count of a user."""
+    async def increase_individual_count(user_id, trial, role, date, runs, table_config, creds_config):
+        """
+        Increases count of a user, only their total when role is None and decreases it for negative runs. Returns the
+        updated Count, or None if a decrease would take a count below zero.
+        """
         try:
-            count: Count = Librarian.get_count(user_id=user_id, table_config=table_config, credentials=creds_config)
-
-            if role == "dps":
-                count.increase_data(runs=runs, trial=trial, date=date, dps=runs)
-            elif role == "tank":
-                count.increase_data(runs=runs, trial=trial, date=date, tank=runs)
-            elif role == "healer":
-                count.increase_data(runs=runs, trial=trial, date=date, dps=runs)
-            else:
+            if role not in ["dps", "tank", "healer", None]:
                 raise Exception(f"Increase Individual Count Error: Unknown Role Input: {role}")
 
-            Librarian.put_count(user_id=user_id, count=count, table_config=table_config, credentials=creds_config)
+            count: Count = await Librarian.increase_count(user_id=user_id, role=role, runs=runs, trial=trial,
+                                                          date=date, table_config=table_config,
+                                                          credentials=creds_config)
+            return count
 
         except Exception as e:
             logging.error(f"Increase Individual Run Count Error: {str(e)}")
             raise e
 
     @staticmethod
-    def increase_roster_count(roster: Roster, count, table_config, creds_config):
-        """Increase run count of all users in a roster."""
+    async def increase_roster_count(roster: Roster, count, table_config, creds_config):
+        """Increase run count of all users in a roster, returns user ID to updated Count."""
         try:
             from services import Librarian
 
-            for i in roster.dps:
-                db_count = Librarian.get_count(i, table_config, creds_config)
-                if db_count is None:
-                    db_count = Count(runs=count, dps=count, trial=roster.trial, date=roster.date)
-                else:
-                    db_count.increase_data(runs=count, dps=count, trial=roster.trial, date=roster.date)
-                Librarian.put_count(i, db_count, table_config, creds_config)
-
-            for i in roster.tanks:
-                db_count = Librarian.get_count(i, table_config, creds_config)
-                if db_count is None:
-                    db_count = Count(runs=count, tank=count, trial=roster.trial, date=roster.date)
-                else:
-                    db_count.increase_data(runs=count, tank=count, trial=roster.trial, date=roster.date)
-                Librarian.put_count(i, db_count, table_config, creds_config)
-
-            for i in roster.healers:
-                db_count = Librarian.get_count(i, table_config, creds_config)
-                if db_count is None:
-                    db_count = Count(runs=count, healer=count, trial=roster.trial, date=roster.date)
-                else:
-                    db_count.increase_data(runs=count, healer=count, trial=roster.trial, date=roster.date)
-                Librarian.put_count(i, db_count, table_config, creds_config)
+            # Every member is an atomic update with no read, sent concurrently, so close time doesn't grow with size
+            members = {i: 'dps' for i in roster.dps}
+            members.update({i: 'tank' for i in roster.tanks})
+            members.update({i: 'healer' for i in roster.healers})
+            return await Librarian.increase_counts(members, runs=count, trial=roster.trial, date=roster.date,
+                                                   table_config=table_config, credentials=creds_config)
 
         except Exception as e:
             logging.error(f"Increase Roster Run Count Error: {str(e)}")
@@ -189,22 +174,14 @@ class RosterExtended:
 
     @staticmethod
     def validate_join_roster(roster_req, limits, user: Member, roster_role):
+        """Checks a user has the role a roster requires for what they are joining as, limits is the LimitsRegistry"""
         try:
-            role_to_limit_num = {
-                'dps': 0,
-                'tank': 1,
-                'healer': 2
-            }
-            limit = limits[roster_req]
+            limit = limits.required(roster_req, roster_role)
 
             # If someone has the Raid Leads role, they can bypass requirements.
-            if isinstance(limit, list):
-                limit = limit[role_to_limit_num[roster_role]]
-            if any(limit == role.name for role in user.roles):
-                return True
-            elif any('Raid Leads' == role.name for role in user.roles):
-                return True
-            return false
+            return limits.bot.role_index.has_any(user, limit, 'Raid Leads')
         except Exception as e:
             logging.error(f"Add User To Roster Validation Error: {str(e)}")
+            # A limit that can't be checked, such as one past the prog roles after they shrank, refuses the signup
+            return False
 
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+
+from services import Librarian
+
+
+class RosterWriter:
+    """
+    Write-behind persistence for rosters. Changes mark a channel as dirty and a flush writes the latest in-memory state
+    of every dirty roster once, so a burst of signups on the same roster costs a single database write.
+    """
+
+    def __init__(self, bot, get_roster):
+        self.bot = bot
+        self.get_roster = get_roster
+        self.dirty = set()
+        # Rosters restored from a snapshot aren't written until they have been checked against the database, the
+        # stored copy may be newer than the snapshot
+        self.held = set()
+        self.lock = asyncio.Lock()
+        self.marked = 0
+        self.written = 0
+        self.coalesced = 0
+        self.failed = 0
+
+    def mark_dirty(self, channel_id):
+        """Flag a roster as needing to be saved on the next flush."""
+        channel_id = int(channel_id)
+        self.marked += 1
+        if channel_id in self.dirty:
+            self.coalesced += 1
+        else:
+            self.dirty.add(channel_id)
+
+    def is_dirty(self, channel_id):
+        return int(channel_id) in self.dirty
+
+    def hold(self, channel_ids):
+        """Keep these rosters out of flushes until release, changes to them stay dirty meanwhile."""
+        self.held.update(int(i) for i in channel_ids)
+
+    def release(self):
+        self.held = set()
+
+    def discard(self, channel_id):
+        """Forget about pending changes for a roster, used when it no longer exists."""
+        self.dirty.discard(int(channel_id))
+
+    async def flush(self, channel_id=None):
+        """
+        Save dirty rosters to the database, either all of them or only the channel passed in. Failed saves stay dirty
+        for the next flush, and an error flushing a single channel is raised so the caller can report it.
+        """
+        async with self.lock:
+            if channel_id is None:
+                pending = self.dirty - self.held
+                self.dirty = self.dirty & self.held
+            else:
+                channel_id = int(channel_id)
+                if channel_id not in self.dirty or channel_id in self.held:
+                    return 0
+                self.dirty.discard(channel_id)
+                pending = {channel_id}
+
+            to_write = {}
+            for i in pending:
+                roster = self.get_roster(i)
+                if roster is None:
+                    # Closed since it was marked, nothing left to save
+                    self.coalesced += 1
+                    continue
+                to_write[i] = (roster.get_roster_data(), roster.version)
+
+            if len(to_write) == 0:
+                return 0
+
+            if len(to_write) == 1:
+                results = await asyncio.gather(
+                    *(Librarian.put_roster(channel_id=i, data=data, table_config=self.bot.config['Dynamo']["RosterDB"],
+                                           credentials=self.bot.config["AWS"], version=version)
+                      for i, (data, version) in to_write.items()),
+                    return_exceptions=True)
+            else:
+                # Several rosters go out together as BatchWriteItem requests, a failure leaves all of them dirty
+                try:
+                    await Librarian.put_rosters(to_write, table_config=self.bot.config['Dynamo']["RosterDB"],
+                                                credentials=self.bot.config["AWS"])
+                    results = [None] * len(to_write)
+                except Exception as e:
+                    results = [e] * len(to_write)
+
+            error = None
+            written = 0
+            for i, result in zip(to_write, results):
+                if isinstance(result, Exception):
+                    self.dirty.add(i)
+                    self.failed += 1
+                    error = result
+                    logging.error(f"Roster Write Behind Error channelID {i}: {str(result)}")
+                else:
+                    written += 1
+            self.written += written
+            logging.info(f"Flushed {written} Roster(s) to DB, {self.coalesced} writes coalesced so far")
+
+            if error is not None and channel_id is not None:
+                raise error
+            return written
+
+    def get_metrics(self):
+        """Returns the counters for roster writes since the writer was created."""
+        return {
+            "marked": self.marked,
+            "written": self.written,
+            "coalesced": self.coalesced,
+            "failed": self.failed,
+            "pending": len(self.dirty)
+        }
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+from models import Roster
+
+# Bump when the layout of the lines changes, older snapshots are then ignored rather than misread
+SNAPSHOT_SCHEMA = 1
+
+
+class Snapshot:
+    """
+    Local copy of the rosters, roster map and prog roles written as JSON lines, so a restart or reload can serve
+    signups straight away and check the database afterwards. The first line is a header with the schema version and a
+    SHA-256 checksum of every line after it. A snapshot that is missing, from another schema or fails the checksum is
+    ignored and the bot loads from the database as normal. A roster written before it was checked against the database
+    also carries what it was restored as, so the next start checks it against that rather than its current state.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @staticmethod
+    def encode(rosters, roster_map, progs, restored=None):
+        """
+        Returns the snapshot file contents for the state passed in. restored is RosterCache.restored for rosters not
+        checked against the database yet. Cheap enough to run on the event loop.
+        """
+        restored = restored or {}
+        lines = [json.dumps({'type': 'map', 'data': roster_map}, separators=(',', ':')),
+                 json.dumps({'type': 'progs', 'data': progs}, separators=(',', ':'))]
+        for channel_id, roster in rosters.items():
+            entry = {'type': 'roster', 'channel': channel_id, 'version': roster.version,
+                     'data': roster.get_roster_data()}
+            if channel_id in restored:
+                version, members, details = restored[channel_id]
+                entry['restored'] = {'version': version, 'members': members, 'details': details}
+            lines.append(json.dumps(entry, separators=(',', ':')))
+        body = "\n".join(lines)
+        header = json.dumps({'schema': SNAPSHOT_SCHEMA, 'created': int(time.time()), 'rosters': len(rosters),
+                             'checksum': hashlib.sha256(body.encode('utf-8')).hexdigest()})
+        return f"{header}\n{body}\n"
+
+    @staticmethod
+    def decode(text):
+        """
+        Returns (rosters, roster_map, progs, restored) from snapshot file contents, or raises ValueError if it can't be
+        used. restored is in the form of RosterCache.restored, for the rosters that carry it.
+        """
+        header, _, body = text.partition("\n")
+        header = json.loads(header)
+        if header.get('schema') != SNAPSHOT_SCHEMA:
+            raise ValueError(f"schema {header.get('schema')} is not {SNAPSHOT_SCHEMA}")
+        body = body.rstrip("\n")
+        if hashlib.sha256(body.encode('utf-8')).hexdigest() != header.get('checksum'):
+            raise ValueError("checksum mismatch")
+
+        rosters = {}
+        roster_map = {}
+        progs = None
+        restored = {}
+        for line in body.split("\n"):
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry['type'] == 'roster':
+                rosters[int(entry['channel'])] = Roster(**entry['data'], version=entry['version'])
+                if 'restored' in entry:
+                    base = entry['restored']
+                    restored[int(entry['channel'])] = (base['version'], {user_id: tuple(placed) for user_id, placed
+                                                                         in base['members'].items()}, base['details'])
+            elif entry['type'] == 'map':
+                roster_map = entry['data']
+            elif entry['type'] == 'progs':
+                progs = entry['data']
+        return rosters, roster_map, progs, restored
+
+    def write(self, contents):
+        """Writes the file through a temporary file, so a crash mid write never leaves a half written snapshot."""
+        temp = f"{self.path}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(contents)
+        os.replace(temp, self.path)
+
+    def read(self):
+        """Returns the decoded snapshot or None if there is no usable one."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return Snapshot.decode(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Snapshot {self.path} ignored: {str(e)}")
+            return None
@@ -0,0 +1,79 @@
+import logging
+
+from discord import NotFound, HTTPException
+
+
+class StatusBoard:
+    """
+    Opt-in live status for roster channels. Each roster channel keeps one pinned status message that is edited in place
+    after changes instead of people posting !status. Changes only mark a channel, a refresh edits every marked channel
+    once, so however many signups land between refreshes a channel gets at most one edit per refresh. Shared through
+    bot.status_board.
+    """
+
+    def __init__(self, bot, render, footer):
+        self.bot = bot
+        # render(channel) returns the status embed for a roster channel or None if it isn't one
+        self.render = render
+        # Footer text of the status embed, used to find the pinned message again after a restart
+        self.footer = footer
+        self.messages = {}
+        self.dirty = set()
+        self.marked = 0
+        self.edits = 0
+
+    def mark(self, channel_id):
+        """Flag a roster channel's status message as out of date."""
+        self.marked += 1
+        self.dirty.add(int(channel_id))
+
+    def discard(self, channel_id):
+        self.dirty.discard(int(channel_id))
+        self.messages.pop(int(channel_id), None)
+
+    async def find_message(self, channel):
+        """Returns the pinned status message in a channel, looking through the pins the first time only."""
+        message = self.messages.get(channel.id)
+        if message is not None:
+            return message
+        for pinned in await channel.pins():
+            if pinned.author == self.bot.user and len(pinned.embeds) > 0 and \
+                    pinned.embeds[0].footer.text == self.footer:
+                self.messages[channel.id] = pinned
+                return pinned
+        return None
+
+    async def update(self, channel_id):
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            return
+        embed = self.render(channel)
+        if embed is None:
+            return
+        message = await self.find_message(channel)
+        if message is None:
+            message = await channel.send(embed=embed)
+            self.messages[channel_id] = message
+            try:
+                await message.pin(reason="Roster status")
+            except HTTPException as e:
+                logging.error(f"Status Pin Error channelID {channel_id}: {str(e)}")
+        else:
+            try:
+                self.messages[channel_id] = await message.edit(embed=embed)
+            except NotFound:
+                # Someone deleted it, a new one is posted on the next refresh
+                self.messages.pop(channel_id, None)
+                self.dirty.add(channel_id)
+                return
+        self.edits += 1
+
+    async def refresh(self):
+        """Bring every marked channel's status message up to date."""
+        pending = self.dirty
+        self.dirty = set()
+        for channel_id in pending:
+            try:
+                await self.update(channel_id)
+            except Exception as e:
+                logging.error(f"Status Board Error channelID {channel_id}: {str(e)}")
@@ -0,0 +1,33 @@
+class StatusCache:
+    """
+    Rendered roster status embeds keyed by (channel, language, roster version). A roster change moves the version on
+    so its old embeds are never served again, and anything else an embed depends on (member names, prog roles)
+    invalidates it directly. Entries are rebuilt lazily on the next request. Shared through bot.status_cache.
+    """
+
+    def __init__(self):
+        # (channel id, language): (roster version, embed), only the latest version of each is kept
+        self.embeds = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, channel_id, language, version):
+        """Returns the cached embed if it was built for this version of the roster, otherwise None."""
+        cached = self.embeds.get((int(channel_id), language))
+        if cached is not None and cached[0] == version:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        return None
+
+    def put(self, channel_id, language, version, embed):
+        self.embeds[(int(channel_id), language)] = (version, embed)
+
+    def invalidate(self, channel_id):
+        """Drop every language of a roster's embed."""
+        channel_id = int(channel_id)
+        for key in [key for key in self.embeds if key[0] == channel_id]:
+            del self.embeds[key]
+
+    def clear(self):
+        self.embeds = {}
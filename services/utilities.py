@@ -3,12 +3,10 @@ import logging
 
 languages = ['English', 'Spanish', 'French']
 
-logging.basicConfig(
-    level=logging.INFO, format='%(asctime)s: %(message)s',
-    handlers=[
-        logging.FileHandler('log.log', mode='a'),
-        logging.StreamHandler()
-    ])  # , datefmt="%Y-%m-%d %H:%M:%S")
+# member id: language resolved from their roles, dropped when their roles change
+language_cache = {}
+# member id: language they picked with !language, used ahead of their roles
+language_overrides = {}
 
 
 class Utilities:
@@ -16,12 +14,47 @@ class Utilities:
 
     @staticmethod
     def get_language(m: member):
-        """Static Method to return a language based on a users Discord Roles"""
+        """
+        Static Method to return a language based on a users chosen language or their Discord Roles. Memoized per member,
+        forget_language must be called when their roles change.
+        """
+        language = language_overrides.get(m.id)
+        if language is None:
+            language = language_cache.get(m.id)
+        if language is not None:
+            return language
+
+        language = "english"
+        names = {role.name for role in m.roles}
         for lang in languages:
-            for role in m.roles:
-                if lang == role.name:
-                    return lang.lower()
-        return "english"
+            if lang in names:
+                language = lang.lower()
+                break
+        language_cache[m.id] = language
+        return language
+
+    @staticmethod
+    def forget_language(member_id):
+        """Drop a member's memoized language so it is worked out again from their roles."""
+        language_cache.pop(member_id, None)
+
+    @staticmethod
+    def forget_languages():
+        """Drop every memoized language, for when a role is renamed or deleted and the names they came from changed."""
+        language_cache.clear()
+
+    @staticmethod
+    def set_language_override(member_id, language):
+        """Set or with None clear the language a member chose, which is used instead of their roles."""
+        if language is None:
+            language_overrides.pop(member_id, None)
+        else:
+            language_overrides[member_id] = language
+
+    @staticmethod
+    def load_language_overrides(overrides):
+        language_overrides.clear()
+        language_overrides.update(overrides)
 
     @staticmethod
     def suffix(d):
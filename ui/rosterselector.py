@@ -1,5 +1,6 @@
+from copy import deepcopy
 from discord import ui, SelectOption, Interaction
-from services import Utilities, Librarian
+from services import Utilities
 from modals import *
 
 
@@ -62,10 +63,11 @@ class RosterSelect(ui.Select):
         # Fetch Key from value for channel ID
         channel_id = self.channel_mapper[selected]
 
-        roster = Librarian.get_roster(channel_id=str(channel_id),
-                                      table_config=self.config['Dynamo']["RosterDB"], credentials=self.config["AWS"])
+        roster = await self.bot.roster_cache.get_checked(channel_id)
 
         if self.cmd_called == "modify":
+            # The modal edits its roster before the changes are compared against the cached one, so give it a copy
+            roster = deepcopy(roster)
             await interaction.response.send_modal(TrialModal(roster=roster, interaction=interaction, bot=self.bot, lang=self.user_language,
                                                              roster_map=self.roster_map, channel=channel_id))
         elif self.cmd_called == "call":